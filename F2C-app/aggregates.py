@@ -0,0 +1,191 @@
+## Agregados materializados por UF e nacionais
+#
+# Para cada campo numérico de data.FRAME_SCHEMA: quantidade de valores
+# preenchidos, soma, média, mínimo, máximo e os percentis de PERCENTILES; por
+# UF também o número de municípios e de elegíveis em cada fundo. Cada UF
+# guarda o digest da sua fatia do frame (e da matriz de elegibilidade):
+# refresh só recalcula as UFs cujo digest mudou. O agregado nacional ('BR') é
+# recombinado a partir dos vetores ordenados já guardados de cada UF, sem
+# voltar ao frame.
+import hashlib
+
+import numpy as np
+import pandas as pd
+from flask import abort, jsonify
+
+from data import FRAME_SCHEMA
+
+NATIONAL = 'BR'
+PERCENTILES = (10, 25, 50, 75, 90)
+STATS = ('count', 'sum', 'mean', 'min', *(f'p{p}' for p in PERCENTILES), 'max')
+AGGREGATES_ROUTE = '/aggregates'
+
+# campo -> coluna do frame, para todas as colunas numéricas do esquema
+FIELDS = {chave: col for col, (dtype, grupo, chave) in FRAME_SCHEMA.items()
+          if grupo and dtype.startswith('float')}
+
+
+def _field_stats(ordenados):
+    # ordenados: valores preenchidos, em ordem crescente
+    if not len(ordenados):
+        return dict.fromkeys(STATS, None) | {'count': 0, 'sum': 0.0}
+    cortes = np.percentile(ordenados, PERCENTILES)
+    soma = float(ordenados.sum())
+    return {
+        'count': len(ordenados),
+        'sum': soma,
+        'mean': soma / len(ordenados),
+        'min': float(ordenados[0]),
+        **{f'p{p}': float(v) for p, v in zip(PERCENTILES, cortes)},
+        'max': float(ordenados[-1]),
+    }
+
+
+class Aggregates:
+    def __init__(self):
+        self.version = None
+        self._states = {}  # UF -> {'digest', 'municipios', 'eligible', 'sorted', 'stats'}
+        self._national = None
+
+    def refresh(self, df, eligibility=None):
+        # Recalcula só as UFs novas ou alteradas; devolve a lista delas
+        alteradas = []
+        vistas = set()
+        # Um hash por linha, calculado uma vez para o frame inteiro
+        linhas = pd.util.hash_pandas_object(df[['Código [-]', *FIELDS.values()]], index=False).to_numpy()
+        for uf, posicoes in df.groupby('Estado', sort=True).indices.items():
+            vistas.add(uf)
+            bits = eligibility.bits[:, posicoes] if eligibility is not None else None
+            digest = self._digest(linhas[posicoes], bits, eligibility)
+            if self._states.get(uf, {}).get('digest') == digest:
+                continue
+            self._states[uf] = self._state(df.iloc[posicoes], bits, eligibility, digest)
+            alteradas.append(uf)
+
+        removidas = set(self._states) - vistas
+        for uf in removidas:
+            del self._states[uf]
+        if alteradas or removidas or self._national is None:
+            self._national = self._combine()
+            self.version = hashlib.sha256(
+                repr(sorted((uf, s['digest']) for uf, s in self._states.items())).encode('utf-8')
+            ).hexdigest()[:16]
+        return alteradas
+
+    @staticmethod
+    def _digest(linhas, bits, eligibility):
+        h = hashlib.sha256(linhas.tobytes())
+        if bits is not None:
+            h.update(repr(eligibility.fund_ids).encode('utf-8'))
+            h.update(np.packbits(bits).tobytes())
+        return h.hexdigest()
+
+    @staticmethod
+    def _state(fatia, bits, eligibility, digest):
+        ordenados = {}
+        for campo, col in FIELDS.items():
+            valores = fatia[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            ordenados[campo] = np.sort(valores[~np.isnan(valores)])
+        elegiveis = {}
+        if bits is not None:
+            elegiveis = dict(zip(eligibility.fund_ids, bits.sum(axis=1).tolist()))
+        return {
+            'digest': digest,
+            'municipios': len(fatia),
+            'eligible': elegiveis,
+            'sorted': ordenados,
+            'stats': {campo: _field_stats(valores) for campo, valores in ordenados.items()},
+        }
+
+    def _combine(self):
+        estados = list(self._states.values())
+        ordenados = {
+            campo: np.sort(np.concatenate([s['sorted'][campo] for s in estados])) if estados else np.array([])
+            for campo in FIELDS
+        }
+        elegiveis = {}
+        for s in estados:
+            for fund_id, n in s['eligible'].items():
+                elegiveis[fund_id] = elegiveis.get(fund_id, 0) + n
+        return {
+            'municipios': sum(s['municipios'] for s in estados),
+            'eligible': elegiveis,
+            'sorted': ordenados,
+            'stats': {campo: _field_stats(valores) for campo, valores in ordenados.items()},
+        }
+
+    def _get(self, uf):
+        return self._national if uf == NATIONAL else self._states[uf]
+
+    def ufs(self):
+        return sorted(self._states)
+
+    def summary(self, uf=NATIONAL):
+        agregado = self._get(uf)
+        return {
+            'uf': uf,
+            'municipios': agregado['municipios'],
+            'eligible': agregado['eligible'],
+            'stats': agregado['stats'],
+        }
+
+    def stat(self, uf, campo, nome):
+        return self._get(uf)['stats'][campo][nome]
+
+    def percentile_rank(self, uf, campo, valor):
+        # Percentual dos municípios da UF (ou do país) com valor menor ou igual
+        ordenados = self._get(uf)['sorted'][campo]
+        if valor is None or np.isnan(valor) or not len(ordenados):
+            return None
+        return 100.0 * np.searchsorted(ordenados, valor, side='right') / len(ordenados)
+
+    def compare(self, uf, campo, nome='p50', referencia=NATIONAL):
+        # Estatística da UF e a mesma estatística da referência (o país, por padrão)
+        return self.stat(uf, campo, nome), self.stat(referencia, campo, nome)
+
+    def table(self):
+        # Uma linha por (UF, campo), com 'BR' no fim
+        linhas = []
+        for uf in self.ufs() + [NATIONAL]:
+            agregado = self._get(uf)
+            for campo, stats in agregado['stats'].items():
+                linhas.append({'uf': uf, 'campo': campo, 'municipios': agregado['municipios'], **stats})
+        return pd.DataFrame(linhas).set_index(['uf', 'campo'])
+
+    def eligible_table(self):
+        return pd.DataFrame(
+            {uf: {'municipios': self._get(uf)['municipios'], **self._get(uf)['eligible']}
+             for uf in self.ufs() + [NATIONAL]}
+        ).T
+
+
+def register_routes(server, aggregates):
+    @server.route(AGGREGATES_ROUTE)
+    def aggregates_all():
+        return jsonify({
+            'version': aggregates.version,
+            'states': {uf: aggregates.summary(uf) for uf in aggregates.ufs() + [NATIONAL]},
+        })
+
+    @server.route(f'{AGGREGATES_ROUTE}/<uf>')
+    def aggregates_state(uf):
+        uf = uf.upper()
+        if uf != NATIONAL and uf not in aggregates.ufs():
+            abort(404)
+        return jsonify(aggregates.summary(uf))
+
+
+if __name__ == '__main__':
+    import time
+
+    from data import load_frame
+    from funds import evaluate_funds
+
+    df = load_frame()
+    agregados = Aggregates()
+    inicio = time.perf_counter()
+    agregados.refresh(df, evaluate_funds(df))
+    print(f"Agregados de {len(agregados.ufs())} UFs em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    with pd.option_context('display.width', 200, 'display.max_columns', 20, 'display.float_format', '{:,.1f}'.format):
+        print(agregados.table().loc[NATIONAL])
+        print(agregados.eligible_table())
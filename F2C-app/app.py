@@ -1,84 +1,71 @@
+import hashlib
+
+# Primeiro import: marca o início da linha do tempo do boot (startup.py)
+from startup import TIMELINE, Deferred, register_routes as register_startup_routes, start as start_deferred
+
 import dash
-from dash import html, dcc, Input, Output, callback, State
+from dash import html, dcc, Input, Output, callback, State, ClientsideFunction
+import os
 import pandas as pd
 from urllib.parse import unquote
-import json
 import dash_leaflet as dl
 
-## 1. Função de Carregamento de Dados (Modificada para incluir estados)
-def load_data():
-    df = pd.read_csv('ibge.txt')
-    
-    columns_spec = {
-        'Município [-]': 'category',
-        'Código [-]': 'str',
-        'Gentílico [-]': 'category',
-        'Prefeito [2025]': 'category',
-        'Área Territorial - km² [2024]': 'float32',
-        'População no último censo - pessoas [2022]': 'float32',
-        'Densidade demográfica - hab/km² [2022]': 'float32',
-        'População estimada - pessoas [2024]': 'float32',
-        'IDHM (Índice de desenvolvimento humano municipal) [2010]': 'float32',
-        'PIB per capita - R$ [2021]': 'float32',
-        'Total de receitas brutas realizadas - R$ [2024]': 'float64',
-        'Total de despesas brutas empenhadas - R$ [2024]': 'float64'
-    }
-    
-    for col, dtype in columns_spec.items():
-        if dtype.startswith('float'):
-            df[col] = df[col].astype(str).str.replace(',', '.')
-            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
-        else:
-            df[col] = df[col].astype(dtype)
-    
-    # Código para mapear estado a partir do código do município
-    codigo_para_uf = {
-        11: "RO", 12: "AC", 13: "AM", 14: "RR", 15: "PA", 16: "AP", 17: "TO",
-        21: "MA", 22: "PI", 23: "CE", 24: "RN", 25: "PB", 26: "PE", 27: "AL", 28: "SE", 29: "BA",
-        31: "MG", 32: "ES", 33: "RJ", 35: "SP",
-        41: "PR", 42: "SC", 43: "RS",
-        50: "MS", 51: "MT", 52: "GO", 53: "DF"
-    }
-    
-    # Adiciona coluna de estado
-    df['Estado'] = df['Código [-]'].apply(lambda x: codigo_para_uf.get(int(str(x)[:2]), "Desconhecido"))
-    
-    # Lista de estados disponíveis
-    states_list = sorted(df['Estado'].unique().tolist())
-    
-    # Dicionário de cidades por estado
-    cities_by_state = {}
-    for state in states_list:
-        cities_by_state[state] = df[df['Estado'] == state]['Município [-]'].unique().tolist()
-    
-    cities_data = {}
-    for _, row in df.iterrows():
-        city = row['Município [-]']
-        cities_data[city] = {
-            'basic': {
-                'Código': row['Código [-]'],
-                'Gentílico': row['Gentílico [-]'],
-                'Prefeito': row['Prefeito [2025]'],
-                'Estado': row['Estado']
-            },
-            'demographic': {
-                'Área': row['Área Territorial - km² [2024]'],
-                'População': row['População no último censo - pessoas [2022]'],
-                'Densidade': row['Densidade demográfica - hab/km² [2022]'],
-                'População_Estimada': row['População estimada - pessoas [2024]'],
-                'IDHM': row['IDHM (Índice de desenvolvimento humano municipal) [2010]']
-            },
-            'economic': {
-                'PIB': row['PIB per capita - R$ [2021]'],
-                'Receitas': row['Total de receitas brutas realizadas - R$ [2024]'],
-                'Despesas': row['Total de despesas brutas empenhadas - R$ [2024]']
-            }
-        }
-    
-    return states_list, cities_by_state, cities_data
+from aggregates import Aggregates, register_routes as register_aggregate_routes
+from cities import CityIndex
+from data import build_structures, dataset_version, field_values, load_frame
+from funds import FUNDS, NATIONAL, SORTS, FundIndex, describe, evaluate_funds, register_routes as register_fund_routes
+from geo import (GEO_CACHE, GEO_FORMAT, encoded_stats, file_reads, fit_zoom, geometry_digest, geometry_url, pick_variant,
+                 register_routes, warm_from_env)
+from geoindex import load_geometry_index
+from httpcache import register_middleware
+from metrics import cache_samples, register_routes as register_metric_routes
+from pagecache import RenderCache
+from profiling import register_routes as register_profiling_routes
+from search import SearchIndex, index_version, register_routes as register_search_routes
+from snapshot import code_digest
+
+TIMELINE.mark('imports')
+
+## 2. Carrega os dados (snapshot binário quando atualizado, senão ibge.txt);
+# com SHARED_DATA=1 (gunicorn.conf.py), CITIES_DATA é uma data.CityTable
+FRAME = load_frame()
+STATES_LIST, CITIES_BY_STATE, CITIES_DATA = build_structures(FRAME)
+DATA_VERSION = dataset_version()
+# Elegibilidade de todos os municípios em todos os fundos (funds.py)
+ELIGIBILITY = evaluate_funds(FRAME)
+# Slugs das URLs, usados já no layout (lista de cidades da página inicial)
+CITY_INDEX = CityIndex(CITIES_DATA)
+TIMELINE.mark('dados')
+
+# O que a página inicial não usa é montado depois do import, em segundo plano
+# (startup.py, DEFERRED_INIT); quem acessar antes espera. A ordem é a de
+# construção: geometria (páginas de cidade), busca, fundos e agregados
+GEOMETRY_INDEX = Deferred('geometria', load_geometry_index)
+SEARCH_INDEX = Deferred('busca', lambda: SearchIndex(CITIES_DATA, CITY_INDEX.url_for))
+FUND_INDEX = Deferred('fundos', lambda: FundIndex(ELIGIBILITY, CITIES_DATA, CITY_INDEX.url_for))
+
+# Totais, médias e percentis por UF e nacionais (aggregates.py)
+def build_aggregates():
+    aggregates = Aggregates()
+    aggregates.refresh(FRAME, ELIGIBILITY)
+    return aggregates
+
+AGGREGATES = Deferred('agregados', build_aggregates)
 
-## 2. Carrega os dados
-STATES_LIST, CITIES_BY_STATE, CITIES_DATA = load_data()
+# Lista de cidades da página inicial: 'pages' (fatias de CITY_PAGE_SIZE links) ou
+# 'virtual' (lista do estado desenhada em janela); nos dois casos a lista é
+# montada no navegador por assets/citylist.js
+CITY_LIST_MODE = os.getenv('CITY_LIST_MODE', 'pages')
+CITY_PAGE_SIZE = int(os.getenv('CITY_PAGE_SIZE', '50'))
+
+# Cache das páginas de cidade já montadas, por código (dados novos: reiniciar).
+# PRERENDER_CITIES: número N (os N municípios mais populosos) ou lista de
+# códigos separados por vírgula para montar depois do boot
+PAGE_CACHE = RenderCache(
+    max_entries=int(os.getenv('PAGE_CACHE_ENTRIES', '256')),
+    max_bytes=int(float(os.getenv('PAGE_CACHE_MB', '32')) * 1024 * 1024),
+    version=DATA_VERSION
+)
 
 ## 3. Função de formatação (Original)
 def format_value(value):
@@ -97,260 +84,268 @@ app = dash.Dash(__name__, suppress_callback_exceptions=True, external_stylesheet
     {'href': 'https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;500;700&display=swap', 'rel': 'stylesheet'}
 ])
 
+def cities_by_state_data():
+    return {
+        uf: [[nome, CITY_INDEX.url_for(code).rsplit('/', 1)[1]]
+             for code, nome in zip(codes, field_values(CITIES_DATA, 'basic', 'Município', codes))]
+        for uf, codes in CITIES_BY_STATE.items()
+    }
+
 server = app.server
+# Métricas por rota e por callback em /metrics (metrics.py), registradas antes
+# do middleware de compressão para medir os bytes que trafegam. METRICS=0 desliga
+METRICS = register_metric_routes(server, app.callback_map) if os.getenv('METRICS', '1') == '1' else None
+# Perfil de pedidos (profiling.py): PROFILE_TOKEN e/ou PROFILE_TOP; None se desligado
+PROFILER = register_profiling_routes(server, app.callback_map)
+register_routes(server)
+# A URL do índice de busca é versionada pelos dados e pelo código, sem
+# precisar do índice pronto para montar o layout
+SEARCH_INDEX_URL = register_search_routes(server, SEARCH_INDEX, version=index_version(DATA_VERSION))
+register_fund_routes(server, FUND_INDEX)
+register_aggregate_routes(server, AGGREGATES)
 
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
-    html.Div(id='page-content'),
-    # Estilos globais
-    html.Div(style={
-        'fontFamily': '"Roboto", sans-serif',
-        'color': '#333',
-        'margin': '0',
-        'minHeight': '100vh'
-    })
+    # Cidades de cada estado ({UF: [[nome, slug], ...]}), enviadas uma vez com o
+    # layout e usadas pela lista da página inicial no navegador
+    dcc.Store(id='cities-by-state', data=cities_by_state_data()),
+    html.Div(id='page-content')
 ])
 
+def city_list_controls():
+    if CITY_LIST_MODE == 'virtual':
+        return []
+
+    return [
+        dcc.Store(id='city-page', data=0),
+        dcc.Store(id='city-page-size', data=CITY_PAGE_SIZE),
+        html.Div([
+            html.Button("‹ Anterior", id='city-prev', n_clicks=0, className='pager-button'),
+            html.Span(id='city-page-label', className='pager-label'),
+            html.Button("Próxima ›", id='city-next', n_clicks=0, className='pager-button'),
+        ], id='city-pager', className='city-pager', style={'display': 'none'})
+    ]
+
+# Os estilos das páginas ficam em assets/style.css; os componentes só levam className
+def top_bar(*extra):
+    return html.Div([
+        *extra,
+        html.Span("Funds2", className='brand brand-bold'),
+        html.Span("Cities", className='brand'),
+    ], className='topbar')
+
 def home_page():
     return html.Div([
         # Barra superior (mesmo estilo das páginas de cidade)
-        html.Div([
-            html.Span("Funds2", style={
-                'color': 'white',
-                'fontWeight': 'bold',
-                'fontFamily': '"Roboto", sans-serif',
-                'fontSize': '30px'
-            }),
-            html.Span("Cities", style={
-                'color': 'white',
-                'fontFamily': '"Roboto", sans-serif',
-                'fontSize': '30px'
-            }),
-        ], style={
-            'padding': '15px 30px',
-            'borderBottom': '1px solid #ddd',
-            'backgroundColor': 'rgb(7, 29, 75)',
-            'marginBottom': '0',
-            'display': 'flex',
-            'alignItems': 'center',
-            'justifyContent': 'center'
-        }),
+        top_bar(),
         
         # Container principal
         html.Div([
             # Coluna da lista de cidades (esquerda)
             html.Div([
-                html.H1("Selecione um Estado", style={
-                    'color': 'rgb(27, 119, 155)',
-                    'fontSize': '28px',
-                    'marginBottom': '20px',
-                    'fontWeight': 'bold',
-                    'fontFamily': '"Roboto", sans-serif',
-                }),
+                html.H1("Buscar Município", className='page-title'),
+
+                # Busca feita no navegador (assets/search.js) com o índice de /search/index.json
+                dcc.Store(id='search-index-url', data=SEARCH_INDEX_URL),
+                dcc.Input(
+                    id='city-search',
+                    type='search',
+                    placeholder="Nome ou código IBGE...",
+                    autoComplete='off',
+                    className='search-input'
+                ),
+                html.Div(id='search-results', className='search-results'),
+
+                html.H1("Selecione um Estado", className='page-title'),
                 
                 dcc.Dropdown(
                     id='state-dropdown',
                     options=[{'label': state, 'value': state} for state in STATES_LIST],
                     placeholder="Selecione um estado...",
-                    style={
-                        'marginBottom': '20px',
-                        'fontFamily': '"Roboto", sans-serif'
-                    }
+                    className='state-dropdown'
                 ),
                 
-                html.H1("Selecione uma Cidade", style={
-                    'color': 'rgb(27, 119, 155)',
-                    'fontSize': '28px',
-                    'marginBottom': '20px',
-                    'fontWeight': 'bold',
-                    'fontFamily': '"Roboto", sans-serif',
-                }),
+                html.H1("Selecione uma Cidade", className='page-title'),
                 
                 html.Div(
                     id='city-buttons-container',
-                    style={
-                        'maxHeight': '60vh',
-                        'overflowY': 'auto',
-                        'paddingRight': '10px'
-                    }
-                )
-            ], style={
-                'flex': '1',
-                'padding': '30px',
-                'borderRight': '1px solid #ddd',
-                'backgroundColor': 'rgb(230, 230, 230)',
-                'marginRight': '30px'
-            }),
+                    className='city-list city-list-virtual' if CITY_LIST_MODE == 'virtual' else 'city-list'
+                ),
+
+                *(city_list_controls())
+            ], className='column-left'),
             
             # Coluna de instruções (direita)
             html.Div([
                 html.Div([
-                    html.H2("Como usar", style={
-                        'color': 'rgb(27, 119, 155)',
-                        'borderBottom': '2px solid rgb(27, 119, 155)',
-                        'paddingBottom': '5px',
-                        'marginBottom': '20px',
-                        'fontSize': '24px',
-                        'fontWeight': 'bold',
-                        'fontFamily': '"Roboto", sans-serif'
-                    }),
+                    html.H2("Como usar", className='card-title card-title-lg'),
                     
                     html.Div([
-                        html.P("1. Selecione um estado no menu suspenso", style={
-                            'color': '#555',
-                            'marginBottom': '15px',
-                            'fontSize': '18px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
-                        
-                        html.P("2. Selecione uma cidade na lista que aparecer", style={
-                            'color': '#555',
-                            'marginBottom': '15px',
-                            'fontSize': '18px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
-                        
-                        html.P("3. Visualize os dados completos do município", style={
-                            'color': '#555',
-                            'marginBottom': '15px',
-                            'fontSize': '18px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
-                        
-                        html.P("4. Verifique os fundos disponíveis para a cidade", style={
-                            'color': '#555',
-                            'marginBottom': '15px',
-                            'fontSize': '18px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
-                        
-                        html.P("5. Os ícones ✅ indicam verbas que a cidade se enquadra", style={
-                            'color': '#555',
-                            'marginBottom': '5px',
-                            'fontSize': '18px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
-                        
-                        html.P("6. Os ícones ❌ indicam verbas não disponíveis", style={
-                            'color': '#555',
-                            'fontSize': '18px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        })
-                    ], style={
-                        'padding': '20px',
-                        'backgroundColor': '#fff',
-                        'borderRadius': '8px',
-                        'boxShadow': '0 1px 3px rgba(0,0,0,0.1)'
-                    })
-                ], style={
-                    'marginBottom': '30px'
-                }),
+                        html.P("1. Selecione um estado no menu suspenso", className='step'),
+                        html.P("2. Selecione uma cidade na lista que aparecer", className='step'),
+                        html.P("3. Visualize os dados completos do município", className='step'),
+                        html.P("4. Verifique os fundos disponíveis para a cidade", className='step'),
+                        html.P("5. Os ícones ✅ indicam verbas que a cidade se enquadra", className='step'),
+                        html.P("6. Os ícones ❌ indicam verbas não disponíveis", className='step')
+                    ], className='card')
+                ], className='block'),
                 
                 html.Div([
-                    html.H2("Critérios para Fundos", style={
-                        'color': 'rgb(27, 119, 155)',
-                        'borderBottom': '2px solid rgb(27, 119, 155)',
-                        'paddingBottom': '5px',
-                        'marginBottom': '20px',
-                        'fontSize': '24px',
-                        'fontWeight': 'bold',
-                        'fontFamily': '"Roboto", sans-serif'
-                    }),
+                    html.H2("Critérios para Fundos", className='card-title card-title-lg'),
                     
                     html.Div([
-                        html.P("Verba Exemplo A:", style={
-                            'color': '#333',
-                            'fontWeight': '500',
-                            'marginBottom': '5px',
-                            'fontSize': '18px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
-                        html.P("Receitas brutas > R$ 170.000", style={
-                            'color': '#555',
-                            'marginBottom': '15px',
-                            'fontSize': '16px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
-                        
-                        html.P("Verba Exemplo B:", style={
-                            'color': '#333',
-                            'fontWeight': '500',
-                            'marginBottom': '5px',
-                            'fontSize': '18px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
-                        html.P("Despesas brutas < R$ 150.000", style={
-                            'color': '#555',
-                            'fontSize': '16px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        })
-                    ], style={
-                        'padding': '20px',
-                        'backgroundColor': '#fff',
-                        'borderRadius': '8px',
-                        'boxShadow': '0 1px 3px rgba(0,0,0,0.1)'
-                    })
+                        item
+                        for fund_id, fund in FUNDS.items()
+                        for item in (
+                            html.P(f"{fund['nome']}:", className='criterion-name'),
+                            html.P(describe(fund_id), className='criterion-rule'),
+                        )
+                    ], className='card'),
+                    dcc.Link("Ver municípios elegíveis por fundo", href=FUNDS_PAGE, className='funds-link')
                 ])
-            ], style={
-                'flex': '1',
-                'padding': '30px 30px 30px 0',
-                'backgroundColor': 'rgb(230, 230, 230)'
-            })
-        ], style={
-            'display': 'flex',
-            'maxWidth': '1250px',
-            'margin': '0 auto',
-            'backgroundColor': 'rgb(230, 230, 230)',
-            'minHeight': 'calc(100vh - 100px)'
-        })
+            ], className='column-right')
+        ], className='page-main')
     ])
 
-def city_page(city_name):
-    dados = CITIES_DATA.get(city_name)
-    if not dados:
-        return html.Div([
-            html.H1("Cidade não encontrada"),
-            html.A("Voltar", href="/")
-        ], style={'textAlign': 'center'})
+FUNDS_PAGE = '/fundos'
+FUND_PAGE_SIZE = 50
+FUND_SORT_LABELS = {
+    'nome': 'Nome',
+    'populacao': 'População estimada',
+    'receitas': 'Receitas',
+    'despesas': 'Despesas',
+    'rcl': 'RCL',
+    'dc': 'Dívida consolidada',
+}
 
-    # === CÓDIGO DO MAPA (ORIGINAL) ===
-    codigo_para_uf = {
-        11: "RO", 12: "AC", 13: "AM", 14: "RR", 15: "PA", 16: "AP", 17: "TO",
-        21: "MA", 22: "PI", 23: "CE", 24: "RN", 25: "PB", 26: "PE", 27: "AL", 28: "SE", 29: "BA",
-        31: "MG", 32: "ES", 33: "RJ", 35: "SP",
-        41: "PR", 42: "SC", 43: "RS",
-        50: "MS", 51: "MT", 52: "GO", 53: "DF"
-    }
+# Campos comparados no resumo do estado (medianas dos agregados)
+STATE_SUMMARY_FIELDS = {
+    'População_Estimada': 'População estimada',
+    'Receitas': 'Receitas (R$)',
+    'Despesas': 'Despesas (R$)',
+    'PIB': 'PIB per capita (R$)',
+}
 
-    citycode = dados['basic']['Código']
-    codigo_estado = int(str(citycode)[:2])
-    uf = codigo_para_uf.get(codigo_estado, "Desconhecido")
+def funds_page():
+    # Municípios elegíveis (ou não) a cada fundo, por estado, a partir de FUND_INDEX
+    return html.Div([
+        top_bar(html.A("Voltar", href="/", className='back-link')),
+        html.Div([
+            html.Div([
+                html.H1("Municípios por Fundo", className='page-title'),
+                html.Div([
+                    dcc.Dropdown(
+                        id='fund-dropdown',
+                        options=[{'label': fund['nome'], 'value': fund_id} for fund_id, fund in FUNDS.items()],
+                        value=next(iter(FUNDS)),
+                        clearable=False,
+                        className='state-dropdown'
+                    ),
+                    dcc.Dropdown(
+                        id='fund-state-dropdown',
+                        options=[{'label': 'Brasil', 'value': NATIONAL}] +
+                                [{'label': uf, 'value': uf} for uf in FUND_INDEX.ufs()],
+                        value=NATIONAL,
+                        clearable=False,
+                        className='state-dropdown'
+                    ),
+                    dcc.RadioItems(
+                        id='fund-status',
+                        options=[{'label': 'Elegíveis', 'value': 'eligible'},
+                                 {'label': 'Não elegíveis', 'value': 'ineligible'}],
+                        value='eligible',
+                        inline=True,
+                        className='fund-filter'
+                    ),
+                    dcc.Dropdown(
+                        id='fund-sort',
+                        options=[{'label': FUND_SORT_LABELS[sort], 'value': sort} for sort in SORTS],
+                        value='nome',
+                        clearable=False,
+                        className='state-dropdown'
+                    ),
+                    dcc.RadioItems(
+                        id='fund-order',
+                        options=[{'label': 'Crescente', 'value': 'asc'},
+                                 {'label': 'Decrescente', 'value': 'desc'}],
+                        value='asc',
+                        inline=True,
+                        className='fund-filter'
+                    ),
+                ]),
+                html.Div(id='fund-summary', className='card'),
+            ], className='column-left'),
+            html.Div([
+                html.Div(id='fund-results', className='card'),
+                dcc.Store(id='fund-page', data=0),
+                html.Div([
+                    html.Button("‹ Anterior", id='fund-prev', n_clicks=0, className='pager-button'),
+                    html.Span(id='fund-page-label', className='pager-label'),
+                    html.Button("Próxima ›", id='fund-next', n_clicks=0, className='pager-button'),
+                ], className='city-pager', style={'display': 'flex'})
+            ], className='column-right')
+        ], className='page-main')
+    ])
 
-    with open(f'cityjsons/{uf}.json', 'r', encoding='utf-8') as f:
-        estado_geojson = json.load(f)
+def not_found_page():
+    return html.Div([
+        html.H1("Cidade não encontrada"),
+        html.A("Voltar", href="/")
+    ], className='message-page')
 
-    cidade_feature = None
-    for feature in estado_geojson['features']:
-        if feature['properties']['id'] == str(citycode):
-            cidade_feature = {
-                "type": "FeatureCollection",
-                "features": [feature]
-            }
-            break
+def choose_city_page(codes):
+    # Mesmo nome em mais de um estado: lista as opções
+    return html.Div([
+        html.H1("Mais de um município com esse nome"),
+        *[html.P(html.A(
+            f"{CITIES_DATA[code]['basic']['Município']} ({CITIES_DATA[code]['basic']['Estado']})",
+            href=CITY_INDEX.url_for(code)
+        )) for code in codes],
+        html.A("Voltar", href="/")
+    ], className='message-page')
+
+def fund_status(elegivel):
+    return html.Span("✅" if elegivel else "❌", className='fund-status ok' if elegivel else 'fund-status fail')
+
+def city_page(citycode):
+    dados = CITY_INDEX.get(citycode)
+    if not dados:
+        return not_found_page()
+    city_name = dados['basic']['Município']
 
+    # === CÓDIGO DO MAPA (ORIGINAL) ===
+    uf = dados['basic']['Estado']
+
+    # Centro, enquadramento e escolha da variante vêm do índice de geometria
+    # (geoindex.py). A geometria do estado é baixada pelo navegador a partir de
+    # /geo (geo.py), na variante simplificada mais leve que ainda tem detalhe
+    # para o zoom de enquadramento; só a feature da cidade vai no layout
     center = [-15.7, -47.8]  # Fallback
-    if cidade_feature and cidade_feature['features'][0]['geometry']['coordinates']:
-        first_point = cidade_feature['features'][0]['geometry']['coordinates'][0][0]
-        center = [first_point[1], first_point[0]]
+    bounds = None
+    variante = None
+    if citycode in GEOMETRY_INDEX:
+        center = GEOMETRY_INDEX.centroid(citycode)
+        bounds = GEOMETRY_INDEX.bounds(citycode)
+        variante = pick_variant(fit_zoom(GEOMETRY_INDEX.bbox(citycode)))
+    feature = GEO_CACHE.feature(citycode, uf, variante)
+
+    cidade_feature = None
+    if feature:
+        cidade_feature = {
+            "type": "FeatureCollection",
+            "features": [feature]
+        }
 
     mapa = dl.Map(
         center=center,
         zoom=8,
+        **({'bounds': bounds} if bounds else {}),
         children=[
             dl.TileLayer(),
             dl.GeoJSON(
                 id="estado-geojson",
-                data=estado_geojson,
+                url=geometry_url(uf, variante),
+                format=GEO_FORMAT,
                 style={
                     "weight": 1,
                     "color": "#4a4a4a",
@@ -371,8 +366,7 @@ def city_page(city_name):
                     "color": "#d62728",
                     "fillOpacity": 0.7,
                     "fillColor": "#d62728"
-                },
-                zoomToBounds=True
+                }
             )] if cidade_feature else []),
             *([dl.Marker(
                 position=center,
@@ -382,377 +376,171 @@ def city_page(city_name):
                 ]
             )] if not cidade_feature else [])
         ],
-        style={
-            'height': '70vh',  # Aumentado de 60vh para 70vh
-            'width': '100%',
-            'borderRadius': '8px',
-            'boxShadow': '0 2px 4px rgba(0,0,0,0.1)'
-        }
+        className='city-map'
     )
     # === FIM DO CÓDIGO DO MAPA ===
 
     return html.Div([
         # Barra superior
-        html.Div([
-            html.A("Voltar", href="/", style={
-                'color': 'white',
-                'fontWeight': 'bold',
-                'textDecoration': 'none',
-                'marginRight': '20px',
-                'position': 'absolute',  # Posiciona absolutamente
-                'left': '20px',
-                'fontFamily': '"Roboto", sans-serif',
-            }),
-            html.Span("Funds2", style={
-                'color': 'white',
-                'fontWeight': 'bold',
-                'fontFamily': '"Roboto", sans-serif',
-                'fontSize': '30px'
-            }),
-            html.Span("Cities", style={
-                'color': 'white',
-                'fontFamily': '"Roboto", sans-serif',
-                'fontSize': '30px'
-            }),
-        ], style={
-            'padding': '15px 30px',
-            'borderBottom': '1px solid #ddd',
-            'backgroundColor': 'rgb(7, 29, 75)',
-            'marginBottom': '0',
-            'position': 'relative',  # Container relativo para posicionamento absoluto interno
-            'display': 'flex',
-            'alignItems': 'center',
-            'justifyContent': 'center'  # Centraliza horizontalmente
-        }),
+        top_bar(html.A("Voltar", href="/", className='back-link')),
         
         # Container principal
         html.Div([
             # Coluna de informações (esquerda)
             html.Div([
-                html.H1(city_name, style={
-                    'color': 'rgb(27, 119, 155)',
-                    'fontSize': '28px',
-                    'marginBottom': '10px',
-                    'fontWeight': 'bold',
-                    'fontFamily': '"Roboto", sans-serif',
-                }),
+                html.H1(city_name, className='page-title city-title'),
                 
                 html.Div([
-                    html.Span(f"Código do Município: {citycode}", style={
-                        'color': '#555',
-                        'marginRight': '20px',
-                        'fontWeight': '300',
-                        'fontFamily': '"Roboto", sans-serif',
-                    }),
-                    html.Span(f"Gentílico: {dados['basic']['Gentílico'].lower()}", style={
-                        'color': '#555',
-                        'marginRight': '20px',
-                        'fontWeight': '300',
-                        'fontFamily': '"Roboto", sans-serif',
-                    }),
-                    html.Span(f"Estado: {uf}", style={
-                        'color': '#555',
-                        'fontWeight': '300',
-                        'fontFamily': '"Roboto", sans-serif',
-                    }),
-                ], style={'marginBottom': '15px'}),
+                    html.Span(f"Código do Município: {citycode}", className='meta'),
+                    html.Span(f"Gentílico: {dados['basic']['Gentílico'].lower()}", className='meta'),
+                    html.Span(f"Estado: {uf}", className='meta'),
+                ], className='meta-row'),
                 
                 html.Div([
-                    html.Span(f"Prefeito: {dados['basic']['Prefeito'].title()}", style={
-                        'color': '#333',
-                        'fontFamily': '"Roboto", sans-serif',
-                    })
-                ], style={'marginBottom': '30px'}),
+                    html.Span(f"Prefeito: {dados['basic']['Prefeito'].title()}")
+                ], className='mayor-row'),
 
                 # Seção FUNDOS
                 html.Div([
-                    html.H2("FUNDOS", style={
-                        'color': 'rgb(27, 119, 155)',
-                        'borderBottom': '2px solid rgb(27, 119, 155)',
-                        'paddingBottom': '5px',
-                        'marginBottom': '20px',
-                        'fontSize': '20px',
-                        'fontWeight': 'bold',
-                        'fontFamily': '"Roboto", sans-serif'
-                    }),
+                    html.H2("FUNDOS", className='card-title'),
                     
                     html.Div([
-                        # Verba Exemplo A
-                        html.Div([
-                            html.P("Verba Exemplo A:", style={
-                                'color': '#555',
-                                'marginBottom': '5px',
-                                'fontWeight': '300',
-                                'fontFamily': '"Roboto", sans-serif',
-                                'fontSize': '20px',
-                                'display': 'inline-block',
-                                'marginRight': '10px'
-                            }),
-                            html.Span(
-                                "✅" if dados['economic']['Receitas'] > 170000 else "❌",
-                                style={
-                                    'color': 'green' if dados['economic']['Receitas'] > 170000 else 'red',
-                                    'fontSize': '20px'
-                                }
-                            ),
-                            html.P("(Receita > R$ 170.000)", style={
-                                'color': '#555',
-                                'fontWeight': '300',
-                                'fontFamily': '"Roboto", sans-serif',
-                                'fontSize': '16px',
-                                'marginTop': '5px'
-                            })
-                        ], style={'marginBottom': '15px'}),
-                        
-                        # Verba Exemplo B
                         html.Div([
-                            html.P("Verba Exemplo B:", style={
-                                'color': '#555',
-                                'marginBottom': '5px',
-                                'fontWeight': '300',
-                                'fontFamily': '"Roboto", sans-serif',
-                                'fontSize': '20px',
-                                'display': 'inline-block',
-                                'marginRight': '10px'
-                            }),
-                            html.Span(
-                                "✅" if dados['economic']['Despesas'] < 150000 else "❌",
-                                style={
-                                    'color': 'green' if dados['economic']['Despesas'] < 150000 else 'red',
-                                    'fontSize': '20px'
-                                }
-                            ),
-                            html.P("(Despesas < R$ 150.000)", style={
-                                'color': '#555',
-                                'fontWeight': '300',
-                                'fontFamily': '"Roboto", sans-serif',
-                                'fontSize': '16px',
-                                'marginTop': '5px'
-                            })
-                        ])
+                            html.P(f"{FUNDS[fund_id]['nome']}:", className='fund-name'),
+                            fund_status(elegivel),
+                            html.P(f"({describe(fund_id)})", className='fund-rule')
+                        ], className='fund')
+                        for fund_id, elegivel in ELIGIBILITY.funds_for(citycode)
                     ])
-                ], style={
-                    'backgroundColor': '#fff',
-                    'padding': '20px',
-                    'borderRadius': '8px',
-                    'marginBottom': '30px',
-                    'boxShadow': '0 1px 3px rgba(0,0,0,0.1)'
-                }),
+                ], className='card'),
                 
                 # Seção POPULAÇÃO
                 html.Div([
-                    html.H2("POPULAÇÃO", style={
-                        'color': 'rgb(27, 119, 155)',
-                        'borderBottom': '2px solid rgb(27, 119, 155)',
-                        'paddingBottom': '5px',
-                        'marginBottom': '20px',
-                        'fontSize': '20px',
-                        'fontWeight': 'bold',
-                        'fontFamily': '"Roboto", sans-serif',
-                    }),
+                    html.H2("POPULAÇÃO", className='card-title'),
                     
                     html.Div([
-                        html.P("População no último censo [2022]:", style={
-                            'color': '#555',
-                            'marginBottom': '5px',
-                            'fontWeight': '300',
-                            'fontFamily': '"Roboto", sans-serif',
-                            'fontSize': '20px'
-                        }),
-                        html.P(f"{format_value(dados['demographic']['População'])} pessoas", style={
-                            'fontWeight': '400',
-                            'fontSize': '18px',
-                            'color': '#333',
-                            'marginBottom': '20px',
-                            'fontFamily': '"Roboto", sans-serif',
-                        }),
+                        html.P("População no último censo [2022]:", className='stat-label'),
+                        html.P(f"{format_value(dados['demographic']['População'])} pessoas", className='stat-value'),
                         
-                        html.P("População estimada [2024]:", style={
-                            'color': '#555',
-                            'marginBottom': '5px',
-                            'fontWeight': '300',
-                            'fontFamily': '"Roboto", sans-serif',
-                            'fontSize': '20px'
-                        }),
-                        html.P(f"{format_value(dados['demographic']['População_Estimada'])} pessoas", style={
-                            'fontWeight': '400',
-                            'fontSize': '18px',
-                            'color': '#333',
-                            'marginBottom': '20px',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
+                        html.P("População estimada [2024]:", className='stat-label'),
+                        html.P(f"{format_value(dados['demographic']['População_Estimada'])} pessoas", className='stat-value'),
                         
-                        html.P("Densidade demográfica [2022]:", style={
-                            'color': '#555',
-                            'marginBottom': '5px',
-                            'fontWeight': '300',
-                            'fontFamily': '"Roboto", sans-serif',
-                            'fontSize': '20px'
-                        }),
-                        html.P(f"{format_value(dados['demographic']['Densidade'])} hab/km²", style={
-                            'fontWeight': '400',
-                            'fontSize': '18px',
-                            'color': '#333',
-                            'fontFamily': '"Roboto", sans-serif'
-                        })
+                        html.P("Densidade demográfica [2022]:", className='stat-label'),
+                        html.P(f"{format_value(dados['demographic']['Densidade'])} hab/km²", className='stat-value')
                     ])
-                ], style={
-                    'backgroundColor': '#fff',
-                    'padding': '20px',
-                    'borderRadius': '8px',
-                    'marginBottom': '30px',
-                    'boxShadow': '0 1px 3px rgba(0,0,0,0.1)'
-                }),
+                ], className='card'),
                 
                 # Seção TRABALHO E RENDIMENTO
                 html.Div([
-                    html.H2("TRABALHO E RENDIMENTO", style={
-                        'color': 'rgb(27, 119, 155)',
-                        'borderBottom': '2px solid rgb(27, 119, 155)',
-                        'paddingBottom': '5px',
-                        'marginBottom': '20px',
-                        'fontSize': '20px',
-                        'fontWeight': 'bold',
-                        'fontFamily': '"Roboto", sans-serif'
-                    }),
+                    html.H2("TRABALHO E RENDIMENTO", className='card-title'),
                     
                     html.Div([
-                        html.P("PIB per capita [2021]:", style={
-                            'color': '#555',
-                            'marginBottom': '5px',
-                            'fontWeight': '300',
-                            'fontFamily': '"Roboto", sans-serif',
-                            'fontSize': '20px'
-                        }),
-                        html.P(f"R$ {format_value(dados['economic']['PIB'])}", style={
-                            'fontWeight': '400',
-                            'fontSize': '18px',
-                            'color': '#333',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
+                        html.P("PIB per capita [2021]:", className='stat-label'),
+                        html.P(f"R$ {format_value(dados['economic']['PIB'])}", className='stat-value'),
                         
-                        html.P("Receitas [2024]:", style={
-                            'color': '#555',
-                            'marginBottom': '5px',
-                            'fontWeight': '300',
-                            'fontFamily': '"Roboto", sans-serif',
-                            'fontSize': '20px'
-                        }),
-                        html.P(f"R$ {format_value(dados['economic']['Receitas'])}", style={
-                            'fontWeight': '400',
-                            'fontSize': '18px',
-                            'color': '#333',
-                            'fontFamily': '"Roboto", sans-serif'
-                        }),
+                        html.P("Receitas [2024]:", className='stat-label'),
+                        html.P(f"R$ {format_value(dados['economic']['Receitas'])}", className='stat-value'),
                         
-                        html.P("Despesas [2024]:", style={
-                            'color': '#555',
-                            'marginBottom': '5px',
-                            'fontWeight': '300',
-                            'fontFamily': '"Roboto", sans-serif',
-                            'fontSize': '20px'
-                        }),
-                        html.P(f"R$ {format_value(dados['economic']['Despesas'])}", style={
-                            'fontWeight': '400',
-                            'fontSize': '18px',
-                            'color': '#333',
-                            'fontFamily': '"Roboto", sans-serif'
-                        })
-                    ])
-                ], style={
-                    'backgroundColor': '#fff',
-                    'padding': '20px',
-                    'borderRadius': '8px',
-                    'boxShadow': '0 1px 3px rgba(0,0,0,0.1)'
-                })
-            ], style={
-                'flex': '1',
-                'padding': '20px 30px 20px 20px',  # Mais padding à esquerda
-                'borderRight': '1px solid #ddd',
-                'backgroundColor': 'rgb(230, 230, 230)',
-                'marginRight': '30px'
-            }),
+                        html.P("Despesas [2024]:", className='stat-label'),
+                        html.P(f"R$ {format_value(dados['economic']['Despesas'])}", className='stat-value')
+                    ], className='stats-compact')
+                ], className='card')
+            ], className='column-left'),
             
             # Coluna do mapa (direita)
             html.Div([
                 mapa
-            ], style={
-                'flex': '1',
-                'padding': '20px 30px 20px 0',  # Ajuste de padding
-                'minWidth': '0'  # Permite que o mapa ocupe mais espaço
-            })
-        ], style={
-            'display': 'flex',
-            'maxWidth': '1250px',
-            'margin': '0 auto 30px auto',  # Adicionado margin-bottom de 30px
-            'backgroundColor': 'rgb(230, 230, 230)',
-            'minHeight': 'calc(100vh - 100px)',  # Ajuste conforme necessário
-            'overflow': 'hidden'  # Opcional: evita vazamento do conteúdo
-        })
-    ], style={
-        'paddingBottom': '0px'  # Remove padding extra
-    })
-
-# Novo callback para atualizar a lista de cidades com base no estado selecionado
-# Callback para atualizar a lista de cidades
-@app.callback(
-    Output('city-buttons-container', 'children'),
-    Input('state-dropdown', 'value')
+            ], className='column-right')
+        ], className='page-main city-main')
+    ])
+
+# Sugestões da busca, calculadas no navegador a cada tecla
+app.clientside_callback(
+    ClientsideFunction(namespace='search', function_name='suggest'),
+    Output('search-results', 'children'),
+    Input('city-search', 'value'),
+    State('search-index-url', 'data')
 )
-def update_city_buttons(selected_state):
-    if not selected_state:
-        return []
-    
-    cities = CITIES_BY_STATE.get(selected_state, [])
-    
-    return [html.Button(
-        city, 
-        id={'type': 'city-btn', 'index': city},
-        n_clicks=0,
-        style={
-            'display': 'block',
-            'width': '100%',
-            'padding': '12px 15px',
-            'margin': '8px 0',
-            'border': '1px solid #ddd',
-            'backgroundColor': '#fff',
-            'color': '#333',
-            'fontWeight': '400',
-            'borderRadius': '4px',
-            'cursor': 'pointer',
-            'textAlign': 'left',
-            'transition': 'all 0.3s',
-            'fontFamily': '"Roboto", sans-serif',
-            ':hover': {
-                'backgroundColor': '#f0f7ff',
-                'borderColor': '#1351B4',
-                'transform': 'translateY(-2px)'
-            }
-        })
-        for city in cities]
-
-# Callback de navegação simplificado
-# Callback para navegação corrigido
+
+# Lista de cidades da página inicial, montada no navegador (assets/citylist.js)
+# a partir do dcc.Store 'cities-by-state'; os itens são links comuns, então
+# escolher estado, trocar de página e navegar não passam pelo servidor
+if CITY_LIST_MODE == 'virtual':
+    app.clientside_callback(
+        ClientsideFunction(namespace='citylist', function_name='render'),
+        Output('city-buttons-container', 'data-rendered'),
+        Input('state-dropdown', 'value'),
+        State('cities-by-state', 'data')
+    )
+else:
+    app.clientside_callback(
+        ClientsideFunction(namespace='citylist', function_name='page'),
+        Output('city-buttons-container', 'children'),
+        Output('city-page', 'data'),
+        Output('city-page-label', 'children'),
+        Output('city-pager', 'style'),
+        Input('state-dropdown', 'value'),
+        Input('city-prev', 'n_clicks'),
+        Input('city-next', 'n_clicks'),
+        State('city-page', 'data'),
+        State('cities-by-state', 'data'),
+        State('city-page-size', 'data')
+    )
+
+# Lista da página /fundos: só a página pedida sai do índice pré-ordenado
 @app.callback(
-    Output('url', 'pathname'),
-    Input({'type': 'city-btn', 'index': dash.ALL}, 'n_clicks'),
-    prevent_initial_call=True
+    Output('fund-summary', 'children'),
+    Output('fund-results', 'children'),
+    Output('fund-page', 'data'),
+    Output('fund-page-label', 'children'),
+    Input('fund-dropdown', 'value'),
+    Input('fund-state-dropdown', 'value'),
+    Input('fund-status', 'value'),
+    Input('fund-sort', 'value'),
+    Input('fund-order', 'value'),
+    Input('fund-prev', 'n_clicks'),
+    Input('fund-next', 'n_clicks'),
+    State('fund-page', 'data')
 )
-def navigate(clicks):
-    ctx = dash.callback_context
-    if not ctx.triggered or not any(clicks):
-        return dash.no_update
-    
-    # Encontra qual botão foi clicado
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    
-    try:
-        # Converte a string do ID para dicionário
-        button_id_dict = eval(button_id)
-        city_name = button_id_dict['index']
-        return f'/{city_name}'
-    except:
-        return dash.no_update
+def update_fund_list(fund_id, uf, status, sort, order, _prev, _next, page):
+    # Troca de filtro volta para a primeira página
+    triggered = dash.callback_context.triggered_id
+    if triggered == 'fund-prev':
+        page = (page or 0) - 1
+    elif triggered == 'fund-next':
+        page = (page or 0) + 1
+    else:
+        page = 0
+
+    counts = FUND_INDEX.counts(fund_id, uf)
+    resumo = AGGREGATES.summary(uf)
+    n_pages = max(1, -(-counts[status] // FUND_PAGE_SIZE))
+    page = min(max(page, 0), n_pages - 1)
+    resultado = FUND_INDEX.query(fund_id, uf, status, sort, order == 'desc',
+                                 page * FUND_PAGE_SIZE, FUND_PAGE_SIZE)
+
+    local = 'Brasil' if uf == NATIONAL else uf
+    summary = [
+        html.H2(f"{FUNDS[fund_id]['nome']} — {local}", className='card-title'),
+        html.P(describe(fund_id), className='criterion-rule'),
+        html.P(f"Total de municípios: {resumo['municipios']}", className='stat-label'),
+        html.P(f"Municípios elegíveis: {resumo['eligible'][fund_id]}", className='fund-status ok'),
+        html.H2("Medianas" if uf == NATIONAL else f"Medianas — {uf} x Brasil", className='card-title'),
+        *[html.P(
+            f"{rotulo}: {format_value(AGGREGATES.stat(uf, campo, 'p50'))}" +
+            ("" if uf == NATIONAL else f" (Brasil: {format_value(AGGREGATES.stat(NATIONAL, campo, 'p50'))})"),
+            className='meta-row')
+          for campo, rotulo in STATE_SUMMARY_FIELDS.items()],
+    ]
+    itens = [
+        html.Div([
+            dcc.Link(f"{item['name']} ({item['uf']})", href=item['url'], className='fund-city-name'),
+            html.Span(' · '.join(f"{campo}: {format_value(valor) if valor is not None else 'N/D'}"
+                                 for campo, valor in item['values'].items()), className='meta'),
+        ], className='fund-city ' + ('ok' if status == 'eligible' else 'fail'))
+        for item in resultado['items']
+    ] or [html.P("Nenhum município", className='stat-label')]
+    return summary, itens, page, f"Página {page + 1} de {n_pages}"
 
 @app.callback(
     Output('page-content', 'children'),
@@ -761,9 +549,71 @@ def navigate(clicks):
 def display_page(pathname):
     if not pathname or pathname == '/':
         return home_page()
+    if pathname.rstrip('/') == FUNDS_PAGE:
+        return funds_page()
     
-    city_name = unquote(pathname[1:])
-    return city_page(city_name)
+    codes = CITY_INDEX.resolve(unquote(pathname))
+    if not codes:
+        return not_found_page()
+    if len(codes) > 1:
+        return choose_city_page(codes)
+    # Pedido perfilado pelo token: monta a página de novo, sem o cache
+    if PROFILER is not None and PROFILER.forced():
+        return city_page(codes[0])
+    return PAGE_CACHE.get_or_render(codes[0], lambda: city_page(codes[0]))
+
+## Compressão e ETags (httpcache.py). Os callbacks de páginas e da lista de
+# fundos são determinísticos: a resposta depende só dos inputs e da versão
+# abaixo (dados, regras dos fundos, geometria, o código de todos os módulos do
+# app e as versões dos pacotes que montam as páginas, e a configuração do
+# layout). HTTP_MIDDLEWARE=0 desliga (ex.: atrás de um proxy que já comprime)
+CALLBACK_VERSION = hashlib.sha256(repr((
+    DATA_VERSION, ELIGIBILITY.version, geometry_digest(),
+    code_digest(os.path.dirname(os.path.abspath(__file__)), ('dash', 'dash-leaflet', 'plotly', 'pandas', 'numpy')),
+    CITY_LIST_MODE, CITY_PAGE_SIZE, GEO_FORMAT,
+)).encode('utf-8')).hexdigest()[:16]
+CACHEABLE_CALLBACKS = [output for output in app.callback_map
+                       if 'page-content.children' in output or 'fund-results.children' in output]
+COMPRESSED_CACHE = None
+if os.getenv('HTTP_MIDDLEWARE', '1') == '1':
+    COMPRESSED_CACHE = register_middleware(server, CALLBACK_VERSION, CACHEABLE_CALLBACKS,
+                                           cache_mb=float(os.getenv('COMPRESSED_CACHE_MB', '32')))
+
+def prerender_from_env():
+    valor = os.getenv('PRERENDER_CITIES', '').strip()
+    if not valor:
+        return
+    if valor.isdigit():
+        codes = SEARCH_INDEX.codes[:int(valor)]  # já ordenados por população
+    else:
+        codes = [code.strip() for code in valor.split(',') if code.strip() in CITIES_DATA]
+    PAGE_CACHE.prerender(codes, city_page)
+
+# Contadores dos caches do processo
+@server.route('/stats/cache')
+def cache_stats():
+    return {'geojson': GEO_CACHE.stats(), 'pages': PAGE_CACHE.stats()}
+
+# Caches e leituras de geometria em /metrics, calculados a cada leitura
+def metric_samples():
+    amostras = (cache_samples('geojson', GEO_CACHE.stats()) + cache_samples('pages', PAGE_CACHE.stats())
+                + cache_samples('geo_encoded', encoded_stats()))
+    if COMPRESSED_CACHE is not None:
+        amostras += cache_samples('compressed', COMPRESSED_CACHE.stats())
+    for arquivo, total in sorted(file_reads().items()):
+        variante, nome = os.path.split(arquivo)
+        amostras.append(('f2c_geojson_file_reads_total', 'counter', 'Leituras de arquivos de geometria do disco.',
+                         {'estado': nome[:2], 'variante': variante or 'full', 'arquivo': arquivo}, total))
+    return amostras
+
+if METRICS is not None:
+    METRICS.add_collector(metric_samples)
+
+# Linha do tempo do boot em /stats/startup; os adiados começam a ser montados
+# aqui (ou nos workers, com DEFERRED_INIT=fork), seguidos do aquecimento dos caches
+register_startup_routes(server)
+TIMELINE.mark('app importado')
+start_deferred(after=(warm_from_env, prerender_from_env))
 
 if __name__ == '__main__':
-    app.run(debug=False)
\ No newline at end of file
+    app.run(debug=False)
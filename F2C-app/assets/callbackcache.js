@@ -0,0 +1,88 @@
+/* Revalidação dos callbacks determinísticos (ver httpcache.py).
+
+   O navegador não guarda nem revalida respostas de POST. Este wrapper de
+   window.fetch guarda, por corpo do pedido, as respostas de
+   /_dash-update-component que vieram com ETag e, no pedido seguinte igual,
+   manda If-None-Match; um 304 é devolvido ao Dash como a resposta guardada.
+   As respostas ficam em memória e em sessionStorage (valem enquanto a aba
+   estiver aberta, inclusive após recarregar a página).
+
+   Com ?profile=<token> na URL da página (ver profiling.py), os callbacks
+   levam o token no cabeçalho X-Profile-Token e não são revalidados, para
+   que o servidor execute e perfile cada um. */
+(function () {
+    var ROTA = '_dash-update-component';
+    var PREFIXO = 'f2c-cb:';
+    var MAX_ENTRADAS = 64;
+    var memoria = new Map();
+    var fetchOriginal = window.fetch.bind(window);
+    var tokenPerfil = new URLSearchParams(window.location.search).get('profile');
+
+    function le(chave) {
+        if (memoria.has(chave)) {
+            return memoria.get(chave);
+        }
+        try {
+            var salvo = window.sessionStorage.getItem(PREFIXO + chave);
+            return salvo ? JSON.parse(salvo) : null;
+        } catch (e) {
+            return null;
+        }
+    }
+
+    function grava(chave, entrada) {
+        memoria.delete(chave);
+        memoria.set(chave, entrada);
+        if (memoria.size > MAX_ENTRADAS) {
+            var antiga = memoria.keys().next().value;
+            memoria.delete(antiga);
+            try {
+                window.sessionStorage.removeItem(PREFIXO + antiga);
+            } catch (e) { /* sem sessionStorage */ }
+        }
+        try {
+            window.sessionStorage.setItem(PREFIXO + chave, JSON.stringify(entrada));
+        } catch (e) { /* cota cheia: fica só em memória */ }
+    }
+
+    function responde(corpo) {
+        return new Response(corpo, {
+            status: 200,
+            headers: {'Content-Type': 'application/json'}
+        });
+    }
+
+    window.fetch = function (url, opcoes) {
+        var caminho = typeof url === 'string' ? url : (url && url.url) || '';
+        if (!opcoes || opcoes.method !== 'POST' || typeof opcoes.body !== 'string' ||
+                caminho.indexOf(ROTA) === -1) {
+            return fetchOriginal(url, opcoes);
+        }
+        if (tokenPerfil) {
+            var cabecalhos = new Headers(opcoes.headers || {});
+            cabecalhos.set('X-Profile-Token', tokenPerfil);
+            return fetchOriginal(url, Object.assign({}, opcoes, {headers: cabecalhos}));
+        }
+        var chave = opcoes.body;
+        var guardada = le(chave);
+        if (guardada) {
+            var headers = new Headers(opcoes.headers || {});
+            headers.set('If-None-Match', guardada.etag);
+            opcoes = Object.assign({}, opcoes, {headers: headers});
+        }
+        return fetchOriginal(url, opcoes).then(function (resposta) {
+            if (resposta.status === 304 && guardada) {
+                grava(chave, guardada);
+                return responde(guardada.corpo);
+            }
+            var etag = resposta.headers.get('ETag');
+            if (resposta.status !== 200 || !etag) {
+                return resposta;
+            }
+            return resposta.clone().text().then(function (corpo) {
+                grava(chave, {etag: etag, corpo: corpo});
+                return resposta;
+            });
+        });
+    };
+})();
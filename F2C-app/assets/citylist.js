@@ -0,0 +1,109 @@
+// Lista de cidades da página inicial, montada no navegador a partir do
+// dcc.Store 'cities-by-state' ({UF: [[nome, slug], ...]}), sem chamar o servidor.
+//   page:   modo paginado, devolve uma fatia de dcc.Link
+//   render: modo virtual (CITY_LIST_MODE=virtual), só as linhas visíveis, mais
+//           uma margem, existem no DOM; o contêiner mantém a altura total da lista
+(function () {
+    var ALTURA_LINHA = 54;  // 46px do botão + 8px de margem
+    var MARGEM = 10;        // linhas extras acima e abaixo da janela
+    var POR_PAGINA = 50;    // mesmo padrão de CITY_PAGE_SIZE
+
+    function cidades(uf, dados) {
+        var url = '/' + String(uf).toLowerCase() + '/';
+        return ((dados || {})[uf] || []).map(function (linha) {
+            return [linha[0], url + linha[1]];
+        });
+    }
+
+    function desenha(container) {
+        var estado = container._cityList;
+        var inicio = Math.max(0, Math.floor(container.scrollTop / ALTURA_LINHA) - MARGEM);
+        var fim = Math.min(estado.linhas.length,
+            Math.ceil((container.scrollTop + container.clientHeight) / ALTURA_LINHA) + MARGEM);
+        if (inicio === estado.inicio && fim === estado.fim) {
+            return;
+        }
+        estado.inicio = inicio;
+        estado.fim = fim;
+
+        var janela = document.createDocumentFragment();
+        for (var i = inicio; i < fim; i++) {
+            var linha = estado.linhas[i];
+            var a = document.createElement('a');
+            a.className = 'city-link city-row';
+            a.href = linha[1];
+            a.textContent = linha[0];
+            a.style.top = (i * ALTURA_LINHA) + 'px';
+            janela.appendChild(a);
+        }
+        estado.janela.replaceChildren(janela);
+    }
+
+    function navega(evento) {
+        var alvo = evento.target.closest('a.city-row');
+        if (!alvo || evento.ctrlKey || evento.metaKey || evento.shiftKey || evento.button !== 0) {
+            return;
+        }
+        // Mesma navegação sem recarregar usada pelo dcc.Link
+        evento.preventDefault();
+        window.history.pushState({}, '', alvo.getAttribute('href'));
+        window.dispatchEvent(new CustomEvent('_dashprivate_pushstate'));
+        window.scrollTo(0, 0);
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        citylist: {
+            page: function (uf, _anterior, _proxima, pagina, dados, tamanho) {
+                if (!uf) {
+                    return [[], 0, '', {display: 'none'}];
+                }
+                // Troca de estado volta para a primeira página
+                var disparo = (window.dash_clientside.callback_context.triggered || [])
+                    .map(function (t) { return t.prop_id; });
+                if (disparo.indexOf('city-prev.n_clicks') >= 0) {
+                    pagina = (pagina || 0) - 1;
+                } else if (disparo.indexOf('city-next.n_clicks') >= 0) {
+                    pagina = (pagina || 0) + 1;
+                } else {
+                    pagina = 0;
+                }
+
+                var linhas = cidades(uf, dados);
+                tamanho = tamanho || POR_PAGINA;
+                var paginas = Math.max(1, Math.ceil(linhas.length / tamanho));
+                pagina = Math.min(Math.max(pagina, 0), paginas - 1);
+                var links = linhas.slice(pagina * tamanho, (pagina + 1) * tamanho).map(function (linha) {
+                    return {
+                        type: 'Link',
+                        namespace: 'dash_core_components',
+                        props: {children: linha[0], href: linha[1], className: 'city-link'}
+                    };
+                });
+                var estilo = {display: paginas > 1 ? 'flex' : 'none'};
+                return [links, pagina, 'Página ' + (pagina + 1) + ' de ' + paginas, estilo];
+            },
+
+            render: function (uf, dados) {
+                var linhas = uf ? cidades(uf, dados) : [];
+                var container = document.getElementById('city-buttons-container');
+                if (!container) {
+                    return window.dash_clientside.no_update;
+                }
+                if (!container._cityList) {
+                    var janela = document.createElement('div');
+                    container.appendChild(janela);
+                    container._cityList = {janela: janela};
+                    container.addEventListener('scroll', function () { desenha(container); });
+                    container.addEventListener('click', navega);
+                }
+                var estado = container._cityList;
+                estado.linhas = linhas || [];
+                estado.inicio = estado.fim = -1;
+                estado.janela.style.height = (estado.linhas.length * ALTURA_LINHA) + 'px';
+                container.scrollTop = 0;
+                desenha(container);
+                return String(estado.linhas.length);
+            }
+        }
+    });
+})();
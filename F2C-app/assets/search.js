@@ -0,0 +1,160 @@
+// Busca de municípios no navegador: as mesmas estruturas e faixas de
+// search.SearchIndex, montadas uma vez a partir do export do índice
+(function () {
+    var indice = null;
+
+    function normaliza(texto) {
+        return texto.normalize('NFKD').replace(/[\u0300-\u036f]/g, '')
+            .toLowerCase().replace(/[^a-z0-9]+/g, ' ').trim();
+    }
+
+    function trigramas(texto, comPontas) {
+        // Como search._trigrams: o índice usa o nome com espaço nas pontas; a consulta não
+        if (comPontas) {
+            texto = ' ' + texto + ' ';
+        }
+        var grams = new Set();
+        for (var i = 0; i + 3 <= texto.length; i++) {
+            grams.add(texto.substr(i, 3));
+        }
+        return Array.from(grams);
+    }
+
+    function adiciona(mapa, chave, rank) {
+        var lista = mapa.get(chave);
+        if (lista) {
+            lista.push(rank);
+        } else {
+            mapa.set(chave, [rank]);
+        }
+    }
+
+    function comparaPar(a, b) {
+        return a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : a[1] - b[1];
+    }
+
+    function monta(dados) {
+        // Linhas já na ordem de desempate: o rank é a posição da linha
+        var exatos = new Map(), grams = new Map();
+        var nomes = [], palavras = [], codigos = [];
+        dados.rows.forEach(function (linha, rank) {
+            var nome = linha[3];
+            adiciona(exatos, nome, rank);
+            nomes.push([nome, rank]);
+            codigos.push([linha[0], rank]);
+            new Set(nome.split(' ').slice(1)).forEach(function (palavra) {
+                palavras.push([palavra, rank]);
+            });
+            trigramas(nome, true).forEach(function (gram) {
+                adiciona(grams, gram, rank);
+            });
+        });
+        nomes.sort(comparaPar);
+        palavras.sort(comparaPar);
+        codigos.sort(comparaPar);
+        return {rows: dados.rows, exatos: exatos, grams: grams, nomes: nomes, palavras: palavras, codigos: codigos};
+    }
+
+    function carrega(url) {
+        // Uma falha (rede ou HTTP) não fica guardada: a próxima tecla tenta de novo
+        if (!indice) {
+            indice = fetch(url).then(function (r) {
+                if (!r.ok) {
+                    throw new Error('índice de busca: HTTP ' + r.status);
+                }
+                return r.json();
+            }).then(monta).catch(function (erro) {
+                indice = null;
+                throw erro;
+            });
+        }
+        return indice;
+    }
+
+    function faixaDePrefixo(ordenada, prefixo) {
+        // Busca binária pelo primeiro par >= prefixo; segue enquanto começar com ele
+        var inicio = 0, fim = ordenada.length;
+        while (inicio < fim) {
+            var meio = (inicio + fim) >> 1;
+            if (ordenada[meio][0] < prefixo) {
+                inicio = meio + 1;
+            } else {
+                fim = meio;
+            }
+        }
+        var ranks = [];
+        for (var i = inicio; i < ordenada.length && ordenada[i][0].lastIndexOf(prefixo, 0) === 0; i++) {
+            ranks.push(ordenada[i][1]);
+        }
+        return ranks;
+    }
+
+    function faixas(idx, q) {
+        // Cada faixa devolve os ranks candidatos, em qualquer ordem
+        var lista = [idx.exatos.get(q) || []];
+        if (/^\d+$/.test(q)) {
+            lista.push(faixaDePrefixo(idx.codigos, q));
+            return lista;
+        }
+        lista.push(faixaDePrefixo(idx.nomes, q));
+        lista.push(faixaDePrefixo(idx.palavras, q));
+        if (q.length >= 3) {
+            var postings = trigramas(q, false).map(function (gram) {
+                return idx.grams.get(gram) || [];
+            }).sort(function (a, b) { return a.length - b.length; });
+            if (postings.length && postings[0].length) {
+                var outras = postings.slice(1).map(function (p) { return new Set(p); });
+                lista.push(postings[0].filter(function (rank) {
+                    return outras.every(function (p) { return p.has(rank); }) &&
+                        idx.rows[rank][3].indexOf(q) >= 0;
+                }));
+            }
+        }
+        return lista;
+    }
+
+    function busca(idx, consulta, k) {
+        var q = normaliza(consulta || '');
+        if (!q) {
+            return [];
+        }
+        var vistos = new Set(), resultado = [];
+        var lista = faixas(idx, q);
+        for (var f = 0; f < lista.length; f++) {
+            var ranks = lista[f].slice().sort(function (a, b) { return a - b; });
+            for (var i = 0; i < ranks.length; i++) {
+                if (!vistos.has(ranks[i])) {
+                    vistos.add(ranks[i]);
+                    resultado.push(idx.rows[ranks[i]]);
+                    if (resultado.length === k) {
+                        return resultado;
+                    }
+                }
+            }
+        }
+        return resultado;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        search: {
+            suggest: function (consulta, url) {
+                if (!consulta) {
+                    return [];
+                }
+                return carrega(url).then(function (idx) {
+                    return busca(idx, consulta, 10).map(function (linha) {
+                        return {
+                            type: 'Link',
+                            namespace: 'dash_core_components',
+                            props: {
+                                children: linha[1] + ' (' + linha[2] + ')',
+                                href: linha[4],
+                                className: 'search-result'
+                            }
+                        };
+                    });
+                });
+            }
+        }
+    });
+})();
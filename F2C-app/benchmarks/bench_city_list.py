@@ -0,0 +1,67 @@
+# Tamanho da resposta e custo de servidor da lista de cidades da página
+# inicial, para os maiores estados: antes (todos os botões a cada escolha de
+# estado, mais um callback de navegação por clique) e depois (lista de todos os
+# estados enviada uma vez no layout, no dcc.Store 'cities-by-state', e montada
+# no navegador por assets/citylist.js). Rodar a partir de F2C-app/:
+#     python benchmarks/bench_city_list.py
+#
+# O tempo até a interação no navegador não é medido aqui; como aproximação é
+# informado o número de elementos que o navegador precisa criar.
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plotly
+from dash import html
+
+import app
+
+ESTADOS = ['MG', 'SP', 'RS', 'BA', 'DF']
+LINHAS_VISIVEIS = 30  # 60vh / 54px por linha, mais a margem de citylist.js
+
+# Estilo dos botões antes da mudança, só para reproduzir a resposta antiga
+ESTILO_LEGADO = {
+    'display': 'block', 'width': '100%', 'padding': '12px 15px', 'margin': '8px 0',
+    'border': '1px solid #ddd', 'backgroundColor': '#fff', 'color': '#333',
+    'fontWeight': '400', 'borderRadius': '4px', 'cursor': 'pointer',
+    'textAlign': 'left', 'transition': 'all 0.3s', 'fontFamily': '"Roboto", sans-serif',
+    ':hover': {'backgroundColor': '#f0f7ff', 'borderColor': '#1351B4', 'transform': 'translateY(-2px)'}
+}
+
+
+def serializa(valor):
+    return json.dumps(valor, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8')
+
+
+def medir(func, repeat=20):
+    inicio = time.perf_counter()
+    for _ in range(repeat):
+        resultado = func()
+    return (time.perf_counter() - inicio) / repeat * 1000, resultado
+
+
+def legado(uf):
+    return [html.Button(
+        app.CITIES_DATA[code]['basic']['Município'],
+        id={'type': 'city-btn', 'index': code},
+        n_clicks=0,
+        style=ESTILO_LEGADO)
+        for code in app.CITIES_BY_STATE.get(uf, [])]
+
+
+if __name__ == '__main__':
+    ms, store = medir(lambda: serializa(app.cities_by_state_data()), repeat=5)
+    print(f"Store 'cities-by-state' (uma vez por carga completa): {len(store):,} bytes, "
+          f"{len(gzip.compress(store)):,} gzip, {ms:.1f} ms")
+    print("Por escolha de estado / troca de página / clique: 0 bytes e 0 ms de servidor\n")
+
+    print(f"{'UF':<4}{'cidades':>8} | {'legado (por escolha)':>22} | {'DOM paginado':>12} | {'DOM virtual':>11}")
+    for uf in ESTADOS:
+        total = len(app.CITIES_BY_STATE.get(uf, []))
+        ms, resultado = medir(lambda: serializa(legado(uf)))
+        print(f"{uf:<4}{total:>8} | {len(resultado):>12,} {ms:>6.2f} ms | "
+              f"{min(total, app.CITY_PAGE_SIZE):>12} | {min(total, LINHAS_VISIVEIS):>11}")
@@ -0,0 +1,79 @@
+# Compara o antigo outros/data_export.py (módulo gerado com repr de todas as
+# cidades, ~1,7 MB em latin-1) com o data_export.npz colunar e o leitor
+# preguiçoso de outros/data_export.py. Cada medição roda em um processo novo:
+# tempo de import, primeiro acesso, montagem de todos os registros e pico de
+# RSS. O módulo antigo é lido do git, do commit anterior à troca. Rodar a
+# partir de F2C-app/:
+#     python benchmarks/bench_data_export.py [repetições]
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+OUTROS = os.path.join(ROOT, 'outros')
+
+_MEDICAO = r'''
+import resource, sys, time
+sys.path.insert(0, {caminho!r})
+inicio = time.perf_counter()
+import numpy
+base = time.perf_counter()
+import data_export
+importado = time.perf_counter()
+nomes = data_export.cities_list
+acesso = time.perf_counter()
+registros = [data_export.cities_dict[nome] for nome in nomes]
+fim = time.perf_counter()
+print(base - inicio, importado - base, acesso - importado, fim - acesso,
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, len(registros))
+'''
+
+
+def _legacy_module(destino):
+    # Commit anterior ao que trocou o módulo gerado pelo .npz
+    troca = subprocess.run(
+        ['git', 'log', '--diff-filter=A', '--format=%H', '-1', '--', 'outros/data_export.npz'],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    fonte = subprocess.run(
+        ['git', 'show', f'{troca}~1:outros/data_export.py'] if troca else ['git', 'show', 'HEAD:outros/data_export.py'],
+        cwd=ROOT, capture_output=True, check=True,
+    ).stdout
+    # Sem a declaração de encoding o módulo nem compila no Python 3
+    with open(os.path.join(destino, 'data_export.py'), 'wb') as f:
+        f.write(b'# -*- coding: latin-1 -*-\n' + fonte)
+    return len(fonte)
+
+
+def measure(caminho, repeat):
+    amostras = []
+    for _ in range(repeat):
+        saida = subprocess.run(
+            [sys.executable, '-B', '-c', _MEDICAO.format(caminho=caminho)],
+            cwd=caminho, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        amostras.append([float(v) for v in saida])
+    # Mediana de cada coluna
+    return [sorted(coluna)[len(coluna) // 2] for coluna in zip(*amostras)]
+
+
+def _linha(rotulo, medidas):
+    numpy_s, import_s, acesso_s, registros_s, rss, n = medidas
+    print(f"{rotulo:<10}: import {import_s * 1000:7.1f} ms | 1º acesso {acesso_s * 1000:6.1f} ms | "
+          f"{int(n)} registros {registros_s * 1000:6.1f} ms | pico RSS {rss:6.1f} MB "
+          f"(numpy sozinho: {numpy_s * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tamanho = _legacy_module(tmp)
+        legado = measure(tmp, repeat)
+    novo = measure(OUTROS, repeat)
+
+    print(f"arquivo   : módulo .py {tamanho / 1024:.0f} KB | "
+          f"data_export.npz {os.path.getsize(os.path.join(OUTROS, 'data_export.npz')) / 1024:.0f} KB")
+    _linha('legado', legado)
+    _linha('colunar', novo)
@@ -0,0 +1,163 @@
+# Bytes transferidos em uma sessão de navegação representativa, com e sem o
+# middleware de httpcache.py (HTTP_MIDDLEWARE=1/0), cada modo em um processo.
+#
+# A sessão: página inicial (HTML, scripts, CSS, layout, dependências), seis
+# páginas de cidade com a geometria do estado, a página de fundos com duas
+# páginas da lista e a volta à página inicial e a São Paulo. Ela roda duas
+# vezes: primeira visita (cache vazio) e visita de retorno. O cliente imita o
+# navegador: manda Accept-Encoding, não pede de novo o que ainda está fresco
+# (max-age), revalida com If-None-Match o que tem ETag e, como
+# assets/callbackcache.js, revalida os callbacks que vieram com ETag.
+# Contam os bytes do corpo das respostas (o que trafega, já comprimido).
+# Rodar a partir de F2C-app/:
+#     python benchmarks/bench_http_bytes.py
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(APP_DIR, 'benchmarks', 'reports', 'http_bytes.txt')
+# Sem o middleware o cliente pede 'identity': a rota /geo também comprime
+# quando pode, e o servidor de antes não comprimia nada
+ACCEPT_ENCODING = 'gzip, deflate, br' if os.getenv('HTTP_MIDDLEWARE', '1') == '1' else 'identity'
+
+CIDADES = ['/sp/sao-paulo', '/rj/rio-de-janeiro', '/am/manaus', '/mg/belo-horizonte', '/ba/salvador', '/rs/porto-alegre']
+FUND_LIST_OUTPUTS = [('fund-summary', 'children'), ('fund-results', 'children'), ('fund-page', 'data'),
+                     ('fund-page-label', 'children')]
+
+
+def _display(pathname):
+    return {
+        'output': 'page-content.children',
+        'outputs': {'id': 'page-content', 'property': 'children'},
+        'inputs': [{'id': 'url', 'property': 'pathname', 'value': pathname}],
+        'changedPropIds': ['url.pathname'],
+        'state': [],
+    }
+
+
+def _fund_list(proxima, pagina):
+    valores = [('fund-dropdown', 'value', 'verba-rcl'), ('fund-state-dropdown', 'value', 'SP'),
+               ('fund-status', 'value', 'eligible'), ('fund-sort', 'value', 'rcl'), ('fund-order', 'value', 'desc'),
+               ('fund-prev', 'n_clicks', 0), ('fund-next', 'n_clicks', proxima)]
+    return {
+        'output': '..' + '...'.join(f'{i}.{p}' for i, p in FUND_LIST_OUTPUTS) + '..',
+        'outputs': [{'id': i, 'property': p} for i, p in FUND_LIST_OUTPUTS],
+        'inputs': [{'id': i, 'property': p, 'value': v} for i, p, v in valores],
+        'changedPropIds': ['fund-next.n_clicks' if proxima else 'fund-dropdown.value'],
+        'state': [{'id': 'fund-page', 'property': 'data', 'value': pagina}],
+    }
+
+
+class Navegador:
+    def __init__(self, client):
+        self.client = client
+        self.cache = {}  # url ou corpo do callback -> (etag, fresco, corpo)
+        self.bytes = {}
+        self.pedidos = 0
+
+    def _conta(self, categoria, resposta):
+        self.pedidos += 1
+        self.bytes[categoria] = self.bytes.get(categoria, 0) + len(resposta.data)
+
+    def get(self, url, categoria):
+        guardado = self.cache.get(url)
+        if guardado and guardado[1]:
+            return guardado[2]
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        if guardado and guardado[0]:
+            headers['If-None-Match'] = guardado[0]
+        resposta = self.client.get(url, headers=headers)
+        self._conta(categoria, resposta)
+        if resposta.status_code == 304:
+            return guardado[2]
+        corpo = resposta.get_data()
+        if resposta.headers.get('Content-Encoding') == 'gzip':
+            corpo = gzip.decompress(corpo)
+        etag = resposta.headers.get('ETag')
+        fresco = bool(resposta.cache_control.max_age) and not resposta.cache_control.no_cache
+        if etag or fresco:
+            self.cache[url] = (etag, fresco, corpo)
+        return corpo
+
+    def callback(self, payload, categoria):
+        corpo_pedido = json.dumps(payload)
+        guardado = self.cache.get(corpo_pedido)
+        headers = {'Accept-Encoding': ACCEPT_ENCODING, 'Content-Type': 'application/json'}
+        if guardado:
+            headers['If-None-Match'] = guardado[0]
+        resposta = self.client.post('/_dash-update-component', data=corpo_pedido, headers=headers)
+        self._conta(categoria, resposta)
+        if resposta.status_code == 304:
+            return guardado[2]
+        corpo = resposta.get_data()
+        if resposta.headers.get('Content-Encoding') == 'gzip':
+            corpo = gzip.decompress(corpo)
+        if resposta.headers.get('ETag'):
+            self.cache[corpo_pedido] = (resposta.headers['ETag'], False, corpo)
+        return corpo
+
+
+def sessao(nav):
+    html = nav.get('/', 'html/js/css').decode('utf-8')
+    for url in re.findall(r'(?:src|href)="(/[^"]+)"', html):
+        nav.get(url, 'html/js/css')
+    nav.get('/_dash-layout', 'layout')
+    nav.get('/_dash-dependencies', 'layout')
+    nav.callback(_display('/'), 'callbacks')
+    for pathname in CIDADES:
+        # O encoder do Dash escapa '/' como \u002f
+        pagina = nav.callback(_display(pathname), 'callbacks').decode('utf-8').replace('\\u002f', '/')
+        for url in sorted(set(re.findall(r'/geo/[^"\\]+', pagina))):
+            nav.get(url, 'geometria')
+    nav.callback(_display('/fundos'), 'callbacks')
+    nav.callback(_fund_list(0, 0), 'callbacks')
+    nav.callback(_fund_list(1, 0), 'callbacks')
+    nav.callback(_display('/'), 'callbacks')
+    nav.callback(_display('/sp/sao-paulo'), 'callbacks')
+
+
+def medir():
+    sys.path.insert(0, APP_DIR)
+    import app
+
+    nav = Navegador(app.server.test_client())
+    resultado = {}
+    for fase in ('primeira visita', 'retorno'):
+        nav.bytes, nav.pedidos = {}, 0
+        sessao(nav)
+        resultado[fase] = {'bytes': nav.bytes, 'pedidos': nav.pedidos}
+    print(json.dumps(resultado))
+
+
+if __name__ == '__main__':
+    if '--medir' in sys.argv:
+        medir()
+        sys.exit(0)
+
+    resultados = {}
+    for modo, valor in (('sem middleware', '0'), ('com middleware', '1')):
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--medir'],
+            cwd=APP_DIR, env={**os.environ, 'HTTP_MIDDLEWARE': valor}, capture_output=True, text=True, check=True,
+        ).stdout
+        resultados[modo] = json.loads(saida.strip().splitlines()[-1])
+
+    categorias = ['html/js/css', 'layout', 'callbacks', 'geometria']
+    linhas = [f"{'modo':<15} {'fase':<16} {'pedidos':>7} " + ' '.join(f'{c:>12}' for c in categorias)
+              + f" {'total KiB':>10}"]
+    for modo, fases in resultados.items():
+        for fase, r in fases.items():
+            kib = [r['bytes'].get(c, 0) / 1024 for c in categorias]
+            linhas.append(f"{modo:<15} {fase:<16} {r['pedidos']:>7} " + ' '.join(f'{v:>12.1f}' for v in kib)
+                          + f" {sum(kib):>10.1f}")
+    for fase in ('primeira visita', 'retorno'):
+        antes = sum(resultados['sem middleware'][fase]['bytes'].values())
+        depois = sum(resultados['com middleware'][fase]['bytes'].values())
+        linhas.append(f"{fase}: {antes / 1024:.0f} KiB -> {depois / 1024:.0f} KiB ({depois / antes:.1%})")
+    print('\n'.join(linhas))
+    with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(linhas) + '\n')
@@ -0,0 +1,127 @@
+# Compara o tempo de boot do load_data antigo (iterrows/apply) com o carregador
+# orientado a esquema de data.py. Rodar a partir de F2C-app/:
+#     python benchmarks/bench_load_data.py
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import CODIGO_PARA_UF, SNAPSHOT_PATH, load_data
+
+
+# Cópia fiel da versão anterior, mantida apenas como referência de desempenho
+def load_data_legacy(path='ibge.txt'):
+    df = pd.read_csv(path)
+
+    columns_spec = {
+        'Município [-]': 'category',
+        'Código [-]': 'str',
+        'Gentílico [-]': 'category',
+        'Prefeito [2025]': 'category',
+        'Área Territorial - km² [2024]': 'float32',
+        'População no último censo - pessoas [2022]': 'float32',
+        'Densidade demográfica - hab/km² [2022]': 'float32',
+        'População estimada - pessoas [2024]': 'float32',
+        'IDHM (Índice de desenvolvimento humano municipal) [2010]': 'float32',
+        'PIB per capita - R$ [2021]': 'float32',
+        'Total de receitas brutas realizadas - R$ [2024]': 'float64',
+        'Total de despesas brutas empenhadas - R$ [2024]': 'float64'
+    }
+
+    for col, dtype in columns_spec.items():
+        if dtype.startswith('float'):
+            df[col] = df[col].astype(str).str.replace(',', '.')
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+
+    df['Estado'] = df['Código [-]'].apply(lambda x: CODIGO_PARA_UF.get(int(str(x)[:2]), "Desconhecido"))
+
+    states_list = sorted(df['Estado'].unique().tolist())
+
+    cities_by_state = {}
+    for state in states_list:
+        cities_by_state[state] = df[df['Estado'] == state]['Município [-]'].unique().tolist()
+
+    cities_data = {}
+    for _, row in df.iterrows():
+        city = row['Município [-]']
+        cities_data[city] = {
+            'basic': {
+                'Código': row['Código [-]'],
+                'Gentílico': row['Gentílico [-]'],
+                'Prefeito': row['Prefeito [2025]'],
+                'Estado': row['Estado']
+            },
+            'demographic': {
+                'Área': row['Área Territorial - km² [2024]'],
+                'População': row['População no último censo - pessoas [2022]'],
+                'Densidade': row['Densidade demográfica - hab/km² [2022]'],
+                'População_Estimada': row['População estimada - pessoas [2024]'],
+                'IDHM': row['IDHM (Índice de desenvolvimento humano municipal) [2010]']
+            },
+            'economic': {
+                'PIB': row['PIB per capita - R$ [2021]'],
+                'Receitas': row['Total de receitas brutas realizadas - R$ [2024]'],
+                'Despesas': row['Total de despesas brutas empenhadas - R$ [2024]']
+            }
+        }
+
+    return states_list, cities_by_state, cities_data
+
+
+def _same(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b or (pd.isna(a) and pd.isna(b))
+
+
+def _legacy_shape(resultado):
+    # load_data agora indexa por código IBGE; reconstrói a forma antiga (por nome,
+    # com o último município de mesmo nome sobrescrevendo os anteriores), sem o
+    # grupo 'fiscal' de siconfi.txt, que o carregador antigo não lia
+    states_list, cities_by_state, cities_data = resultado
+    by_name = {}
+    for registro in cities_data.values():
+        basic = {k: v for k, v in registro['basic'].items() if k != 'Município'}
+        by_name[registro['basic']['Município']] = {
+            grupo: (basic if grupo == 'basic' else campos)
+            for grupo, campos in registro.items() if grupo != 'fiscal'
+        }
+    nomes_por_estado = {
+        uf: [cities_data[code]['basic']['Município'] for code in codes]
+        for uf, codes in cities_by_state.items()
+    }
+    return states_list, nomes_por_estado, by_name
+
+
+def bench(func, repeat):
+    tempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        resultado = func()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), sorted(tempos)[len(tempos) // 2], resultado
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    legado_min, legado_med, esperado = bench(load_data_legacy, repeat)
+    novo_min, novo_med, obtido = bench(lambda: load_data(snapshot_path=''), repeat)
+
+    print(f"load_data legado : min {legado_min * 1000:8.1f} ms | mediana {legado_med * 1000:8.1f} ms")
+    print(f"load_data (CSV)  : min {novo_min * 1000:8.1f} ms | mediana {novo_med * 1000:8.1f} ms")
+    print(f"ganho            : {legado_med / novo_med:.1f}x")
+    print(f"saída idêntica   : {_same(esperado, _legacy_shape(obtido))}")
+
+    if os.path.exists(SNAPSHOT_PATH):
+        snap_min, snap_med, obtido = bench(load_data, repeat)
+        print(f"load_data (snap) : min {snap_min * 1000:8.1f} ms | mediana {snap_med * 1000:8.1f} ms")
+        print(f"ganho            : {legado_med / snap_med:.1f}x")
+        print(f"saída idêntica   : {_same(esperado, _legacy_shape(obtido))}")
@@ -0,0 +1,76 @@
+# Verifica o backend em banco de db.py sem servidor: carrega a saída do ETL
+# (ibge.txt + siconfi.txt) em um SQLite em memória e confere que o frame
+# hidratado do banco é idêntico ao de data.parse_frame, que a elegibilidade
+# gravada bate com funds.evaluate_funds e que as consultas indexadas batem com
+# as estruturas do app. Falha (código de saída 1) em qualquer divergência.
+# Rodar a partir de F2C-app/:
+#     python benchmarks/check_db_roundtrip.py [DATABASE_URL]
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from data import build_structures, dataset_version, parse_frame
+from funds import evaluate_funds
+
+
+def _tempo(func):
+    inicio = time.perf_counter()
+    resultado = func()
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+if __name__ == '__main__':
+    url = sys.argv[1] if len(sys.argv) > 1 else 'sqlite://'
+    engine = db.make_engine(url)
+    falhas = []
+
+    esperado = parse_frame()
+    eligibility = evaluate_funds(esperado)
+    linhas, carga_ms = _tempo(lambda: db.load(esperado, eligibility, dataset_version(source='files'), engine))
+    print(f"carga ({engine.dialect.name}): {carga_ms:.0f} ms | " + ', '.join(f"{t} {n}" for t, n in linhas.items()))
+
+    obtido, leitura_ms = _tempo(lambda: db.read_frame(engine))
+    print(f"read_frame: {leitura_ms:.0f} ms")
+    try:
+        pd.testing.assert_frame_equal(obtido, esperado[list(obtido.columns)], check_categorical=False)
+        if list(obtido.columns) != db._FRAME_COLUMNS or set(obtido.columns) != set(esperado.columns):
+            falhas.append(f"colunas: {list(obtido.columns)}")
+    except AssertionError as e:
+        falhas.append(f"frame: {e}")
+
+    if db.dataset_version(engine) != dataset_version(source='files'):
+        falhas.append("dataset_version")
+
+    # Elegibilidade gravada x avaliada de novo sobre o frame do banco
+    reavaliada = evaluate_funds(obtido)
+    _, cities_by_state, cities_data = build_structures(obtido)
+    for fund_id in eligibility.fund_ids:
+        codigos = [code for code, ok in zip(reavaliada.codes, reavaliada.mask(fund_id)) if ok]
+        if db.eligible_codes(fund_id, engine=engine) != codigos:
+            falhas.append(f"elegibilidade {fund_id}")
+        for uf in ('SP', 'MG', 'RR'):
+            no_estado = [code for code in codigos if cities_data[code]['basic']['Estado'] == uf]
+            if db.eligible_codes(fund_id, uf, engine=engine) != no_estado:
+                falhas.append(f"elegibilidade {fund_id}/{uf}")
+
+    # Consultas por UF e por código
+    (_, uf_ms) = _tempo(lambda: [db.cities_in_state(uf, engine) for uf in cities_by_state])
+    for uf, codes in cities_by_state.items():
+        if [code for code, _ in db.cities_in_state(uf, engine)] != codes:
+            falhas.append(f"cities_in_state {uf}")
+    registro, city_ms = _tempo(lambda: db.city('3550308', engine))
+    if registro['nome'] != 'São Paulo' or registro['financas'][2024]['rcl'] != cities_data['3550308']['fiscal']['RCL']:
+        falhas.append("city 3550308")
+    if db.city('0000000', engine) is not None:
+        falhas.append("city inexistente")
+    print(f"cities_in_state ({len(cities_by_state)} UFs): {uf_ms:.1f} ms | city: {city_ms:.2f} ms")
+
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    print("OK" if not falhas else f"{len(falhas)} falhas")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,85 @@
+# Verificação de regressão do tamanho dos layouts serializados. Falha (código
+# de saída 1) se a página de alguma cidade ou a página inicial passar do
+# orçamento. Rodar a partir de F2C-app/:
+#     python benchmarks/check_layout_budget.py [--all]
+#
+# A geometria da cidade (dl.GeoJSON 'cidade-geojson') varia com o município e
+# tem orçamento próprio; o restante da página ("estrutura") deve ser
+# praticamente constante. Sem --all, mede uma amostra de municípios; com
+# --all, todos os 5570.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from funds import FUNDS
+from pagecache import serialized_size
+
+# Bytes do JSON de cada árvore de componentes. Com os estilos inline de antes
+# de assets/style.css: estrutura até 9.957 e página inicial 8.702; com as
+# classes CSS: até 5.970 e 5.668 (2 fundos). Com 6 fundos: até 7.774 e
+# 6.995. Os orçamentos são fixos: cada fundo novo em funds.FUNDS acrescenta
+# ~500 bytes à página de cidade e ~300 à página inicial, e quem o acrescenta
+# revê os orçamentos e BUDGET_FUNDS (a verificação falha enquanto o número de
+# fundos não bater)
+BUDGET_FUNDS = 6
+CITY_PAGE_BUDGET = 8_800
+CITY_GEOMETRY_BUDGET = 64 * 1024
+HOME_PAGE_BUDGET = 7_300
+
+# Capitais e municípios pequenos de todas as regiões (ibge.txt não tem o DF)
+AMOSTRA = ['3550308', '3304557', '5208707', '3100104', '1100015', '1302603', '4314902', '2927408']
+
+
+def sem_geometria(tree):
+    # Cópia rasa do caminho até a camada da cidade, sem os dados dela
+    if isinstance(tree, list):
+        return [sem_geometria(item) for item in tree]
+    if not hasattr(tree, 'to_plotly_json'):
+        return tree
+    if getattr(tree, 'id', None) == 'cidade-geojson':
+        return None
+    children = getattr(tree, 'children', None)
+    if children is None:
+        return tree
+    copia = tree.__class__(**{k: getattr(tree, k) for k in tree._prop_names if hasattr(tree, k)})
+    copia.children = sem_geometria(children)
+    return copia
+
+
+def medir(codes):
+    falhas = [f"{code}: não está em ibge.txt" for code in codes if code not in app.CITIES_DATA]
+    codes = [code for code in codes if code in app.CITIES_DATA]
+    maior = (0, None)
+    for code in codes:
+        tree = app.city_page(code)
+        estrutura = serialized_size(sem_geometria(tree))
+        geometria = serialized_size(tree) - estrutura
+        maior = max(maior, (estrutura, code))
+        if estrutura > CITY_PAGE_BUDGET:
+            falhas.append(f"{code}: estrutura {estrutura:,} > {CITY_PAGE_BUDGET:,} bytes")
+        if geometria > CITY_GEOMETRY_BUDGET:
+            falhas.append(f"{code}: geometria {geometria:,} > {CITY_GEOMETRY_BUDGET:,} bytes")
+    return falhas, maior
+
+
+if __name__ == '__main__':
+    codes = list(app.CITIES_DATA) if '--all' in sys.argv else AMOSTRA
+    falhas, (estrutura, code) = medir(codes)
+    if len(FUNDS) != BUDGET_FUNDS:
+        falhas.append(f"orçamentos definidos para {BUDGET_FUNDS} fundos, funds.FUNDS tem {len(FUNDS)}: "
+                      f"reveja CITY_PAGE_BUDGET, HOME_PAGE_BUDGET e BUDGET_FUNDS")
+
+    home = serialized_size(app.home_page())
+    if home > HOME_PAGE_BUDGET:
+        falhas.append(f"página inicial: {home:,} > {HOME_PAGE_BUDGET:,} bytes")
+
+    print(f"city_page: {len(codes)} municípios, maior estrutura {estrutura:,} bytes ({code}), "
+          f"orçamento {CITY_PAGE_BUDGET:,}")
+    print(f"home_page: {home:,} bytes, orçamento {HOME_PAGE_BUDGET:,}")
+    for falha in falhas[:20]:
+        print(f"FALHOU  {falha}")
+    if len(falhas) > 20:
+        print(f"... e mais {len(falhas) - 20} falhas")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,78 @@
+# Confere que a busca do servidor (search.SearchIndex, rota /search) e a do
+# navegador (assets/search.js, sobre o export do índice) devolvem os mesmos
+# municípios, na mesma ordem, para um conjunto de consultas: nomes, prefixos,
+# códigos e trechos que começam ou terminam no meio de uma palavra, mais
+# trechos tirados dos próprios nomes. O search.js roda no node (com fetch e
+# window de mentira). Falha (código de saída 1) em qualquer divergência ou se
+# um nome sem a primeira e a última letra não achar o município de onde saiu.
+# Rodar a partir de F2C-app/:
+#     python benchmarks/check_search_parity.py
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cities import CityIndex
+from data import build_structures, load_frame
+from search import SearchIndex
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONSULTAS = [
+    'sao paulo', 'São Paulo', 'aulo', 'elo horizonte', 'ao jo', 'rio', 'rio de', 'santa', 'nova', 'ita',
+    'lo', 'a', 'cruz', 'porto alegre', 'orto aleg', 'xyz', 'brasil', 'mirim', 'do sul', '355', '3550308', '53',
+]
+
+# Carrega assets/search.js e responde, para cada consulta, as URLs sugeridas
+NODE = """
+const fs = require('fs');
+const entrada = JSON.parse(fs.readFileSync(0, 'utf8'));
+global.window = {};
+global.fetch = () => Promise.resolve({ok: true, json: () => entrada.dados});
+eval(fs.readFileSync(entrada.script, 'utf8'));
+Promise.all(entrada.consultas.map(q => window.dash_clientside.search.suggest(q, '/idx')))
+    .then(r => console.log(JSON.stringify(r.map(links => links.map(l => l.props.href)))));
+"""
+
+
+def trechos(index, passo=97):
+    # Trechos do meio de alguns nomes, para exercitar os trigramas: o nome sem
+    # as pontas (deve achar o município) e 4 letras (muitos resultados; só a
+    # comparação com o navegador)
+    for nome in index.normalized[::passo]:
+        if len(nome) >= 7:
+            yield nome[1:-1], nome
+            yield nome[2:6], None
+
+
+if __name__ == '__main__':
+    if shutil.which('node') is None:
+        print("Aviso: node não encontrado; nada a comparar")
+        sys.exit(0)
+
+    _, _, cities_data = build_structures(load_frame())
+    index = SearchIndex(cities_data, CityIndex(cities_data).url_for)
+    amostra = list(trechos(index))
+    consultas = CONSULTAS + [trecho for trecho, _ in amostra]
+
+    entrada = {'script': os.path.join(APP_DIR, 'assets', 'search.js'), 'dados': index.export(),
+               'consultas': consultas}
+    saida = subprocess.run(['node', '-e', NODE], input=json.dumps(entrada), capture_output=True, text=True,
+                           check=True).stdout
+    navegador = json.loads(saida)
+
+    falhas = []
+    for consulta, urls in zip(consultas, navegador):
+        servidor = [linha['url'] for linha in index.results(consulta, 10)]
+        if servidor != urls:
+            falhas.append(f"{consulta!r}: servidor {servidor[:3]}... x navegador {urls[:3]}...")
+    for trecho, nome in amostra:
+        if nome is not None and not any(index.normalized[rank] == nome for rank in index.search_ranks(trecho, 50)):
+            falhas.append(f"{trecho!r} não acha {nome!r}")
+
+    print(f"{len(consultas)} consultas comparadas, {len(falhas)} divergências")
+    for falha in falhas[:20]:
+        print(f"FALHOU  {falha}")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,309 @@
+# Teste de carga local: sessões de navegação repetidas contra
+# "gunicorn app:server -c gunicorn.conf.py" com N usuários simultâneos.
+#
+# Uma sessão imita o navegador: abre a página inicial (HTML, _dash-layout,
+# _dash-dependencies e o callback display_page de '/'), escolhe um estado,
+# clica em uma cidade (display_page da cidade e a geometria do estado em /geo,
+# se ainda não estiver no cache do usuário) e volta à página inicial; uma
+# parte das sessões (--funds) passa também pela página de fundos e pagina a
+# lista (update_fund_list). A escolha do estado e a lista de cidades são
+# montadas no navegador (assets/citylist.js), e o clique é um link que muda a
+# URL: os antigos callbacks update_city_buttons e navigate não geram mais
+# tráfego, e o passo "escolhe estado" só aparece como tempo de espera.
+#
+# As sessões são sintetizadas (estado e cidade sorteados com --seed, a partir
+# da lista de cidades do próprio layout), podem ser gravadas com --record e
+# repetidas depois com --sessions, para comparar duas versões com o mesmo
+# tráfego. Cada usuário usa uma conexão keep-alive, manda Accept-Encoding e,
+# como assets/callbackcache.js, revalida com If-None-Match os callbacks que já
+# viu.
+#
+# O relatório, por nível de concorrência, traz vazão (pedidos/s e sessões/s)
+# e, por callback ou rota, latência p50/p95/p99/máx e bytes médios da resposta
+# (como trafegam, já comprimidos). Rodar a partir de F2C-app/:
+#     python benchmarks/loadtest.py --users 1,4,16 --duration 30
+#     python benchmarks/loadtest.py --record benchmarks/reports/sessions.jsonl
+#     python benchmarks/loadtest.py --sessions benchmarks/reports/sessions.jsonl
+#     python benchmarks/loadtest.py --url http://127.0.0.1:8000   # servidor já no ar
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+from report_worker_memory import _espera, _porta_livre
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(APP_DIR, 'benchmarks', 'reports', 'loadtest.txt')
+
+# Callback de cada 'output' (como em app.callback_map)
+CALLBACKS = {
+    'page-content.children': 'display_page',
+    '..fund-summary.children...fund-results.children...fund-page.data...fund-page-label.children..':
+        'update_fund_list',
+}
+FUND_LIST_OUTPUTS = [('fund-summary', 'children'), ('fund-results', 'children'), ('fund-page', 'data'),
+                     ('fund-page-label', 'children')]
+FUNDOS = ['verba-rcl', 'fundo-a', 'verba-a']
+ORDENS = ['rcl', 'populacao', 'nome']
+
+
+def _display(pathname):
+    return {
+        'output': 'page-content.children',
+        'outputs': {'id': 'page-content', 'property': 'children'},
+        'inputs': [{'id': 'url', 'property': 'pathname', 'value': pathname}],
+        'changedPropIds': ['url.pathname'],
+        'state': [],
+    }
+
+
+def _fund_list(fundo, uf, ordem, proxima, pagina):
+    valores = [('fund-dropdown', 'value', fundo), ('fund-state-dropdown', 'value', uf),
+               ('fund-status', 'value', 'eligible'), ('fund-sort', 'value', ordem),
+               ('fund-order', 'value', 'desc'), ('fund-prev', 'n_clicks', 0), ('fund-next', 'n_clicks', proxima)]
+    return {
+        'output': '..' + '...'.join(f'{i}.{p}' for i, p in FUND_LIST_OUTPUTS) + '..',
+        'outputs': [{'id': i, 'property': p} for i, p in FUND_LIST_OUTPUTS],
+        'inputs': [{'id': i, 'property': p, 'value': v} for i, p, v in valores],
+        'changedPropIds': ['fund-next.n_clicks' if proxima else 'fund-dropdown.value'],
+        'state': [{'id': 'fund-page', 'property': 'data', 'value': pagina}],
+    }
+
+
+## Sessões: listas de passos ('get', url) / ('callback', payload) / ('pausa', s)
+def sintetiza(cidades_por_estado, n, seed=0, funds=0.2, pausa=0.0):
+    rnd = random.Random(seed)
+    estados = sorted(cidades_por_estado)
+    sessoes = []
+    for _ in range(n):
+        passos = [['get', '/'], ['get', '/_dash-layout'], ['get', '/_dash-dependencies'],
+                  ['callback', _display('/')]]
+        for _ in range(rnd.randint(1, 3)):
+            uf = rnd.choice(estados)
+            nome, slug = rnd.choice(cidades_por_estado[uf])
+            passos += [['pausa', pausa], ['callback', _display(f'/{uf.lower()}/{slug}')], ['pausa', pausa],
+                       ['callback', _display('/')]]
+        if rnd.random() < funds:
+            fundo, uf, ordem = rnd.choice(FUNDOS), rnd.choice(estados), rnd.choice(ORDENS)
+            passos += [['callback', _display('/fundos')], ['pausa', pausa],
+                       ['callback', _fund_list(fundo, uf, ordem, 0, 0)],
+                       ['callback', _fund_list(fundo, uf, ordem, 1, 0)]]
+        sessoes.append(passos)
+    return sessoes
+
+
+def cidades_do_layout(base):
+    # O dcc.Store 'cities-by-state' do layout: {UF: [[nome, slug], ...]}
+    layout = json.loads(_pedido_simples(base, '/_dash-layout'))
+    pendentes = [layout]
+    while pendentes:
+        no = pendentes.pop()
+        if isinstance(no, dict):
+            if no.get('props', {}).get('id') == 'cities-by-state':
+                return no['props']['data']
+            pendentes.extend(no.values())
+        elif isinstance(no, list):
+            pendentes.extend(no)
+    raise RuntimeError("layout sem o Store 'cities-by-state'")
+
+
+def _pedido_simples(base, caminho):
+    url = urllib.parse.urlsplit(base)
+    conexao = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+    try:
+        conexao.request('GET', caminho)
+        return conexao.getresponse().read()
+    finally:
+        conexao.close()
+
+
+## Usuário virtual
+class Usuario:
+    def __init__(self, base):
+        url = urllib.parse.urlsplit(base)
+        self.host, self.porta = url.hostname, url.port
+        self.conexao = None
+        self.etags = {}  # url ou corpo do callback -> ETag
+        self.medidas = []  # (nome, ms, bytes, status)
+
+    def _envia(self, metodo, caminho, corpo=None, headers=None):
+        for tentativa in range(2):
+            if self.conexao is None:
+                self.conexao = http.client.HTTPConnection(self.host, self.porta, timeout=120)
+            try:
+                self.conexao.request(metodo, caminho, body=corpo, headers=headers or {})
+                resposta = self.conexao.getresponse()
+                return resposta, resposta.read()
+            except (http.client.HTTPException, OSError):
+                # Conexão fechada pelo servidor (keep-alive expirado): reabre uma vez
+                self.conexao.close()
+                self.conexao = None
+                if tentativa:
+                    raise
+
+    def _mede(self, nome, metodo, caminho, corpo=None, chave=None):
+        headers = {'Accept-Encoding': 'gzip, deflate, br'}
+        if corpo is not None:
+            headers['Content-Type'] = 'application/json'
+        if chave in self.etags:
+            headers['If-None-Match'] = self.etags[chave]
+        inicio = time.perf_counter()
+        try:
+            resposta, dados = self._envia(metodo, caminho, corpo, headers)
+        except (http.client.HTTPException, OSError):
+            self.medidas.append((nome, (time.perf_counter() - inicio) * 1000, 0, 'erro'))
+            return None
+        self.medidas.append((nome, (time.perf_counter() - inicio) * 1000, len(dados), resposta.status))
+        if resposta.status == 200 and chave is not None and resposta.getheader('ETag'):
+            self.etags[chave] = resposta.getheader('ETag')
+        if resposta.status == 200 and resposta.getheader('Content-Encoding') == 'gzip':
+            dados = gzip.decompress(dados)
+        return dados if resposta.status == 200 else b''
+
+    def sessao(self, passos):
+        for tipo, valor in passos:
+            if tipo == 'pausa':
+                if valor:
+                    time.sleep(valor)
+            elif tipo == 'get':
+                self._mede(_rota(valor), 'GET', valor, chave=valor)
+            else:
+                corpo = json.dumps(valor)
+                dados = self._mede(CALLBACKS.get(valor['output'], valor['output']), 'POST',
+                                   '/_dash-update-component', corpo, chave=corpo)
+                # A página de cidade traz a URL da geometria do estado (o encoder
+                # do Dash escapa '/' como \u002f); o navegador baixa uma vez
+                if dados:
+                    texto = dados.decode('utf-8', 'replace').replace('\\u002f', '/')
+                    for url in sorted(set(re.findall(r'/geo/[^"\\]+', texto))):
+                        if url not in self.etags:
+                            self._mede('geometria', 'GET', url, chave=url)
+
+    def fecha(self):
+        if self.conexao is not None:
+            self.conexao.close()
+
+
+def _rota(url):
+    caminho = urllib.parse.urlsplit(url).path
+    return 'html' if caminho == '/' else caminho.lstrip('/')
+
+
+def carga(base, sessoes, usuarios, duracao):
+    # Cada usuário pega a próxima sessão da lista (circular) até acabar o tempo
+    fim = time.monotonic() + duracao
+    proxima = iter(range(sys.maxsize))
+    trava = threading.Lock()
+    todos = [Usuario(base) for _ in range(usuarios)]
+    concluidas = []
+
+    def roda(usuario):
+        while time.monotonic() < fim:
+            with trava:
+                i = next(proxima)
+            usuario.sessao(sessoes[i % len(sessoes)])
+            concluidas.append(i)
+        usuario.fecha()
+
+    threads = [threading.Thread(target=roda, args=(u,)) for u in todos]
+    inicio = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.monotonic() - inicio
+    return [m for u in todos for m in u.medidas], len(concluidas), decorrido
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def resumo(medidas, sessoes, decorrido, usuarios):
+    linhas = [f"{usuarios} usuário(s): {len(medidas) / decorrido:.1f} pedidos/s, "
+              f"{sessoes / decorrido:.2f} sessões/s em {decorrido:.1f} s",
+              f"  {'callback/rota':<22} {'pedidos':>8} {'erros':>6} {'304':>6} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'máx ms':>8} {'KiB médio':>10}"]
+    por_nome = {}
+    for nome, ms, tamanho, status in medidas:
+        por_nome.setdefault(nome, []).append((ms, tamanho, status))
+    for nome in sorted(por_nome, key=lambda n: (n not in CALLBACKS.values(), n)):
+        amostras = por_nome[nome]
+        tempos = [ms for ms, _, _ in amostras]
+        erros = sum(1 for _, _, status in amostras if status == 'erro' or status not in (200, 304))
+        nao_mudou = sum(1 for _, _, status in amostras if status == 304)
+        linhas.append(
+            f"  {nome:<22} {len(amostras):>8} {erros:>6} {nao_mudou:>6} {percentil(tempos, 50):>8.1f} "
+            f"{percentil(tempos, 95):>8.1f} {percentil(tempos, 99):>8.1f} {max(tempos):>8.1f} "
+            f"{sum(t for _, t, _ in amostras) / len(amostras) / 1024:>10.1f}")
+    return linhas
+
+
+def sobe_gunicorn(workers, threads):
+    porta = _porta_livre()
+    env = {**os.environ, 'PORT': str(porta), 'WEB_CONCURRENCY': str(workers), 'GUNICORN_THREADS': str(threads)}
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:server', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{porta}'],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    _espera(porta, processo)
+    return processo, f'http://127.0.0.1:{porta}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', default='1,4,16', help="níveis de concorrência, separados por vírgula")
+    parser.add_argument('--duration', type=float, default=20, help="segundos por nível")
+    parser.add_argument('--warmup', type=float, default=3, help="segundos de aquecimento antes de medir")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', '2')))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('GUNICORN_THREADS', '1')))
+    parser.add_argument('--url', default='', help="servidor já no ar (não sobe o gunicorn)")
+    parser.add_argument('--sessions', default='', help="arquivo .jsonl com sessões gravadas")
+    parser.add_argument('--record', default='', help="grava as sessões sintetizadas neste arquivo")
+    parser.add_argument('--n-sessions', type=int, default=200)
+    parser.add_argument('--funds', type=float, default=0.2, help="fração das sessões que visita /fundos")
+    parser.add_argument('--think', type=float, default=0.0, help="pausa entre passos (s)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    processo = None
+    base = args.url.rstrip('/')
+    if not base:
+        processo, base = sobe_gunicorn(args.workers, args.threads)
+    try:
+        if args.sessions:
+            with open(args.sessions, encoding='utf-8') as f:
+                sessoes = [json.loads(linha) for linha in f if linha.strip()]
+        else:
+            sessoes = sintetiza(cidades_do_layout(base), args.n_sessions, args.seed, args.funds, args.think)
+        if args.record:
+            with open(args.record, 'w', encoding='utf-8') as f:
+                for passos in sessoes:
+                    f.write(json.dumps(passos, ensure_ascii=False) + '\n')
+
+        linhas = [f"{base if args.url else f'gunicorn: {args.workers} worker(s) x {args.threads} thread(s)'}; "
+                  f"{len(sessoes)} sessões, {args.duration:.0f} s por nível"]
+        print(linhas[0], flush=True)
+        if args.warmup:
+            carga(base, sessoes, max(int(v) for v in args.users.split(',')), args.warmup)
+        for usuarios in (int(v) for v in args.users.split(',')):
+            medidas, concluidas, decorrido = carga(base, sessoes, usuarios, args.duration)
+            bloco = resumo(medidas, concluidas, decorrido, usuarios)
+            print('\n'.join(bloco), flush=True)
+            linhas += bloco
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(linhas) + '\n')
@@ -0,0 +1,244 @@
+# Microbenchmarks dos caminhos quentes do app, com os dados reais (ibge.txt,
+# ibge.snap e cityjsons/), no melhor e no pior estado: DF (a menor geometria;
+# ibge.txt não tem o Distrito Federal, então DF só entra nos casos de
+# geometria), RR (15 municípios, o menor estado com dados) e MG (853
+# municípios, a maior lista). Os casos por cidade usam o município mais
+# populoso do estado.
+#
+# Para cada caso: tempo (mínimo e mediana de --repeat execuções), alocação
+# (mediana do pico do tracemalloc em --alloc-repeat execuções à parte, para
+# não pesar no tempo) e o tamanho da saída serializada (JSON, como o Dash
+# envia; bytes quando a saída já é binária). O app é importado com
+# DEFERRED_INIT=eager: nenhuma thread de inicialização (startup.py) aloca ou
+# disputa a CPU durante as medidas.
+#
+# Modos:
+#     python benchmarks/microbench.py                 # mede e imprime
+#     python benchmarks/microbench.py --save          # grava as referências
+#     python benchmarks/microbench.py --check         # compara com as referências
+#     python benchmarks/microbench.py --only city_page
+# No --check o script sai com código 1 se algum caso passar da tolerância:
+# tempo e alocação relativos (padrão 25% e 10%), tamanho exato; não grava
+# benchmarks/reports/microbench.txt. O tempo comparado é o mínimo (a mediana
+# varia com a carga da máquina). No --save cada caso é medido em
+# --save-rounds rodadas e a referência de tempo é o maior dos mínimos: o teto
+# do ruído da máquina, e não uma rodada de sorte. As tolerâncias vêm de
+# benchmarks/baselines/microbench.json e podem ser trocadas com
+# --tolerance tempo=0.5,alocacao=0.2. Casos fora da tolerância são medidos de
+# novo (--retries, padrão 3) e só contam se falharem em todas. Referências de
+# tempo só valem na mesma máquina; em outra, rode --save antes de mudar o
+# código.
+#
+# update_city_buttons não existe mais: a lista de cidades é montada no
+# navegador (assets/citylist.js) a partir do dcc.Store 'cities-by-state';
+# o caso city_list mede a fatia desse Store para o estado.
+# Rodar a partir de F2C-app/.
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(APP_DIR, 'benchmarks', 'baselines', 'microbench.json')
+REPORT_PATH = os.path.join(APP_DIR, 'benchmarks', 'reports', 'microbench.txt')
+TOLERANCIAS = {'tempo': 0.25, 'alocacao': 0.10, 'bytes': 0.0}
+# Diferença absoluta abaixo da qual não há regressão (ruído de medida). O
+# piso de tempo é o ruído entre processos medido em uma VM de 1 CPU: o mesmo
+# caso de 0,6 ms mede 0,6 ou 0,9 ms conforme o processo; casos menores que
+# isso são vigiados pela alocação e pelo tamanho da saída
+PISOS = {'tempo': 0.5, 'alocacao': 4.0, 'bytes': 0}
+
+ESTADOS = ['DF', 'RR', 'MG']
+
+sys.path.insert(0, APP_DIR)
+os.chdir(APP_DIR)
+os.environ['DEFERRED_INIT'] = 'eager'
+
+
+def serializa(valor):
+    if isinstance(valor, (bytes, bytearray)):
+        return bytes(valor)
+    import plotly
+    return json.dumps(valor, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8')
+
+
+def _casos():
+    # (nome, estado, função) — a função recebe nada e devolve a saída a serializar
+    import app
+    from data import load_data
+    from geo import GeoCache
+
+    casos = [
+        ('load_data[csv]', '-', lambda: load_data(snapshot_path='')[2]),
+        ('load_data[snap]', '-', lambda: load_data()[2]),
+        ('cities_by_state_data', '-', app.cities_by_state_data),
+    ]
+    store = app.cities_by_state_data()
+    for uf in ESTADOS:
+        # Leitura fria (cache novo a cada execução) nos dois modos do GeoCache
+        casos += [
+            ('geo_state[parsed]', uf, lambda uf=uf: GeoCache(mode='parsed').state(uf)),
+            ('geo_state[mmap]', uf, lambda uf=uf: GeoCache(mode='mmap').state(uf)),
+        ]
+        codes = app.CITIES_BY_STATE.get(uf)
+        if not codes:
+            continue
+        code = max(codes, key=lambda c: app.CITIES_DATA[c]['demographic']['População'] or 0)
+        valores = [app.CITIES_DATA[c][grupo][chave] for c in codes
+                   for grupo, chave in (('demographic', 'População'), ('demographic', 'Densidade'),
+                                        ('economic', 'PIB'), ('economic', 'Receitas'))]
+        casos += [
+            ('geo_feature[mmap]', uf, lambda code=code: GeoCache(mode='mmap').feature(code)),
+            ('city_page', uf, lambda code=code: app.city_page(code)),
+            ('city_list', uf, lambda uf=uf: store[uf]),
+            ('format_value', uf, lambda valores=valores: [app.format_value(v) for v in valores]),
+        ]
+    return casos
+
+
+def medir(func, repeat, alloc_repeat=5):
+    func()  # aquece caches de import e do sistema de arquivos
+    # Como o timeit: coletor de lixo parado durante as medidas de tempo, senão
+    # uma coleta disparada pelo lixo dos casos anteriores cai em um caso qualquer
+    gc.collect()
+    gc.disable()
+    tempos = []
+    try:
+        for _ in range(repeat):
+            inicio = time.perf_counter()
+            saida = func()
+            tempos.append(time.perf_counter() - inicio)
+    finally:
+        gc.enable()
+
+    picos = []
+    for _ in range(alloc_repeat):
+        gc.collect()
+        tracemalloc.start()
+        base, _ = tracemalloc.get_traced_memory()
+        func()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        picos.append(pico - base)
+
+    return {
+        'min_ms': min(tempos) * 1000,
+        'mediana_ms': statistics.median(tempos) * 1000,
+        'alocacao_kib': statistics.median(picos) / 1024,
+        'bytes': len(serializa(saida)),
+    }
+
+
+def referencia(func, rodadas, repeat, alloc_repeat):
+    # Tempo: o maior dos mínimos das rodadas; alocação: a mediana
+    medidas = [medir(func, repeat, alloc_repeat) for _ in range(rodadas)]
+    return {
+        'min_ms': max(m['min_ms'] for m in medidas),
+        'mediana_ms': statistics.median(m['mediana_ms'] for m in medidas),
+        'alocacao_kib': statistics.median(m['alocacao_kib'] for m in medidas),
+        'bytes': medidas[-1]['bytes'],
+    }
+
+
+def _excede(atual, referencia, tolerancia, piso):
+    return atual > referencia * (1 + tolerancia) and atual - referencia > piso
+
+
+def compara(resultados, referencias, tolerancias):
+    falhas = []
+    for chave, r in resultados.items():
+        ref = referencias.get(chave)
+        if ref is None:
+            continue
+        for metrica, campo in (('tempo', 'min_ms'), ('alocacao', 'alocacao_kib'), ('bytes', 'bytes')):
+            if _excede(r[campo], ref[campo], tolerancias[metrica], PISOS[metrica]):
+                falhas.append((chave, f"{chave}: {campo} {r[campo]:,.2f} > {ref[campo]:,.2f} "
+                                      f"(tolerância {tolerancias[metrica]:.0%})"))
+    return falhas
+
+
+def _tolerancias(texto, arquivo):
+    tolerancias = {**TOLERANCIAS, **arquivo}
+    for parte in filter(None, (texto or '').split(',')):
+        nome, _, valor = parte.partition('=')
+        if nome not in TOLERANCIAS:
+            raise SystemExit(f"tolerância desconhecida: {nome} (use {', '.join(TOLERANCIAS)})")
+        tolerancias[nome] = float(valor)
+    return tolerancias
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--alloc-repeat', type=int, default=5)
+    parser.add_argument('--only', default='', help="nomes de casos separados por vírgula")
+    parser.add_argument('--save', action='store_true')
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--tolerance', default='')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--save-rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    guardado = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            guardado = json.load(f)
+    tolerancias = _tolerancias(args.tolerance, guardado.get('tolerancias', {}))
+    referencias = guardado.get('casos', {})
+
+    filtro = set(filter(None, args.only.split(',')))
+    linhas = [f"{'caso':<22} {'UF':<3} {'min ms':>9} {'mediana ms':>11} {'alocação KiB':>13} {'bytes':>11}"
+              + (f" {'Δ min':>10}" if referencias else '')]
+    print(linhas[0], flush=True)
+    resultados = {}
+    funcoes = {}
+    for nome, uf, func in _casos():
+        if filtro and nome not in filtro and nome.split('[')[0] not in filtro:
+            continue
+        chave = f'{nome}/{uf}'
+        funcoes[chave] = func
+        if args.save:
+            r = resultados[chave] = referencia(func, args.save_rounds, args.repeat, args.alloc_repeat)
+        else:
+            r = resultados[chave] = medir(func, args.repeat, args.alloc_repeat)
+        linha = (f"{nome:<22} {uf:<3} {r['min_ms']:>9.2f} {r['mediana_ms']:>11.2f} "
+                 f"{r['alocacao_kib']:>13,.1f} {r['bytes']:>11,}")
+        if referencias.get(chave, {}).get('min_ms'):
+            linha += f" {r['min_ms'] / referencias[chave]['min_ms'] - 1:>+10.0%}"
+        linhas.append(linha)
+        print(linha, flush=True)
+
+    if args.save:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        casos = {**referencias, **resultados} if filtro else resultados
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'tolerancias': {**TOLERANCIAS, **guardado.get('tolerancias', {})},
+                       'casos': {k: {c: round(v, 3) for c, v in r.items()} for k, r in casos.items()}},
+                      f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"referências gravadas em {os.path.relpath(BASELINE_PATH, APP_DIR)}")
+    elif not filtro and not args.check:
+        with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(linhas) + '\n')
+
+    if args.check:
+        if not referencias:
+            raise SystemExit("sem referências: rode com --save primeiro")
+        falhas = compara(resultados, referencias, tolerancias)
+        # Um caso fora da tolerância é medido de novo (até --retries vezes): uma
+        # regressão real falha em todas, um momento de máquina lenta não
+        for _ in range(args.retries):
+            if not falhas:
+                break
+            novos = {chave: medir(funcoes[chave], args.repeat, args.alloc_repeat) for chave in dict(falhas)}
+            falhas = compara(novos, referencias, tolerancias)
+        falhas = [texto for _, texto in falhas]
+        for falha in falhas:
+            print(f"REGRESSÃO {falha}")
+        if falhas:
+            sys.exit(1)
+        print(f"ok: {len(resultados)} casos dentro da tolerância")
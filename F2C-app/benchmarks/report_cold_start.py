@@ -0,0 +1,155 @@
+# Cold start: tempo de import por módulo e tempo até a primeira resposta.
+#
+# 1. python -X importtime -c "import app": tempo acumulado de cada import
+#    direto de app.py (dash, pandas, ...) e o tempo próprio de app.py, que é
+#    a inicialização (dados, índices, layout).
+# 2. Para cada modo de DEFERRED_INIT, sobe "gunicorn app:server -c
+#    gunicorn.conf.py" do zero (como o Render ao acordar o serviço) e mede, a
+#    partir do spawn:
+#       html        primeira resposta de GET /
+#       home        página inicial pronta: /, _dash-layout, _dash-dependencies
+#                   e o callback display_page('/')
+#       cidade      em seguida, a primeira página de cidade (Belo Horizonte)
+#       busca       em seguida, o índice de busca (/search/index.json)
+#    e lê /stats/startup (marcas do worker que atendeu, esperando que ele
+#    termine os adiados).
+#    Os modos: 'eager' (padrão com preload: tudo montado no master e dividido
+#    com os workers) e 'fork' (opcional: busca, fundos, agregados e geometria
+#    montados em cada worker depois do fork).
+# Rodar a partir de F2C-app/:
+#     python benchmarks/report_cold_start.py [--runs 3]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from report_worker_memory import _porta_livre
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(APP_DIR, 'benchmarks', 'reports', 'cold_start.txt')
+MODOS = ['eager', 'fork']
+MARCAS = ['imports', 'dados', 'app importado', 'adiados prontos']
+
+
+def import_times():
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=APP_DIR,
+                           env={**os.environ, 'DEFERRED_INIT': 'fork'}, capture_output=True, text=True,
+                           check=True).stderr
+    # Os filhos aparecem antes do pai: guarda os imports de profundidade 1 até
+    # achar o de profundidade 0 (app ou, antes dele, os do próprio Python)
+    pendentes, proprio = {}, 0
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:'):
+            continue
+        _, self_us, acumulado, coluna = linha.replace('import time:', '|', 1).split('|')
+        if not self_us.strip().isdigit():
+            continue
+        nome = coluna.strip()
+        profundidade = (len(coluna) - len(coluna.lstrip())) // 2
+        if profundidade == 0:
+            if nome == 'app':
+                return int(self_us), pendentes
+            pendentes = {}
+        elif profundidade == 1:
+            pendentes[nome] = int(acumulado)
+    return proprio, pendentes
+
+
+def _pedido(porta, caminho, corpo=None):
+    pedido = urllib.request.Request(
+        f'http://127.0.0.1:{porta}{caminho}', data=corpo,
+        headers={'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'} if corpo else {},
+    )
+    with urllib.request.urlopen(pedido, timeout=60) as resposta:
+        return resposta.read()
+
+
+def _display(pathname):
+    return json.dumps({
+        'output': 'page-content.children',
+        'outputs': {'id': 'page-content', 'property': 'children'},
+        'inputs': [{'id': 'url', 'property': 'pathname', 'value': pathname}],
+        'changedPropIds': ['url.pathname'],
+        'state': [],
+    }).encode('utf-8')
+
+
+def _mediana(valores):
+    valores = [v for v in valores if v is not None]
+    return f"{statistics.median(valores):>19.0f}" if valores else f"{'-':>19}"
+
+
+def medir(modo):
+    porta = _porta_livre()
+    env = {**os.environ, 'DEFERRED_INIT': modo, 'PORT': str(porta)}
+    inicio = time.monotonic()
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:server', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{porta}'],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    tempos = {}
+    try:
+        while True:
+            if processo.poll() is not None:
+                raise RuntimeError("gunicorn saiu durante o boot")
+            try:
+                _pedido(porta, '/')
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        tempos['html'] = time.monotonic() - inicio
+        _pedido(porta, '/_dash-layout')
+        _pedido(porta, '/_dash-dependencies')
+        _pedido(porta, '/_dash-update-component', _display('/'))
+        tempos['home'] = time.monotonic() - inicio
+        _pedido(porta, '/_dash-update-component', _display('/mg/belo-horizonte'))
+        tempos['cidade'] = time.monotonic() - inicio
+        _pedido(porta, '/search/index.json')
+        tempos['busca'] = time.monotonic() - inicio
+        # Espera os adiados do worker que atender (até 10 s)
+        for _ in range(200):
+            marcas = json.loads(_pedido(porta, '/stats/startup'))['marks_ms']
+            if 'adiados prontos' in marcas:
+                break
+            time.sleep(0.05)
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+    return {**{k: v * 1000 for k, v in tempos.items()}, **{m: marcas.get(m) for m in MARCAS}}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    proprio, diretos = import_times()
+    linhas = ["import app (python -X importtime), ms acumulados por import direto:"]
+    for nome, us in sorted(diretos.items(), key=lambda item: -item[1])[:10]:
+        linhas.append(f"  {nome:<24} {us / 1000:>8.1f}")
+    linhas.append(f"  {'app.py (inicialização)':<24} {proprio / 1000:>8.1f}")
+    linhas.append(f"  {'total':<24} {(proprio + sum(diretos.values())) / 1000:>8.1f}")
+    print('\n'.join(linhas), flush=True)
+
+    colunas = ['html', 'home', 'cidade', 'busca'] + MARCAS
+    linhas += ["", f"gunicorn do zero, ms desde o spawn (mediana de {args.runs}); marcas de /stats/startup",
+               f"{'DEFERRED_INIT':<14}" + ''.join(f"{c:>19}" for c in colunas)]
+    print('\n'.join(linhas[-2:]), flush=True)
+    # Modos intercalados a cada rodada, para que variações da máquina (cache
+    # de disco, CPU) não favoreçam um deles
+    execucoes = {modo: [] for modo in MODOS}
+    for _ in range(args.runs):
+        for modo in MODOS:
+            execucoes[modo].append(medir(modo))
+    for modo in MODOS:
+        linha = f"{modo:<14}" + ''.join(_mediana(e[c] for e in execucoes[modo]) for c in colunas)
+        linhas.append(linha)
+        print(linha, flush=True)
+
+    with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(linhas) + '\n')
@@ -0,0 +1,152 @@
+# Memória por worker do gunicorn conforme o número de workers cresce.
+#
+# Para cada configuração e cada número de workers, sobe
+# "gunicorn app:server -c gunicorn.conf.py" em uma porta livre, espera o boot,
+# abre uma amostra de páginas de cidade (o callback display_page) e lê
+# /proc/<pid>/smaps_rollup do master e de cada worker:
+#   USS  Private_Clean + Private_Dirty (o que o processo não divide com ninguém)
+#   PSS  RSS com as páginas compartilhadas divididas entre os processos
+# Configurações:
+#   legado         sem preload, dicts por município, GeoJSON decodificado
+#   preload        preload + gc.freeze, mas com as estruturas de antes
+#   compartilhado  preload + gc.freeze + SHARED_DATA=1 (padrão de gunicorn.conf.py)
+#   adiado         compartilhado com DEFERRED_INIT=fork: busca, fundos,
+#                  agregados e geometria montados em cada worker (startup.py)
+# Com GEOJSON_WARMUP=all (padrão aqui) o cache de GeoJSON é carregado no boot.
+# Rodar a partir de F2C-app/ (Linux):
+#     python benchmarks/report_worker_memory.py [--workers 1,2,4] [--warmup all|""]
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(APP_DIR, 'benchmarks', 'reports', 'worker_memory.txt')
+
+CONFIGS = {
+    'legado': {'GUNICORN_PRELOAD': '0', 'SHARED_DATA': '0', 'DEFERRED_INIT': 'eager'},
+    'preload': {'GUNICORN_PRELOAD': '1', 'SHARED_DATA': '0', 'DEFERRED_INIT': 'eager'},
+    'compartilhado': {'GUNICORN_PRELOAD': '1', 'SHARED_DATA': '1', 'DEFERRED_INIT': 'eager'},
+    'adiado': {'GUNICORN_PRELOAD': '1', 'SHARED_DATA': '1', 'DEFERRED_INIT': 'fork'},
+}
+
+PAGINAS = ['/sp/sao-paulo', '/rj/rio-de-janeiro', '/mg/belo-horizonte', '/ba/salvador', '/am/manaus',
+           '/rs/porto-alegre', '/pe/recife', '/ce/fortaleza', '/pa/belem', '/go/goiania']
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _abre(porta, pathname):
+    corpo = json.dumps({
+        'output': 'page-content.children',
+        'outputs': {'id': 'page-content', 'property': 'children'},
+        'inputs': [{'id': 'url', 'property': 'pathname', 'value': pathname}],
+        'changedPropIds': ['url.pathname'],
+        'state': [],
+    }).encode('utf-8')
+    pedido = urllib.request.Request(
+        f'http://127.0.0.1:{porta}/_dash-update-component', data=corpo,
+        headers={'Content-Type': 'application/json', 'Connection': 'close'},
+    )
+    with urllib.request.urlopen(pedido, timeout=60) as resposta:
+        resposta.read()
+
+
+def _espera(porta, processo, limite=120):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise RuntimeError("gunicorn saiu durante o boot")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{porta}/', timeout=5) as resposta:
+                if resposta.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("gunicorn não respondeu")
+
+
+def _filhos(pid):
+    filhos = []
+    for nome in os.listdir('/proc'):
+        if nome.isdigit():
+            try:
+                with open(f'/proc/{nome}/stat') as f:
+                    # O campo 4 é o ppid; o nome (campo 2) pode ter espaços
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        filhos.append(int(nome))
+            except (OSError, ValueError, IndexError):
+                pass
+    return sorted(filhos)
+
+
+def memoria(pid):
+    campos = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for linha in f:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == 'kB':
+                campos[partes[0].rstrip(':')] = int(partes[1])
+    return {
+        'rss': campos['Rss'] / 1024,
+        'pss': campos['Pss'] / 1024,
+        'uss': (campos['Private_Clean'] + campos['Private_Dirty']) / 1024,
+    }
+
+
+def medir(config, n_workers, warmup, rodadas=3):
+    porta = _porta_livre()
+    env = {**os.environ, **CONFIGS[config], 'PORT': str(porta), 'WEB_CONCURRENCY': str(n_workers),
+           'GEOJSON_WARMUP': warmup}
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:server', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{porta}'],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _espera(porta, processo)
+        # Conexões novas a cada pedido, para espalhar as páginas entre os workers
+        for _ in range(rodadas * n_workers):
+            for pathname in PAGINAS:
+                _abre(porta, pathname)
+        time.sleep(1)
+        workers = [memoria(pid) for pid in _filhos(processo.pid)]
+        return memoria(processo.pid), workers
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+
+
+def _media(workers, chave):
+    return sum(w[chave] for w in workers) / len(workers)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--warmup', default='all')
+    parser.add_argument('--configs', default=','.join(CONFIGS))
+    args = parser.parse_args()
+
+    linhas = [f"GEOJSON_WARMUP={args.warmup!r}; MB por processo (USS = memória privada)",
+              f"{'config':<14} {'workers':>7} {'master USS':>10} {'worker USS':>10} {'worker PSS':>10} "
+              f"{'worker RSS':>10} {'total PSS':>10}"]
+    print('\n'.join(linhas))
+    for config in args.configs.split(','):
+        for n in (int(v) for v in args.workers.split(',')):
+            master, workers = medir(config, n, args.warmup)
+            total = master['pss'] + sum(w['pss'] for w in workers)
+            linha = (f"{config:<14} {n:>7} {master['uss']:>10.1f} {_media(workers, 'uss'):>10.1f} "
+                     f"{_media(workers, 'pss'):>10.1f} {_media(workers, 'rss'):>10.1f} {total:>10.1f}")
+            linhas.append(linha)
+            print(linha, flush=True)
+
+    with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(linhas) + '\n')
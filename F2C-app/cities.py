@@ -0,0 +1,62 @@
+import re
+import unicodedata
+
+from data import field_values
+
+_NAO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+_CODIGO = re.compile(r'^\d{7}$')
+
+
+def fold(texto):
+    # Remove acentos e normaliza caixa: "São João d'Aliança" -> "sao joao d'alianca"
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().strip()
+
+
+def slugify(texto):
+    return _NAO_ALFANUMERICO.sub('-', fold(texto)).strip('-')
+
+
+## Índice de municípios por código IBGE, com índices secundários
+class CityIndex:
+    def __init__(self, cities_data):
+        self.by_code = cities_data
+        self.by_uf_slug = {}
+        self.by_name = {}
+        self._urls = {}
+        nomes = field_values(cities_data, 'basic', 'Município')
+        ufs = field_values(cities_data, 'basic', 'Estado')
+        for code, nome, uf in zip(cities_data, nomes, ufs):
+            slug = slugify(nome)
+            self.by_uf_slug[(uf, slug)] = code
+            # Nomes sem acento podem se repetir entre estados
+            self.by_name.setdefault(slug, []).append(code)
+            self._urls[code] = f"/{uf.lower()}/{slug}"
+
+    def __len__(self):
+        return len(self.by_code)
+
+    def get(self, code):
+        return self.by_code.get(str(code))
+
+    def lookup(self, uf, nome):
+        return self.by_uf_slug.get((str(uf).upper(), slugify(nome)))
+
+    def find_by_name(self, nome):
+        return self.by_name.get(slugify(nome), [])
+
+    def url_for(self, code):
+        return self._urls[code]
+
+    def resolve(self, path):
+        # Aceita /<código>, /<uf>/<slug> e, por compatibilidade, /<nome>.
+        # Devolve a lista de códigos candidatos (vazia se nada bater)
+        partes = [p for p in path.strip('/').split('/') if p]
+        if len(partes) == 1 and _CODIGO.match(partes[0]):
+            return [partes[0]] if partes[0] in self.by_code else []
+        if len(partes) == 2:
+            code = self.lookup(*partes)
+            return [code] if code else []
+        if len(partes) == 1:
+            return self.find_by_name(partes[0])
+        return []
@@ -0,0 +1,249 @@
+import hashlib
+import os
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+import snapshot
+
+IBGE_PATH = 'ibge.txt'
+SICONFI_PATH = 'siconfi.txt'
+SNAPSHOT_PATH = 'ibge.snap'
+
+# Origem dos dados do app: 'files' (snapshot/ibge.txt + siconfi.txt) ou 'db'
+# (banco de DATABASE_URL, carregado com python db.py)
+DATA_SOURCE = os.getenv('DATA_SOURCE', 'files')
+
+# SHARED_DATA=1 (ligado por gunicorn.conf.py): CITIES_DATA vira uma CityTable,
+# apoiada em arrays numpy, em vez de um dict de dicts por município
+SHARED_DATA = os.getenv('SHARED_DATA', '0') == '1'
+
+## Esquema declarativo das colunas usadas de ibge.txt
+# coluna no arquivo -> (dtype, grupo em CITIES_DATA, chave dentro do grupo)
+SCHEMA = {
+    'Município [-]': ('category', None, None),
+    'Código [-]': ('str', 'basic', 'Código'),
+    'Gentílico [-]': ('category', 'basic', 'Gentílico'),
+    'Prefeito [2025]': ('category', 'basic', 'Prefeito'),
+    'Área Territorial - km² [2024]': ('float32', 'demographic', 'Área'),
+    'População no último censo - pessoas [2022]': ('float32', 'demographic', 'População'),
+    'Densidade demográfica - hab/km² [2022]': ('float32', 'demographic', 'Densidade'),
+    'População estimada - pessoas [2024]': ('float32', 'demographic', 'População_Estimada'),
+    'IDHM (Índice de desenvolvimento humano municipal) [2010]': ('float32', 'demographic', 'IDHM'),
+    'PIB per capita - R$ [2021]': ('float32', 'economic', 'PIB'),
+    'Total de receitas brutas realizadas - R$ [2024]': ('float64', 'economic', 'Receitas'),
+    'Total de despesas brutas empenhadas - R$ [2024]': ('float64', 'economic', 'Despesas'),
+}
+
+## Colunas de siconfi.txt (dívida consolidada, RCL e CAPAG), juntadas pelo
+# código IBGE quando o arquivo existe; sem ele ficam vazias
+SICONFI_SCHEMA = {
+    'DC [2024]': ('float64', 'fiscal', 'DC'),
+    'RCL [2024]': ('float64', 'fiscal', 'RCL'),
+    'CAPAG [2024]': ('category', 'fiscal', 'CAPAG'),
+}
+
+# Todas as colunas do frame carregado
+FRAME_SCHEMA = {**SCHEMA, **SICONFI_SCHEMA}
+
+# Marcadores de valor ausente usados pelo IBGE nas colunas numéricas
+NA_VALUES = ['-', '...', 'X']
+
+# Código para mapear estado a partir dos dois primeiros dígitos do código do município
+CODIGO_PARA_UF = {
+    11: "RO", 12: "AC", 13: "AM", 14: "RR", 15: "PA", 16: "AP", 17: "TO",
+    21: "MA", 22: "PI", 23: "CE", 24: "RN", 25: "PB", 26: "PE", 27: "AL", 28: "SE", 29: "BA",
+    31: "MG", 32: "ES", 33: "RJ", 35: "SP",
+    41: "PR", 42: "SC", 43: "RS",
+    50: "MS", 51: "MT", 52: "GO", 53: "DF"
+}
+
+# Tabela de consulta indexada pelo prefixo (0-99) do código
+_UF_LOOKUP = np.full(100, "Desconhecido", dtype=object)
+for _prefixo, _uf in CODIGO_PARA_UF.items():
+    _UF_LOOKUP[_prefixo] = _uf
+
+
+def _to_float(serie, dtype):
+    # Colunas que o parser C já leu como número só precisam do cast;
+    # as demais (ex.: decimal com vírgula) passam pela normalização
+    if not pd.api.types.is_numeric_dtype(serie):
+        serie = pd.to_numeric(serie.astype(str).str.replace(',', '.'), errors='coerce')
+    return serie.astype(dtype)
+
+
+def parse_frame(path=IBGE_PATH):
+    read_dtypes = {col: (str if dtype == 'str' else dtype)
+                   for col, (dtype, _, _) in SCHEMA.items()
+                   if not dtype.startswith('float')}
+    na_values = {col: NA_VALUES for col, (dtype, _, _) in SCHEMA.items() if dtype.startswith('float')}
+    df = pd.read_csv(path, usecols=list(SCHEMA), dtype=read_dtypes, na_values=na_values)
+
+    for col, (dtype, _, _) in SCHEMA.items():
+        if dtype.startswith('float'):
+            df[col] = _to_float(df[col], dtype)
+
+    prefixos = pd.to_numeric(df['Código [-]'].str.slice(0, 2), errors='coerce').fillna(0)
+    df['Estado'] = _UF_LOOKUP[prefixos.to_numpy(dtype=np.int64) % 100]
+    return join_siconfi(df)
+
+
+def join_siconfi(df, path=SICONFI_PATH):
+    if os.path.exists(path):
+        siconfi = pd.read_csv(path, usecols=['Código [-]', *SICONFI_SCHEMA],
+                              dtype={'Código [-]': str}, na_values=NA_VALUES)
+        df = df.merge(siconfi, on='Código [-]', how='left', validate='one_to_one')
+    for col, (dtype, _, _) in SICONFI_SCHEMA.items():
+        if col not in df:
+            df[col] = np.nan
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def build_structures(df, shared=None):
+    # CITIES_DATA é indexado pelo código IBGE (único); o nome fica em basic['Município']
+    cities_by_state = {
+        state: grupo.tolist()
+        for state, grupo in df.groupby('Estado', sort=True)['Código [-]']
+    }
+    states_list = list(cities_by_state)
+
+    if SHARED_DATA if shared is None else shared:
+        return states_list, cities_by_state, CityTable(df)
+
+    colunas = {col: df[col].tolist() for col in FRAME_SCHEMA}
+    estados = df['Estado'].tolist()
+    grupos = {}
+    for col, (_, grupo, chave) in FRAME_SCHEMA.items():
+        if grupo:
+            grupos.setdefault(grupo, []).append((chave, colunas[col]))
+
+    cities_data = {}
+    for i, code in enumerate(colunas['Código [-]']):
+        registro = {grupo: {chave: valores[i] for chave, valores in campos}
+                    for grupo, campos in grupos.items()}
+        registro['basic']['Município'] = colunas['Município [-]'][i]
+        registro['basic']['Estado'] = estados[i]
+        cities_data[code] = registro
+
+    return states_list, cities_by_state, cities_data
+
+
+def field_values(cities_data, grupo, chave, codes=None):
+    # Valores de um campo na ordem de codes (padrão: todos os municípios)
+    if isinstance(cities_data, CityTable):
+        return cities_data.column(grupo, chave, codes)
+    return [cities_data[code][grupo][chave] for code in (cities_data if codes is None else codes)]
+
+
+## CITIES_DATA em colunas
+# Mesmo acesso do dict de build_structures (cities_data[code][grupo][chave]),
+# mas os valores ficam em arrays numpy (números) e em códigos inteiros de
+# categorias (textos): com o app pré-carregado no master do gunicorn, os
+# workers compartilham essas páginas sem copiá-las, já que ler um array não
+# escreve em contador de referências de cada valor. O registro de uma cidade
+# é montado a cada acesso.
+class CityTable(Mapping):
+    def __init__(self, df):
+        self._pos = {code: i for i, code in enumerate(df['Código [-]'].tolist())}
+        self._colunas = {}
+        self._grupos = {}
+        campos = [(col, grupo, chave) for col, (_, grupo, chave) in FRAME_SCHEMA.items() if grupo]
+        campos += [('Município [-]', 'basic', 'Município'), ('Estado', 'basic', 'Estado')]
+        for col, grupo, chave in campos:
+            self._colunas[(grupo, chave)] = coluna = self._column(df[col])
+            self._grupos.setdefault(grupo, []).append((chave, coluna))
+
+    @staticmethod
+    def _column(serie):
+        if pd.api.types.is_float_dtype(serie):
+            return serie.to_numpy()
+        # Textos: códigos + categorias, com NaN no fim para o código -1 (ausente)
+        cat = pd.Categorical(serie)
+        categorias = np.empty(len(cat.categories) + 1, dtype=object)
+        categorias[:-1] = cat.categories.to_numpy(dtype=object)
+        categorias[-1] = np.nan
+        return cat.codes, categorias
+
+    @staticmethod
+    def _value(coluna, i):
+        if isinstance(coluna, tuple):
+            codes, categorias = coluna
+            return categorias[codes[i]]
+        return coluna[i].item()
+
+    def __getitem__(self, code):
+        i = self._pos[code]
+        return {grupo: {chave: self._value(coluna, i) for chave, coluna in campos}
+                for grupo, campos in self._grupos.items()}
+
+    def __contains__(self, code):
+        return code in self._pos
+
+    def __iter__(self):
+        return iter(self._pos)
+
+    def __len__(self):
+        return len(self._pos)
+
+    def column(self, grupo, chave, codes=None):
+        # Valores de um campo para todos os municípios (ou para codes), sem montar registros
+        coluna = self._colunas[(grupo, chave)]
+        linhas = np.arange(len(self._pos)) if codes is None else np.fromiter(
+            (self._pos[code] for code in codes), dtype=np.int64)
+        if isinstance(coluna, tuple):
+            codigos, categorias = coluna
+            return categorias[codigos[linhas]].tolist()
+        return coluna[linhas].tolist()
+
+
+def _schema_digest():
+    return hashlib.sha256(repr(sorted(FRAME_SCHEMA.items())).encode('utf-8')).hexdigest()
+
+
+def _snapshot_sources(path):
+    return snapshot.source_digests([path, SICONFI_PATH], extra={'schema': _schema_digest()})
+
+
+def dataset_version(path=IBGE_PATH, source=None):
+    # Identifica o conjunto de dados carregado: muda quando ibge.txt,
+    # siconfi.txt ou o esquema mudam (os mesmos digests que validam o snapshot);
+    # no banco, é a versão gravada na carga
+    if (source or DATA_SOURCE) == 'db':
+        import db
+        versao = db.dataset_version()
+        # Lida no boot, como o frame (ver load_frame): não deixa conexão no pool
+        db.release_connections()
+        return versao
+    sources = _snapshot_sources(path)
+    return hashlib.sha256(repr(sorted(sources.items())).encode('utf-8')).hexdigest()[:16]
+
+
+## Build do snapshot binário (ver snapshot.py)
+def build_snapshot(path=IBGE_PATH, snapshot_path=SNAPSHOT_PATH):
+    tables = {'ibge': parse_frame(path)}
+    snapshot.write_snapshot(snapshot_path, tables, _snapshot_sources(path))
+
+
+def load_frame(path=IBGE_PATH, snapshot_path=SNAPSHOT_PATH, source=None):
+    if (source or DATA_SOURCE) == 'db':
+        import db
+        df = db.read_frame()
+        # O frame é lido uma vez no boot: fecha as conexões para que workers
+        # criados por fork (gunicorn --preload) não herdem os sockets
+        db.release_connections()
+        return df
+    # O snapshot só é usado se os digests das fontes e do esquema baterem;
+    # caso contrário volta para o CSV
+    tabelas = snapshot.open_snapshot(snapshot_path, _snapshot_sources(path))
+    if tabelas is not None:
+        return tabelas['ibge']
+    if os.path.exists(snapshot_path):
+        print(f"Snapshot {snapshot_path} desatualizado, carregando {path}")
+    return parse_frame(path)
+
+
+## Função de Carregamento de Dados
+def load_data(path=IBGE_PATH, snapshot_path=SNAPSHOT_PATH, source=None):
+    return build_structures(load_frame(path, snapshot_path, source))
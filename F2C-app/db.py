@@ -1,6 +1,341 @@
 # db.py
-from sqlalchemy import create_engine
+## Backend opcional em banco de dados (PostgreSQL; SQLite como substituto local)
+#
+# Esquema normalizado:
+#   municipios     um registro por município (código IBGE, UF, dados fixos)
+#   financas       um registro por (município, ano): receitas, despesas, DC,
+#                  RCL e CAPAG
+#   fundos         fundos de funds.FUNDS
+#   regras_fundo   predicados de cada fundo (campo, operador, valor)
+#   elegibilidade  resultado de funds.evaluate_funds por (fundo, município)
+#   metadados      versão dos dados e digest das regras carregadas
+#
+# Carga (a partir da saída do ETL, ibge.txt + siconfi.txt):
+#     DATABASE_URL=postgresql://... python db.py
+# No PostgreSQL a carga usa COPY; nos demais bancos, insert em lote. Com
+# DATA_SOURCE=db, data.load_frame hidrata o frame do app a partir do banco.
+# DATABASE_URL=sqlite:// usa um SQLite em memória no próprio processo.
+import io
 import os
+import re
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (Boolean, Column, Float, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+                        create_engine, delete, select)
+from sqlalchemy.pool import StaticPool
+
+from data import FRAME_SCHEMA, SCHEMA, SICONFI_SCHEMA
 
 DATABASE_URL = os.getenv("DATABASE_URL")  # use Render environment variable
-engine = create_engine(DATABASE_URL)
\ No newline at end of file
+
+# Pool por processo (cada worker do gunicorn abre o seu): poucas conexões
+# fixas, descartadas após DB_POOL_RECYCLE segundos e testadas antes do uso
+POOL_OPTIONS = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '5')),
+    'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+    'pool_pre_ping': True,
+}
+
+metadata = MetaData()
+
+municipios = Table(
+    'municipios', metadata,
+    Column('codigo', String(7), primary_key=True),
+    Column('ordem', Integer, nullable=False),  # posição em ibge.txt
+    Column('uf', String(2), nullable=False),
+    Column('nome', Text, nullable=False),
+    Column('gentilico', Text),
+    Column('prefeito', Text),
+    Column('area', Float),
+    Column('populacao', Float),
+    Column('densidade', Float),
+    Column('populacao_estimada', Float),
+    Column('idhm', Float),
+    Column('pib_per_capita', Float),
+    Index('ix_municipios_uf_ordem', 'uf', 'ordem'),
+)
+
+financas = Table(
+    'financas', metadata,
+    Column('codigo', String(7), ForeignKey('municipios.codigo'), primary_key=True),
+    Column('ano', Integer, primary_key=True),
+    Column('receitas', Float),
+    Column('despesas', Float),
+    Column('dc', Float),
+    Column('rcl', Float),
+    Column('capag', String(8)),
+    Index('ix_financas_ano', 'ano'),
+)
+
+fundos = Table(
+    'fundos', metadata,
+    Column('id', String(32), primary_key=True),
+    Column('nome', Text, nullable=False),
+)
+
+regras_fundo = Table(
+    'regras_fundo', metadata,
+    Column('fundo_id', String(32), ForeignKey('fundos.id'), primary_key=True),
+    Column('ordem', Integer, primary_key=True),
+    Column('campo', String(32), nullable=False),
+    Column('operador', String(2), nullable=False),
+    Column('valor', Float, nullable=False),
+)
+
+elegibilidade = Table(
+    'elegibilidade', metadata,
+    Column('fundo_id', String(32), ForeignKey('fundos.id'), primary_key=True),
+    Column('codigo', String(7), ForeignKey('municipios.codigo'), primary_key=True),
+    Column('elegivel', Boolean, nullable=False),
+    Index('ix_elegibilidade_fundo', 'fundo_id', 'elegivel'),
+)
+
+metadados = Table(
+    'metadados', metadata,
+    Column('chave', String(32), primary_key=True),
+    Column('valor', Text, nullable=False),
+)
+
+# Ordem de carga (as tabelas referenciadas antes das que as referenciam)
+TABLES = [municipios, financas, fundos, regras_fundo, elegibilidade, metadados]
+
+## Colunas do frame (data.FRAME_SCHEMA e 'Estado') -> (tabela, coluna)
+# O ano das colunas de financas vem do rótulo da coluna ("[2024]")
+DB_SCHEMA = {
+    'Código [-]': ('municipios', 'codigo'),
+    'Estado': ('municipios', 'uf'),
+    'Município [-]': ('municipios', 'nome'),
+    'Gentílico [-]': ('municipios', 'gentilico'),
+    'Prefeito [2025]': ('municipios', 'prefeito'),
+    'Área Territorial - km² [2024]': ('municipios', 'area'),
+    'População no último censo - pessoas [2022]': ('municipios', 'populacao'),
+    'Densidade demográfica - hab/km² [2022]': ('municipios', 'densidade'),
+    'População estimada - pessoas [2024]': ('municipios', 'populacao_estimada'),
+    'IDHM (Índice de desenvolvimento humano municipal) [2010]': ('municipios', 'idhm'),
+    'PIB per capita - R$ [2021]': ('municipios', 'pib_per_capita'),
+    'Total de receitas brutas realizadas - R$ [2024]': ('financas', 'receitas'),
+    'Total de despesas brutas empenhadas - R$ [2024]': ('financas', 'despesas'),
+    'DC [2024]': ('financas', 'dc'),
+    'RCL [2024]': ('financas', 'rcl'),
+    'CAPAG [2024]': ('financas', 'capag'),
+}
+
+# Ordem das colunas do frame de data.parse_frame
+_FRAME_COLUMNS = [*SCHEMA, 'Estado', *SICONFI_SCHEMA]
+
+_ANO = re.compile(r'\[(\d{4})\]$')
+
+
+def _ano(col):
+    return int(_ANO.search(col).group(1))
+
+
+## Engine (criado no primeiro uso, um por processo)
+_engine = None
+
+
+def make_engine(url=None):
+    url = url or DATABASE_URL
+    if not url:
+        raise RuntimeError("DATABASE_URL não definida")
+    if url.startswith('sqlite'):
+        if url in ('sqlite://', 'sqlite:///:memory:'):
+            # Em memória: uma única conexão compartilhada, senão cada conexão
+            # do pool veria um banco vazio
+            return create_engine(url, poolclass=StaticPool, connect_args={'check_same_thread': False})
+        return create_engine(url)
+    return create_engine(url, **POOL_OPTIONS)
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = make_engine()
+    return _engine
+
+
+def release_connections():
+    # O SQLite em memória vive na conexão única do StaticPool: não pode fechar
+    if _engine is not None and not isinstance(_engine.pool, StaticPool):
+        _engine.dispose()
+
+
+def create_schema(engine=None):
+    metadata.create_all(engine or get_engine())
+
+
+## Carga em lote
+def _rows(df):
+    # NaN -> NULL
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _copy(conn, tabela, df):
+    # COPY ... FROM STDIN em CSV; campo vazio sem aspas = NULL
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    colunas = ', '.join(df.columns)
+    with conn.connection.driver_connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {tabela.name} ({colunas}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _plain(serie):
+    # Categorias viram texto simples para a carga
+    return serie.astype(object) if isinstance(serie.dtype, pd.CategoricalDtype) else serie
+
+
+def _table_frames(df, eligibility, funds, version):
+    frames = {}
+    m = pd.DataFrame({'codigo': df['Código [-]'], 'ordem': np.arange(len(df))})
+    for col, (tabela, coluna) in DB_SCHEMA.items():
+        if tabela == 'municipios' and coluna not in m:
+            m[coluna] = _plain(df[col])
+    frames['municipios'] = m
+
+    # Uma linha por (município, ano) com as colunas financeiras desse ano
+    por_ano = {}
+    for col, (tabela, coluna) in DB_SCHEMA.items():
+        if tabela == 'financas':
+            por_ano.setdefault(_ano(col), {})[coluna] = col
+    partes = []
+    for ano, cols in sorted(por_ano.items()):
+        parte = pd.DataFrame({'codigo': df['Código [-]'], 'ano': ano})
+        for coluna, col in cols.items():
+            parte[coluna] = _plain(df[col])
+        partes.append(parte)
+    frames['financas'] = pd.concat(partes, ignore_index=True)
+
+    frames['fundos'] = pd.DataFrame([(fund_id, fund['nome']) for fund_id, fund in funds.items()],
+                                    columns=['id', 'nome'])
+    frames['regras_fundo'] = pd.DataFrame(
+        [(fund_id, i, campo, op, float(valor))
+         for fund_id, fund in funds.items() for i, (campo, op, valor) in enumerate(fund['regras'])],
+        columns=['fundo_id', 'ordem', 'campo', 'operador', 'valor'])
+    frames['elegibilidade'] = pd.DataFrame({
+        'fundo_id': np.repeat(eligibility.fund_ids, len(eligibility.codes)),
+        'codigo': np.tile(np.array(eligibility.codes, dtype=object), len(eligibility.fund_ids)),
+        'elegivel': eligibility.bits.ravel(),
+    })
+    frames['metadados'] = pd.DataFrame(
+        [('dataset_version', version), ('funds_digest', eligibility.version or '')],
+        columns=['chave', 'valor'])
+    return frames
+
+
+def load(df, eligibility, version, engine=None, funds=None):
+    # Substitui todo o conteúdo em uma transação
+    from funds import FUNDS
+
+    engine = engine or get_engine()
+    funds = funds or FUNDS
+    create_schema(engine)
+    frames = _table_frames(df, eligibility, funds, version)
+    postgres = engine.dialect.name == 'postgresql'
+    with engine.begin() as conn:
+        if postgres:
+            conn.exec_driver_sql(f"TRUNCATE {', '.join(t.name for t in TABLES)}")
+        else:
+            for tabela in reversed(TABLES):
+                conn.execute(delete(tabela))
+        for tabela in TABLES:
+            frame = frames[tabela.name]
+            if postgres:
+                _copy(conn, tabela, frame)
+            else:
+                conn.execute(tabela.insert(), _rows(frame))
+    return {nome: len(frame) for nome, frame in frames.items()}
+
+
+## Leitura
+def read_frame(engine=None):
+    # Reconstrói o frame de data.parse_frame (mesmas colunas, dtypes e ordem)
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        m = pd.read_sql(select(municipios).order_by(municipios.c.ordem), conn)
+        f = pd.read_sql(select(financas), conn)
+
+    df = pd.DataFrame(index=m.index)
+    for col, (tabela, coluna) in DB_SCHEMA.items():
+        if tabela == 'municipios':
+            df[col] = m[coluna]
+        else:
+            ano = f[f['ano'] == _ano(col)].set_index('codigo')[coluna]
+            df[col] = m['codigo'].map(ano)
+
+    for col, (dtype, _, _) in FRAME_SCHEMA.items():
+        if dtype == 'str':
+            df[col] = df[col].astype(str)
+        elif dtype == 'category':
+            df[col] = df[col].astype(object).where(df[col].notna(), np.nan).astype('category')
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+    df['Estado'] = df['Estado'].astype(object)
+    return df[_FRAME_COLUMNS]
+
+
+def dataset_version(engine=None):
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        return conn.execute(
+            select(metadados.c.valor).where(metadados.c.chave == 'dataset_version')
+        ).scalar_one_or_none()
+
+
+## Consultas indexadas
+def city(code, engine=None):
+    # Município e as finanças de todos os anos (ix: chave primária)
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        registro = conn.execute(select(municipios).where(municipios.c.codigo == code)).mappings().first()
+        if registro is None:
+            return None
+        anos = conn.execute(
+            select(financas).where(financas.c.codigo == code).order_by(financas.c.ano)
+        ).mappings().all()
+    return {**registro, 'financas': {linha['ano']: dict(linha) for linha in anos}}
+
+
+def cities_in_state(uf, engine=None):
+    # [(código, nome)] na ordem de ibge.txt (ix_municipios_uf_ordem)
+    engine = engine or get_engine()
+    with engine.connect() as conn:
+        return [tuple(linha) for linha in conn.execute(
+            select(municipios.c.codigo, municipios.c.nome)
+            .where(municipios.c.uf == uf.upper())
+            .order_by(municipios.c.ordem)
+        )]
+
+
+def eligible_codes(fund_id, uf=None, elegivel=True, engine=None):
+    # Códigos (não) elegíveis ao fundo, opcionalmente só de uma UF
+    engine = engine or get_engine()
+    consulta = (
+        select(elegibilidade.c.codigo)
+        .join(municipios, municipios.c.codigo == elegibilidade.c.codigo)
+        .where(elegibilidade.c.fundo_id == fund_id, elegibilidade.c.elegivel == elegivel)
+        .order_by(municipios.c.ordem)
+    )
+    if uf:
+        consulta = consulta.where(municipios.c.uf == uf.upper())
+    with engine.connect() as conn:
+        return list(conn.scalars(consulta))
+
+
+if __name__ == '__main__':
+    import time
+
+    from data import dataset_version as files_version, parse_frame
+    from funds import evaluate_funds
+
+    inicio = time.perf_counter()
+    df = parse_frame()
+    # Versão dos arquivos, mesmo com DATA_SOURCE=db exportado (o banco ainda
+    # não tem metadados)
+    linhas = load(df, evaluate_funds(df), files_version(source='files'))
+    print(f"Carga em {get_engine().url.render_as_string(hide_password=True)}: "
+          + ', '.join(f"{nome} {n}" for nome, n in linhas.items())
+          + f" ({time.perf_counter() - inicio:.2f} s)")
@@ -0,0 +1,266 @@
+## Regras de elegibilidade dos fundos
+#
+# Cada fundo é um conjunto declarativo de predicados (campo, operador, valor),
+# todos obrigatórios. Os campos são as chaves de data.FRAME_SCHEMA (ex.:
+# 'Receitas', 'RCL'). Valor ausente nunca satisfaz um predicado.
+#
+# evaluate_funds avalia todos os fundos de uma vez sobre o frame carregado e
+# devolve a matriz fundo x município (Eligibility), consultada pelas páginas.
+# FundIndex pré-ordena, por (UF, fundo), as listas de municípios elegíveis e
+# não elegíveis, servidas em páginas pela rota /funds e pela página /fundos.
+import hashlib
+import math
+import operator
+
+import numpy as np
+from flask import abort, jsonify, request
+
+from cities import fold
+from data import FRAME_SCHEMA, field_values
+
+FUNDS = {
+    'verba-a': {
+        'nome': 'Verba Exemplo A',
+        'regras': [('Receitas', '>', 170_000)],
+    },
+    'verba-b': {
+        'nome': 'Verba Exemplo B',
+        'regras': [('Despesas', '<', 150_000)],
+    },
+    # Critério do mapa de estados (outros/citymap.py)
+    'verba-rcl': {
+        'nome': 'Verba Exemplo C',
+        'regras': [('RCL', '>=', 100_000_000)],
+    },
+    # Fundos do painel de exemplo (outros/dashboard.py): min_dc / max_rcl
+    'fundo-a': {
+        'nome': 'Fundo A',
+        'regras': [('DC', '>=', 10_000_000_000), ('RCL', '<=', 100_000_000_000)],
+    },
+    'fundo-b': {
+        'nome': 'Fundo B',
+        'regras': [('DC', '>=', 20_000_000_000), ('RCL', '<=', 100_000_000_000)],
+    },
+    'fundo-c': {
+        'nome': 'Fundo C',
+        'regras': [('DC', '>=', 5_000_000_000), ('RCL', '<=', 10_000_000_000)],
+    },
+}
+
+OPERADORES = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+# Nome de cada campo nos textos das páginas
+ROTULOS = {
+    'Receitas': 'Receitas brutas',
+    'Despesas': 'Despesas brutas',
+    'RCL': 'RCL',
+    'DC': 'Dívida consolidada',
+}
+
+# campo -> coluna do frame e grupo em CITIES_DATA
+_COLUNAS = {chave: col for col, (_, grupo, chave) in FRAME_SCHEMA.items() if grupo}
+_GRUPOS = {chave: grupo for _, (_, grupo, chave) in FRAME_SCHEMA.items() if grupo}
+
+
+def _reais(valor):
+    return f"R$ {valor:,.0f}".replace(",", ".")
+
+
+def describe(fund_id, funds=FUNDS):
+    return ' e '.join(f"{ROTULOS.get(campo, campo)} {op} {_reais(valor)}"
+                      for campo, op, valor in funds[fund_id]['regras'])
+
+
+def funds_digest(funds=FUNDS):
+    return hashlib.sha256(repr(sorted(funds.items())).encode('utf-8')).hexdigest()[:16]
+
+
+class Eligibility:
+    def __init__(self, fund_ids, codes, bits, version=None):
+        self.fund_ids = list(fund_ids)
+        self.codes = list(codes)
+        self.bits = bits  # bool[fundo, município]
+        self.version = version
+        self._fund_pos = {fund_id: i for i, fund_id in enumerate(self.fund_ids)}
+        self._city_pos = {code: j for j, code in enumerate(self.codes)}
+
+    def __contains__(self, code):
+        return code in self._city_pos
+
+    def eligible(self, fund_id, code):
+        j = self._city_pos.get(code)
+        return j is not None and bool(self.bits[self._fund_pos[fund_id], j])
+
+    def funds_for(self, code):
+        # [(fundo, elegível)] na ordem de FUNDS
+        j = self._city_pos.get(code)
+        if j is None:
+            return [(fund_id, False) for fund_id in self.fund_ids]
+        return list(zip(self.fund_ids, self.bits[:, j].tolist()))
+
+    def mask(self, fund_id):
+        return self.bits[self._fund_pos[fund_id]]
+
+    def count(self, fund_id):
+        return int(self.mask(fund_id).sum())
+
+
+def evaluate_funds(df, funds=FUNDS):
+    # Um predicado vira uma comparação vetorizada sobre a coluna inteira;
+    # as colunas são lidas uma vez, mesmo quando usadas por vários fundos
+    valores = {}
+    bits = np.zeros((len(funds), len(df)), dtype=bool)
+    for i, fund in enumerate(funds.values()):
+        linha = np.ones(len(df), dtype=bool)
+        for campo, op, valor in fund['regras']:
+            if campo not in valores:
+                valores[campo] = df[_COLUNAS[campo]].to_numpy(dtype=np.float64, na_value=np.nan)
+            coluna = valores[campo]
+            linha &= OPERADORES[op](coluna, valor) & ~np.isnan(coluna)
+        bits[i] = linha
+    return Eligibility(funds, df['Código [-]'].tolist(), bits, funds_digest(funds))
+
+
+## Consulta "municípios (não) elegíveis ao fundo X no estado Y"
+FUNDS_ROUTE = '/funds'
+NATIONAL = 'BR'
+STATUSES = ('eligible', 'ineligible')
+
+# Critérios de ordenação: nome -> (grupo, chave) em CITIES_DATA
+SORTS = {
+    'nome': ('basic', 'Município'),
+    'populacao': ('demographic', 'População_Estimada'),
+    'receitas': ('economic', 'Receitas'),
+    'despesas': ('economic', 'Despesas'),
+    'rcl': ('fiscal', 'RCL'),
+    'dc': ('fiscal', 'DC'),
+}
+
+
+def _json_value(valor):
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    return valor
+
+
+class FundIndex:
+    def __init__(self, eligibility, cities_data, url_for, funds=FUNDS):
+        self.eligibility = eligibility
+        self.cities_data = cities_data
+        self.funds = funds
+        self._urls = {code: url_for(code) for code in eligibility.codes}
+        self._codes = np.array(eligibility.codes, dtype=object)
+        ufs = np.array(field_values(cities_data, 'basic', 'Estado', eligibility.codes), dtype=object)
+        grupos = {NATIONAL: np.arange(len(self._codes))}
+        for uf in sorted(set(ufs)):
+            grupos[uf] = np.flatnonzero(ufs == uf)
+
+        # Ordem crescente de cada critério, com os valores ausentes no fim;
+        # a ordem decrescente percorre a parte preenchida ao contrário
+        ordens = {}
+        for sort, (grupo, chave) in SORTS.items():
+            valores = field_values(cities_data, grupo, chave, eligibility.codes)
+            if sort == 'nome':
+                chaves = np.array([fold(v) for v in valores], dtype=object)
+                ordem = np.argsort(chaves, kind='stable')
+                validos = np.ones(len(self._codes), dtype=bool)
+            else:
+                chaves = np.array(valores, dtype=np.float64)
+                validos = ~np.isnan(chaves)
+                ordem = np.argsort(np.where(validos, chaves, np.inf), kind='stable')
+            ordens[sort] = (ordem, validos)
+
+        # (UF, fundo, situação, critério) -> (posições em ordem crescente, quantas
+        # preenchidas); posições em int32, e não listas de códigos, para que os
+        # workers do gunicorn compartilhem os arrays do master
+        self._lists = {}
+        for uf, posicoes in grupos.items():
+            no_grupo = np.zeros(len(self._codes), dtype=bool)
+            no_grupo[posicoes] = True
+            for sort, (ordem, validos) in ordens.items():
+                ordem_uf = ordem[no_grupo[ordem]]
+                for fund_id in eligibility.fund_ids:
+                    elegivel = eligibility.mask(fund_id)[ordem_uf]
+                    for status, selecao in (('eligible', elegivel), ('ineligible', ~elegivel)):
+                        escolhidos = ordem_uf[selecao]
+                        self._lists[(uf, fund_id, status, sort)] = (
+                            escolhidos.astype(np.int32), int(validos[escolhidos].sum()))
+
+    def ufs(self):
+        return sorted({uf for uf, _, _, _ in self._lists} - {NATIONAL})
+
+    def counts(self, fund_id, uf=NATIONAL):
+        return {status: len(self._lists[(uf, fund_id, status, 'nome')][0]) for status in STATUSES}
+
+    def codes(self, fund_id, uf=NATIONAL, status='eligible', sort='nome', descending=False, offset=0, limit=50):
+        lista, preenchidos = self._lists[(uf or NATIONAL, fund_id, status, sort)]
+        offset, limit = max(offset, 0), max(limit, 0)
+        fim = offset + limit
+        if not descending:
+            return self._codes[lista[offset:fim]].tolist()
+        # Decrescente: a parte preenchida ao contrário e, depois, os ausentes
+        posicoes = lista[:0]
+        if offset < preenchidos:
+            posicoes = lista[preenchidos - min(fim, preenchidos):preenchidos - offset][::-1]
+        if fim > preenchidos:
+            posicoes = np.concatenate([posicoes, lista[max(offset, preenchidos):fim]])
+        return self._codes[posicoes].tolist()
+
+    def query(self, fund_id, uf=NATIONAL, status='eligible', sort='nome', descending=False, offset=0, limit=50):
+        uf = uf or NATIONAL
+        campos = [campo for campo, _, _ in self.funds[fund_id]['regras']]
+        itens = []
+        for code in self.codes(fund_id, uf, status, sort, descending, offset, limit):
+            dados = self.cities_data[code]
+            valores = {campo: _json_value(dados[_GRUPOS[campo]][campo]) for campo in campos}
+            itens.append({
+                'code': code,
+                'name': dados['basic']['Município'],
+                'uf': dados['basic']['Estado'],
+                'url': self._urls[code],
+                'values': valores,
+            })
+        contagem = self.counts(fund_id, uf)
+        return {
+            'fund': fund_id,
+            'uf': uf,
+            'status': status,
+            'sort': sort,
+            'order': 'desc' if descending else 'asc',
+            'offset': offset,
+            'limit': limit,
+            'total': contagem[status],
+            'counts': contagem,
+            'items': itens,
+        }
+
+
+def register_routes(server, index, max_limit=500):
+    @server.route(FUNDS_ROUTE)
+    def funds_list():
+        return jsonify([
+            {'id': fund_id, 'nome': fund['nome'], 'descricao': describe(fund_id, index.funds),
+             'counts': index.counts(fund_id)}
+            for fund_id, fund in index.funds.items()
+        ])
+
+    @server.route(f'{FUNDS_ROUTE}/<fund_id>')
+    def fund_cities(fund_id):
+        uf = request.args.get('uf', NATIONAL).upper()
+        status = request.args.get('status', 'eligible')
+        sort = request.args.get('sort', 'nome')
+        order = request.args.get('order', 'asc')
+        if fund_id not in index.funds or (uf != NATIONAL and uf not in index.ufs()):
+            abort(404)
+        if status not in STATUSES or sort not in SORTS or order not in ('asc', 'desc'):
+            abort(400)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', 50, type=int), 0), max_limit)
+        return jsonify(index.query(fund_id, uf, status, sort, order == 'desc', offset, limit))
@@ -0,0 +1,345 @@
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+from flask import Response, abort, request, send_file
+
+from data import CODIGO_PARA_UF, SHARED_DATA
+from httpcache import SUFFIXES, CompressedCache, accepted_encoding, compress, not_modified, validated_etag
+from snapshot import file_digest
+
+try:
+    import geobuf
+except ImportError:  # geobuf vem com dash-leaflet, mas é opcional
+    geobuf = None
+
+GEOJSON_DIR = 'cityjsons'
+
+# Um FeatureCollection carregado ocupa ~4,5x o tamanho do arquivo em memória
+PARSED_OVERHEAD = 4.5
+# No modo 'mmap' o arquivo fica no page cache (compartilhado entre processos)
+# e só o índice de offsets é memória do processo
+MMAP_OVERHEAD_PER_FEATURE = 200
+
+# Variantes simplificadas geradas por simplify.py: zoom -> tolerância em graus
+# (~meio pixel naquele zoom; 1 pixel = 360 / (256 * 2**zoom) graus no equador)
+VARIANTS = {6: 0.01, 8: 0.0025, 10: 0.0006}
+
+# Rota que serve as fronteiras de cada estado (ver register_routes)
+GEO_ROUTE = '/geo'
+GEO_FORMAT = os.getenv('GEO_FORMAT', 'geobuf' if geobuf else 'geojson')
+_EXTENSOES = {'geobuf': 'pbf', 'geojson': 'json'}
+_MIMETYPES = {'pbf': 'application/x-protobuf', 'json': 'application/geo+json'}
+
+# Tamanho aproximado do mapa em city_page, usado para estimar o zoom de enquadramento
+MAP_SIZE_PX = (600, 600)
+
+
+def uf_for_code(code):
+    return CODIGO_PARA_UF.get(int(str(code)[:2]))
+
+
+def variant_path(uf, zoom=None, directory=GEOJSON_DIR):
+    if zoom is None:
+        return os.path.join(directory, f'{uf}.json')
+    return os.path.join(directory, f'z{zoom}', f'{uf}.json')
+
+
+def fit_zoom(bbox, size=MAP_SIZE_PX):
+    # Maior zoom em que o bbox inteiro cabe no mapa (projeção de Mercator)
+    oeste, sul, leste, norte = bbox
+    largura = max(leste - oeste, 1e-9) / 360
+    y = lambda lat: math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+    altura = max(y(norte) - y(sul), 1e-9) / (2 * math.pi)
+    return math.floor(min(math.log2(size[0] / 256 / largura), math.log2(size[1] / 256 / altura)))
+
+
+def pick_variant(zoom):
+    # Variante mais leve com detalhe suficiente para o zoom; None = resolução original
+    for variante in sorted(VARIANTS):
+        if variante >= zoom:
+            return variante
+    return None
+
+
+_SEPARADORES = re.compile(r'[\s,]*')
+
+# Leituras de arquivos de geometria do disco (GeoCache e rota /geo), por
+# arquivo relativo a GEOJSON_DIR; exportadas em /metrics (metrics.py)
+FILE_READS = Counter()
+_READS_LOCK = threading.Lock()
+
+
+def count_read(path):
+    with _READS_LOCK:
+        FILE_READS[os.path.relpath(path, GEOJSON_DIR)] += 1
+
+
+def file_reads():
+    with _READS_LOCK:
+        return dict(FILE_READS)
+
+
+def _feature_offsets(texto):
+    # {id: (início, fim)} de cada feature no texto do FeatureCollection
+    decoder = json.JSONDecoder()
+    pos = texto.index('[', texto.index('"features"')) + 1
+    offsets = {}
+    while True:
+        pos = _SEPARADORES.match(texto, pos).end()
+        if texto[pos] == ']':
+            return offsets
+        feature, fim = decoder.raw_decode(texto, pos)
+        offsets[feature['properties']['id']] = (pos, fim)
+        pos = fim
+
+
+## Cache LRU dos GeoJSON estaduais (original e variantes), com índice código IBGE -> feature
+# mode='parsed' guarda o FeatureCollection já decodificado; mode='mmap' mapeia
+# o arquivo em memória (somente leitura, compartilhado entre os workers pelo
+# page cache) e decodifica só a feature pedida, a partir do seu trecho
+class GeoCache:
+    def __init__(self, directory=GEOJSON_DIR, max_bytes=64 * 1024 * 1024, mode='parsed'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._entries = OrderedDict()  # arquivo -> (collection, features_by_id, custo)
+        self._lock = threading.Lock()
+
+    def path(self, uf, zoom=None):
+        path = variant_path(uf, zoom, self.directory)
+        # Sem a variante gerada (python simplify.py), usa o arquivo original
+        if zoom is not None and not os.path.exists(path):
+            return variant_path(uf, None, self.directory)
+        return path
+
+    def _load(self, path):
+        count_read(path)
+        if self.mode == 'mmap':
+            with open(path, 'rb') as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # latin-1: um caractere por byte, então os offsets valem para o mmap
+            offsets = _feature_offsets(buf[:].decode('latin-1'))
+            return buf, offsets, len(offsets) * MMAP_OVERHEAD_PER_FEATURE
+        with open(path, 'r', encoding='utf-8') as f:
+            collection = json.load(f)
+        features = {feature['properties']['id']: feature for feature in collection['features']}
+        return collection, features, int(os.path.getsize(path) * PARSED_OVERHEAD)
+
+    def _entry(self, uf, zoom=None):
+        return self._entry_for_path(self.path(uf, zoom))
+
+    def _entry_for_path(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # O parse acontece fora do lock para não serializar estados diferentes
+        entry = self._load(path)
+
+        with self._lock:
+            if path not in self._entries:
+                self._entries[path] = entry
+                self.size += entry[2]
+                # Sempre mantém ao menos a entrada recém-carregada
+                while self.size > self.max_bytes and len(self._entries) > 1:
+                    _, (_, _, custo) = self._entries.popitem(last=False)
+                    self.size -= custo
+                    self.evictions += 1
+            return self._entries[path]
+
+    def state(self, uf, zoom=None):
+        return self._collection(self._entry(uf, zoom))
+
+    def _collection(self, entry):
+        if self.mode == 'mmap':
+            return json.loads(entry[0][:])
+        return entry[0]
+
+    def feature(self, code, uf=None, zoom=None):
+        uf = uf or uf_for_code(code)
+        if not uf or not os.path.exists(self.path(uf, zoom)):
+            return None
+        dados, features, _ = self._entry(uf, zoom)
+        if self.mode == 'mmap':
+            trecho = features.get(str(code))
+            return json.loads(dados[trecho[0]:trecho[1]]) if trecho else None
+        return features.get(str(code))
+
+    def warm(self, ufs=None, zooms=(None,)):
+        if ufs is None:
+            ufs = sorted(nome[:-5] for nome in os.listdir(self.directory) if nome.endswith('.json'))
+        for uf in ufs:
+            for zoom in zooms:
+                self._entry(uf, zoom)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'entries': list(self._entries),
+                'size_bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'mode': self.mode,
+            }
+
+
+## Instância do processo, configurada por variáveis de ambiente:
+#   GEOJSON_CACHE_MB  limite de memória estimada (padrão 64)
+#   GEOJSON_WARMUP    "all" ou lista de UFs separadas por vírgula para carregar no boot
+#   GEOJSON_CACHE_MODE 'parsed' ou 'mmap' (padrão: 'mmap' com SHARED_DATA=1)
+GEO_CACHE = GeoCache(
+    max_bytes=int(float(os.getenv('GEOJSON_CACHE_MB', '64')) * 1024 * 1024),
+    mode=os.getenv('GEOJSON_CACHE_MODE', 'mmap' if SHARED_DATA else 'parsed'),
+)
+
+
+def warm_from_env(cache=GEO_CACHE):
+    warmup = os.getenv('GEOJSON_WARMUP', '').strip()
+    if not warmup:
+        return
+    if warmup.lower() in ('1', 'all', 'true'):
+        cache.warm()
+    else:
+        cache.warm([uf.strip().upper() for uf in warmup.split(',') if uf.strip()])
+
+
+## Fronteiras estaduais servidas por URL, com ETag e cache longo no navegador
+@lru_cache(maxsize=256)
+def _digest(path, mtime_ns, size):
+    return file_digest(path)
+
+
+def geometry_version(path):
+    stat = os.stat(path)
+    return _digest(path, stat.st_mtime_ns, stat.st_size)[:16]
+
+
+def geometry_url(uf, zoom=None, fmt=GEO_FORMAT, cache=GEO_CACHE):
+    # O parâmetro v muda sempre que o arquivo muda, o que permite cache "immutable"
+    path = cache.path(uf, zoom)
+    variante = 'full' if path == variant_path(uf, None, cache.directory) else f'z{zoom}'
+    return f"{GEO_ROUTE}/{variante}/{uf}.{_EXTENSOES[fmt]}?v={geometry_version(path)}"
+
+
+def geometry_digest(directory=GEOJSON_DIR):
+    # Identifica o conjunto de arquivos de geometria (nome, tamanho e mtime)
+    arquivos = []
+    for raiz, _, nomes in os.walk(directory):
+        for nome in nomes:
+            if nome.endswith('.json'):
+                stat = os.stat(os.path.join(raiz, nome))
+                arquivos.append((os.path.relpath(os.path.join(raiz, nome), directory), stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha256(repr(sorted(arquivos)).encode('utf-8')).hexdigest()[:16]
+
+
+## Variantes gravadas no build (python precompress.py): <arquivo>.json.gz /
+## .json.br e, com geobuf, <arquivo>.pbf / .pbf.gz / .pbf.br
+def precompressed_path(path, encoding):
+    return f'{path}.{SUFFIXES[encoding]}'
+
+
+def geobuf_path(path):
+    return f'{os.path.splitext(path)[0]}.pbf'
+
+
+def _built_file(path, ext, encoding):
+    # Arquivo do build com a codificação pedida, se existir e não for mais
+    # antigo que o .json de origem; senão None
+    arquivo = path if ext == 'json' else geobuf_path(path)
+    if encoding:
+        arquivo = precompressed_path(arquivo, encoding)
+    if arquivo != path and not (os.path.exists(arquivo) and os.path.getmtime(arquivo) >= os.path.getmtime(path)):
+        return None
+    return arquivo
+
+
+# Corpos gerados na hora, quando falta o arquivo do build (precompress.py não
+# rodou), com limite de bytes (GEO_ENCODED_CACHE_MB, padrão 16) por processo.
+# Os arquivos do build saem do disco com send_file e não ocupam o cache
+ENCODED_CACHE = CompressedCache(int(float(os.getenv('GEO_ENCODED_CACHE_MB', '16')) * 1024 * 1024))
+
+
+def _encoded(path, versao, ext, encoding=None, cache=GEO_CACHE):
+    def build():
+        if ext == 'json':
+            count_read(path)
+            with open(path, 'rb') as f:
+                dados = f.read()
+        else:
+            dados = geobuf.encode(cache._collection(cache._entry_for_path(path)))
+        return compress(dados, encoding) if encoding else dados
+
+    return ENCODED_CACHE.get_or_build((path, versao, ext), encoding, build)
+
+
+def encoded_stats():
+    return ENCODED_CACHE.stats()
+
+
+def register_routes(server, cache=GEO_CACHE):
+    ufs = set(CODIGO_PARA_UF.values())
+
+    @server.route(f'{GEO_ROUTE}/<variante>/<uf>.<ext>')
+    def state_geometry(variante, uf, ext):
+        if uf not in ufs or ext not in _MIMETYPES or (ext == 'pbf' and geobuf is None):
+            abort(404)
+        if variante == 'full':
+            zoom = None
+        elif variante[:1] == 'z' and variante[1:].isdigit() and int(variante[1:]) in VARIANTS:
+            zoom = int(variante[1:])
+        else:
+            abort(404)
+
+        path = cache.path(uf, zoom)
+        if not os.path.exists(path):
+            abort(404)
+        versao = geometry_version(path)
+        etag = f'{versao}-{ext}'
+
+        encoding = accepted_encoding(request.headers.get('Accept-Encoding'))
+        validado = validated_etag(etag, request.if_none_match, encoding)
+        if validado is not None:
+            response = not_modified(Response, validado)
+        else:
+            arquivo = _built_file(path, ext, encoding)
+            if arquivo is not None:
+                count_read(arquivo)
+                response = send_file(os.path.abspath(arquivo), mimetype=_MIMETYPES[ext], conditional=False,
+                                     etag=False, last_modified=None, max_age=None)
+                # send_file marca no-cache e o nome do arquivo; o cache é definido abaixo
+                response.cache_control.no_cache = None
+                response.headers.pop('Content-Disposition', None)
+            else:
+                response = Response(_encoded(path, versao, ext, encoding, cache), mimetype=_MIMETYPES[ext])
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+                response.set_etag(f'{etag}-{SUFFIXES[encoding]}')
+            else:
+                response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        if request.args.get('v') == versao:
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = 3600
+        return response
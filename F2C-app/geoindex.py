@@ -0,0 +1,127 @@
+## Índice de centróides e bounding boxes dos municípios
+#
+# Arquivo lateral gerado a partir de cityjsons/*.json (resolução original) com,
+# para cada código IBGE: centróide ponderado por área, bbox e número de
+# vértices. As páginas posicionam mapa e marcador a partir dele, sem abrir o
+# GeoJSON. O arquivo guarda o digest de cada GeoJSON de origem e é refeito
+# quando algum deles muda.
+#
+# Build: python geoindex.py  (a partir de F2C-app/)
+import json
+import os
+
+from geo import GEOJSON_DIR, variant_path
+from snapshot import file_digest
+
+GEOMETRY_INDEX_PATH = 'geoindex.json'
+
+
+def _signed_area_centroid(anel):
+    area = cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(anel, anel[1:]):
+        cruz = x0 * y1 - x1 * y0
+        area += cruz
+        cx += (x0 + x1) * cruz
+        cy += (y0 + y1) * cruz
+    area /= 2
+    if area == 0:
+        return 0.0, 0.0, 0.0
+    return area, cx / (6 * area), cy / (6 * area)
+
+
+def feature_summary(feature):
+    geometry = feature['geometry']
+    poligonos = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+    aneis = [anel for poligono in poligonos for anel in poligono]
+
+    # Anéis com a mesma orientação do primeiro somam área e os de orientação
+    # oposta (buracos) subtraem; alguns arquivos trazem ilhas como anéis extras
+    # de um Polygon, com a mesma orientação do anel externo
+    referencia = _signed_area_centroid(aneis[0])[0] >= 0
+    area = cx = cy = 0.0
+    for anel in aneis:
+        a, x, y = _signed_area_centroid(anel)
+        peso = abs(a) if (a >= 0) == referencia else -abs(a)
+        area += peso
+        cx += x * peso
+        cy += y * peso
+
+    xs = [p[0] for anel in aneis for p in anel]
+    ys = [p[1] for anel in aneis for p in anel]
+    if area > 0:
+        lon, lat = cx / area, cy / area
+    else:
+        lon, lat = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+    vertices = sum(len(anel) for anel in aneis)
+    return [round(lon, 6), round(lat, 6), min(xs), min(ys), max(xs), max(ys), vertices]
+
+
+def _sources(directory):
+    return {
+        nome: file_digest(os.path.join(directory, nome))
+        for nome in sorted(os.listdir(directory)) if nome.endswith('.json')
+    }
+
+
+def build_geometry_index(directory=GEOJSON_DIR, path=GEOMETRY_INDEX_PATH):
+    sources = _sources(directory)
+    cities = {}
+    for nome in sources:
+        with open(variant_path(nome[:-5], None, directory), 'r', encoding='utf-8') as f:
+            collection = json.load(f)
+        for feature in collection['features']:
+            cities[feature['properties']['id']] = feature_summary(feature)
+
+    index = {
+        'fields': ['lon', 'lat', 'west', 'south', 'east', 'north', 'vertices'],
+        'sources': sources,
+        'cities': cities,
+    }
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+    except OSError as e:
+        print(f"Não foi possível gravar {path}: {e}")
+    return index
+
+
+class GeometryIndex:
+    def __init__(self, cities):
+        self.cities = cities
+
+    def __contains__(self, code):
+        return str(code) in self.cities
+
+    def centroid(self, code):
+        # [lat, lon], na ordem usada pelo Leaflet
+        lon, lat = self.cities[str(code)][:2]
+        return [lat, lon]
+
+    def bbox(self, code):
+        return self.cities[str(code)][2:6]
+
+    def bounds(self, code):
+        # [[sul, oeste], [norte, leste]], formato de dl.Map(bounds=...)
+        oeste, sul, leste, norte = self.bbox(code)
+        return [[sul, oeste], [norte, leste]]
+
+    def vertices(self, code):
+        return self.cities[str(code)][6]
+
+
+def load_geometry_index(directory=GEOJSON_DIR, path=GEOMETRY_INDEX_PATH):
+    index = None
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('sources') != _sources(directory):
+            print(f"Índice {path} desatualizado, recalculando a partir de {directory}")
+            index = None
+    if index is None:
+        index = build_geometry_index(directory, path)
+    return GeometryIndex(index['cities'])
+
+
+if __name__ == '__main__':
+    index = build_geometry_index()
+    print(f"{GEOMETRY_INDEX_PATH}: {len(index['cities'])} municípios")
@@ -0,0 +1,52 @@
+## Configuração do gunicorn (lida automaticamente por "gunicorn app:server"
+## a partir de F2C-app/, ver Procfile e render.yaml)
+#
+# O app é importado uma vez no master (preload_app) e os workers são criados
+# por fork, compartilhando as páginas de memória do master enquanto ninguém
+# escreve nelas. Para que isso dure:
+#   - SHARED_DATA=1: CITIES_DATA vira data.CityTable (arrays numpy em vez de um
+#     dict por município) e o cache de GeoJSON usa arquivos mapeados (mmap);
+#   - o coletor de lixo fica desligado no master durante o boot e, antes de
+#     cada fork, gc.freeze() move os objetos do boot para a geração permanente:
+#     as coletas dos workers não os percorrem (nem escrevem nos seus cabeçalhos).
+#
+# Com preload, DEFERRED_INIT=eager (startup.py): o master monta tudo antes do
+# fork (busca, fundos, agregados e índice de geometria inclusive) e os workers
+# dividem essas estruturas; ou seja, nada fica adiado. DEFERRED_INIT=fork é a
+# alternativa: o master importa só o que a página inicial precisa e o primeiro
+# pedido sai ~0,3 s antes, mas cada worker monta a sua cópia do resto logo
+# depois do fork (mais memória e CPU dobrada logo depois de acordar). O deploy
+# escolhe explicitamente em render.yaml (eager: a memória do plano free pesa
+# mais). Ver benchmarks/report_cold_start.py e report_worker_memory.py.
+#
+# Variáveis: PORT, WEB_CONCURRENCY (workers, padrão 2), GUNICORN_THREADS
+# (padrão 1), GUNICORN_PRELOAD (padrão 1; 0 = cada worker importa o app).
+# Relatório de memória por worker: python benchmarks/report_worker_memory.py
+import gc
+import os
+
+os.environ.setdefault('SHARED_DATA', '1')
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+if preload_app:
+    # Monta no master e divide com os workers; uma thread de segundo plano
+    # ('background') não passaria pelo fork: cada worker montaria de novo
+    os.environ.setdefault('DEFERRED_INIT', 'eager')
+    if os.environ['DEFERRED_INIT'] == 'background':
+        print("Aviso: DEFERRED_INIT=background com preload; cada worker monta a sua cópia (use eager ou fork)")
+timeout = 60
+
+if preload_app:
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
@@ -0,0 +1,225 @@
+## Compressão e cache HTTP das respostas do servidor
+#
+# register_middleware instala, no Flask do Dash:
+#   - compressão negociada por Accept-Encoding: brotli (se o pacote estiver
+#     instalado) ou gzip, para tipos de texto, JSON, JS e geometria acima de
+#     MIN_SIZE bytes; o resultado de respostas estáticas (GET com ETag ou
+#     Cache-Control) fica em um LRU, para não recomprimir os bundles do Dash;
+#   - ETag forte em toda resposta GET sem validador (/, _dash-layout,
+#     _dash-dependencies...) e 304 quando If-None-Match bate;
+#   - ETag forte para os callbacks determinísticos (cacheable): o ETag é o
+#     hash de (versão, output, inputs, state, changedPropIds) e é calculado
+#     antes do callback, então um 304 nem executa o callback. O navegador não
+#     revalida POST sozinho: assets/callbackcache.js guarda as respostas com
+#     ETag e manda If-None-Match.
+#
+# Uma mesma representação comprimida leva o sufixo da codificação no ETag
+# ("<etag>-gz", "<etag>-br"). O 304 repete o ETag da representação que o
+# cliente tem (a da codificação negociada agora ou, se ele guardou a versão
+# sem compressão, o ETag sem sufixo) e também leva Vary: Accept-Encoding.
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+CALLBACK_ROUTE = '/_dash-update-component'
+MIN_SIZE = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE = {
+    'application/json', 'application/javascript', 'text/javascript', 'application/geo+json',
+    'application/x-protobuf', 'image/svg+xml', 'image/x-icon',
+}
+SUFFIXES = {'gzip': 'gz', 'br': 'br'}
+
+
+def accepted_encoding(header, brotli_ok=brotli is not None):
+    # Melhor codificação aceita pelo cliente (q > 0), ou None
+    aceitas = {}
+    for parte in (header or '').split(','):
+        nome, _, params = parte.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if nome:
+            aceitas[nome.lower()] = q
+    if brotli_ok and aceitas.get('br', 0) > 0:
+        return 'br'
+    if aceitas.get('gzip', aceitas.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+
+def compress(dados, encoding, level=None):
+    if encoding == 'br':
+        return brotli.compress(dados, quality=level or BROTLI_QUALITY)
+    return gzip.compress(dados, compresslevel=level or GZIP_LEVEL, mtime=0)
+
+
+def validated_etag(etag, if_none_match, encoding):
+    # ETag a devolver no 304, ou None se o cliente não tem uma representação
+    # atual: a da codificação negociada ou a sem compressão (respostas
+    # pequenas, ou guardadas quando o cliente não aceitava compressão)
+    negociado = f'{etag}-{SUFFIXES[encoding]}' if encoding else etag
+    candidatos = if_none_match.as_set()
+    if negociado in candidatos or if_none_match.star_tag:
+        return negociado
+    if etag in candidatos:
+        return etag
+    return None
+
+
+def not_modified(response_class, etag):
+    resposta = response_class(status=304)
+    resposta.set_etag(etag)
+    resposta.vary.add('Accept-Encoding')
+    return resposta
+
+
+def _compressible(response):
+    mimetype = response.mimetype or ''
+    return mimetype in COMPRESSIBLE or mimetype.startswith('text/')
+
+
+class CompressedCache:
+    # LRU de bytes com limite de tamanho: (chave, codificação) -> bytes. Usado
+    # aqui para as respostas estáticas comprimidas e em geo.py para as
+    # codificações da geometria (get_or_build)
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, chave, encoding, build):
+        with self._lock:
+            dados = self._entries.get((chave, encoding))
+            if dados is not None:
+                self._entries.move_to_end((chave, encoding))
+                self.hits += 1
+                return dados
+            self.misses += 1
+        dados = build()
+        if len(dados) > self.max_bytes:
+            return dados  # maior que o cache inteiro: não guarda
+        with self._lock:
+            if (chave, encoding) not in self._entries:
+                self._entries[(chave, encoding)] = dados
+                self.size += len(dados)
+                while self.size > self.max_bytes and len(self._entries) > 1:
+                    _, removido = self._entries.popitem(last=False)
+                    self.size -= len(removido)
+                    self.evictions += 1
+        return dados
+
+    def get_or_compress(self, chave, dados, encoding):
+        return self.get_or_build(chave, encoding, lambda: compress(dados, encoding))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_bytes': self.size,
+                'max_bytes': self.max_bytes,
+            }
+
+
+def callback_etag(version, payload):
+    chave = json.dumps(
+        [version, payload.get('output'), payload.get('inputs'), payload.get('state'),
+         payload.get('changedPropIds')],
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False,
+    )
+    return hashlib.sha256(chave.encode('utf-8')).hexdigest()[:32]
+
+
+def register_middleware(server, version, cacheable=(), cache_mb=32):
+    # version: identifica dados + código (muda o ETag de todos os callbacks);
+    # cacheable: valores de 'output' dos callbacks determinísticos
+    cacheable = set(cacheable)
+    comprimidos = CompressedCache(int(cache_mb * 1024 * 1024))
+
+    @server.before_request
+    def callback_conditional():
+        if request.method != 'POST' or request.path != CALLBACK_ROUTE:
+            return None
+        payload = request.get_json(silent=True, cache=True) or {}
+        if payload.get('output') not in cacheable:
+            return None
+        g.callback_etag = etag = callback_etag(version, payload)
+        encoding = accepted_encoding(request.headers.get('Accept-Encoding'))
+        validado = validated_etag(etag, request.if_none_match, encoding)
+        if validado is not None:
+            return not_modified(server.response_class, validado)
+        return None
+
+    @server.after_request
+    def compress_and_validate(response):
+        if response.status_code != 200:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        etag = g.pop('callback_etag', None)
+        estatica = request.method in ('GET', 'HEAD')
+        if response.direct_passthrough or response.is_streamed:
+            if not (estatica and _compressible(response)):
+                return response
+            # Já codificado (ex.: .json.gz de /geo) ou sem compressão aceita e
+            # com validador próprio: o arquivo sai direto do disco
+            if 'Content-Encoding' in response.headers or (
+                    response.get_etag()[0] and accepted_encoding(request.headers.get('Accept-Encoding')) is None):
+                return response
+            # Arquivos (send_file): lê o conteúdo para poder comprimir
+            response.direct_passthrough = False
+            response.make_sequence()
+
+        if etag is None and estatica:
+            etag, _ = response.get_etag()
+            if etag is None:
+                response.add_etag()
+                etag, _ = response.get_etag()
+        encoding = accepted_encoding(request.headers.get('Accept-Encoding'))
+        if etag is not None:
+            response.set_etag(etag)
+            validado = validated_etag(etag, request.if_none_match, encoding)
+            if validado is not None:
+                response.status_code = 304
+                response.set_data(b'')
+                response.headers.pop('Content-Type', None)
+                response.set_etag(validado)
+                return response
+
+        if (encoding is None or 'Content-Encoding' in response.headers or not _compressible(response)
+                or response.content_length is not None and response.content_length < MIN_SIZE):
+            return response
+        dados = response.get_data()
+        if len(dados) < MIN_SIZE:
+            return response
+        if estatica and (etag or response.cache_control.max_age):
+            comprimido = comprimidos.get_or_compress((request.full_path, etag), dados, encoding)
+        else:
+            comprimido = compress(dados, encoding)
+        response.set_data(comprimido)
+        response.headers['Content-Encoding'] = encoding
+        if etag is not None:
+            response.set_etag(f'{etag}-{SUFFIXES[encoding]}')
+        return response
+
+    return comprimidos
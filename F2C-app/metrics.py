@@ -0,0 +1,249 @@
+## Métricas do servidor no formato texto do Prometheus (GET /metrics)
+#
+# register_routes instala, no Flask do Dash, um before_request/after_request
+# que mede cada pedido: duração e bytes da resposta (como trafegam, depois da
+# compressão de httpcache.py, por isso o registro vem antes dela) por rota e,
+# nos POSTs de /_dash-update-component, por callback (nome da função, via
+# app.callback_map) e estado (UF tirada dos inputs: '/sp/...' ou 'SP'). As
+# exceções não tratadas são contadas pelo sinal got_request_exception do
+# Flask, com o tipo da exceção.
+#
+# Contadores de cache e de leitura de arquivos vêm de coletores: funções
+# chamadas a cada leitura de /metrics que devolvem amostras
+# (nome, tipo, ajuda, rótulos, valor); o custo fica na leitura, não nos pedidos.
+#
+# Cada worker do gunicorn tem os seus contadores: uma leitura de /metrics vê
+# só o worker que a atendeu (o rótulo pid em f2c_process_start_time_seconds
+# identifica qual).
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, got_request_exception, request
+
+METRICS_ROUTE = '/metrics'
+CALLBACK_ROUTE = '/_dash-update-component'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+UFS = {
+    'AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+    'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO',
+}
+
+
+def _escape(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(nomes, valores, extra=''):
+    partes = [f'{nome}="{_escape(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        partes.append(extra)
+    return '{' + ','.join(partes) + '}' if partes else ''
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Counter:
+    def __init__(self, name, ajuda, labels=()):
+        self.name = name
+        self.ajuda = ajuda
+        self.labels = tuple(labels)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def expose(self):
+        linhas = [f'# HELP {self.name} {self.ajuda}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for valores, total in sorted(self._valores.items()):
+                linhas.append(f'{self.name}{_labels(self.labels, valores)} {_numero(total)}')
+        return linhas
+
+
+class Histogram:
+    def __init__(self, name, ajuda, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.ajuda = ajuda
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # rótulos -> [contagens por faixa (+Inf no fim), soma]
+        self._lock = threading.Lock()
+
+    def observe(self, valor, *valores):
+        faixa = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][faixa] += 1
+            serie[1] += valor
+
+    def expose(self):
+        linhas = [f'# HELP {self.name} {self.ajuda}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((valores, list(contagens), soma) for valores, (contagens, soma) in self._series.items())
+        for valores, contagens, soma in series:
+            acumulado = 0
+            for limite, contagem in zip((*self.buckets, float('inf')), contagens):
+                acumulado += contagem
+                le = _labels(self.labels, valores, f'le="{_numero(limite)}"')
+                linhas.append(f'{self.name}_bucket{le} {acumulado}')
+            linhas.append(f'{self.name}_sum{_labels(self.labels, valores)} {_numero(soma)}')
+            linhas.append(f'{self.name}_count{_labels(self.labels, valores)} {acumulado}')
+        return linhas
+
+
+def _expose_samples(amostras):
+    # Amostras dos coletores: (nome, tipo, ajuda, {rótulo: valor}, valor)
+    por_nome = {}
+    for nome, tipo, ajuda, rotulos, valor in amostras:
+        por_nome.setdefault(nome, (tipo, ajuda, []))[2].append((rotulos, valor))
+    linhas = []
+    for nome, (tipo, ajuda, valores) in por_nome.items():
+        linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} {tipo}']
+        for rotulos, valor in valores:
+            linhas.append(f'{nome}{_labels(rotulos.keys(), rotulos.values())} {_numero(valor)}')
+    return linhas
+
+
+def callback_name(callback_map, output):
+    # Nome da função do callback (app.callback_map do Dash)
+    funcao = callback_map.get(output, {}).get('callback') if isinstance(output, str) else None
+    return getattr(funcao, '__name__', None) or 'desconhecido'
+
+
+def callback_state(payload):
+    # UF do pedido: o primeiro input ou state que seja uma UF ou um caminho /uf/...
+    for item in (*payload.get('inputs', ()), *payload.get('state', ())):
+        valor = item.get('value') if isinstance(item, dict) else None
+        if not isinstance(valor, str):
+            continue
+        if valor in UFS:
+            return valor
+        if valor.startswith('/'):
+            uf = valor[1:3].upper()
+            if uf in UFS and valor[3:4] in ('/', ''):
+                return uf
+    return '-'
+
+
+class Registry:
+    def __init__(self):
+        self.started = time.time()
+        self.http_requests = Counter(
+            'f2c_http_requests_total', 'Pedidos HTTP atendidos.', ('rota', 'metodo', 'status'))
+        self.http_duration = Histogram(
+            'f2c_http_request_duration_seconds', 'Duração dos pedidos HTTP.', ('rota',))
+        self.http_bytes = Histogram(
+            'f2c_http_response_bytes', 'Tamanho do corpo das respostas HTTP.', ('rota',), BYTES_BUCKETS)
+        self.http_exceptions = Counter(
+            'f2c_http_exceptions_total', 'Exceções não tratadas nos pedidos HTTP.', ('rota', 'tipo'))
+        self.callback_duration = Histogram(
+            'f2c_callback_duration_seconds', 'Duração dos callbacks do Dash (pedido completo).',
+            ('callback', 'estado'))
+        self.callback_bytes = Histogram(
+            'f2c_callback_response_bytes', 'Tamanho das respostas dos callbacks do Dash.',
+            ('callback', 'estado'), BYTES_BUCKETS)
+        self.callback_exceptions = Counter(
+            'f2c_callback_exceptions_total', 'Exceções não tratadas nos callbacks do Dash.',
+            ('callback', 'estado', 'tipo'))
+        self.own = [self.http_requests, self.http_duration, self.http_bytes, self.http_exceptions,
+                    self.callback_duration, self.callback_bytes, self.callback_exceptions]
+        self.collectors = []
+
+    def add_collector(self, coletor):
+        self.collectors.append(coletor)
+
+    def expose(self):
+        linhas = [
+            '# HELP f2c_process_start_time_seconds Início do processo (epoch).',
+            '# TYPE f2c_process_start_time_seconds gauge',
+            f'f2c_process_start_time_seconds{{pid="{os.getpid()}"}} {_numero(self.started)}',
+        ]
+        for metrica in self.own:
+            linhas += metrica.expose()
+        amostras = []
+        for coletor in self.collectors:
+            try:
+                amostras += coletor()
+            except Exception as e:  # um coletor com erro não derruba a leitura
+                print(f"Aviso: coletor de métricas {getattr(coletor, '__name__', coletor)} falhou: {e}")
+        linhas += _expose_samples(amostras)
+        return '\n'.join(linhas) + '\n'
+
+
+def cache_samples(nome, stats):
+    # Amostras padrão de um cache a partir do seu stats() (hits, misses, ...)
+    rotulos = {'cache': nome}
+    amostras = [
+        ('f2c_cache_hits_total', 'counter', 'Acertos dos caches do processo.', rotulos, stats['hits']),
+        ('f2c_cache_misses_total', 'counter', 'Faltas dos caches do processo.', rotulos, stats['misses']),
+    ]
+    total = stats['hits'] + stats['misses']
+    amostras.append(('f2c_cache_hit_ratio', 'gauge', 'Fração de acertos desde o início do processo.',
+                     rotulos, stats['hits'] / total if total else 0.0))
+    if 'evictions' in stats:
+        amostras.append(('f2c_cache_evictions_total', 'counter', 'Entradas removidas por falta de espaço.',
+                         rotulos, stats['evictions']))
+    if 'size_bytes' in stats:
+        amostras.append(('f2c_cache_size_bytes', 'gauge', 'Tamanho (estimado) do conteúdo dos caches.',
+                         rotulos, stats['size_bytes']))
+    return amostras
+
+
+def register_routes(server, callback_map, registry=None):
+    # callback_map: app.callback_map do Dash (lido a cada pedido novo de
+    # callback, então os callbacks declarados depois também entram)
+    registry = registry or Registry()
+
+    @server.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        if request.method == 'POST' and request.path == CALLBACK_ROUTE:
+            payload = request.get_json(silent=True, cache=True) or {}
+            g.metrics_callback = (callback_name(callback_map, payload.get('output')), callback_state(payload))
+
+    @server.after_request
+    def record(response):
+        inicio = g.pop('metrics_start', None)
+        if inicio is None:
+            return response
+        duracao = time.perf_counter() - inicio
+        rota = request.url_rule.rule if request.url_rule is not None else 'outra'
+        tamanho = response.content_length or 0
+        registry.http_requests.inc(rota, request.method, str(response.status_code))
+        registry.http_duration.observe(duracao, rota)
+        registry.http_bytes.observe(tamanho, rota)
+        callback = g.pop('metrics_callback', None)
+        if callback is not None:
+            registry.callback_duration.observe(duracao, *callback)
+            registry.callback_bytes.observe(tamanho, *callback)
+        return response
+
+    def count_exception(sender, exception, **extra):
+        tipo = type(exception).__name__
+        rota = request.url_rule.rule if request.url_rule is not None else 'outra'
+        registry.http_exceptions.inc(rota, tipo)
+        callback = g.get('metrics_callback')
+        if callback is not None:
+            registry.callback_exceptions.inc(*callback, tipo)
+
+    got_request_exception.connect(count_exception, server, weak=False)
+
+    @server.route(METRICS_ROUTE)
+    def metrics():
+        return Response(registry.expose(), content_type=CONTENT_TYPE)
+
+    return registry
@@ -0,0 +1,78 @@
+import json
+import threading
+from collections import Counter, OrderedDict
+
+import plotly
+
+
+def serialized_size(tree):
+    return len(json.dumps(tree, cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8'))
+
+
+## Cache LRU das árvores de componentes das páginas de cidade
+#
+# Os dados do app são carregados uma vez no import (app.py) e não são
+# recarregados: uma mudança nos dados exige reiniciar o processo, o que
+# esvazia o cache. version (a versão dos dados) só aparece em stats. O custo
+# de cada entrada é o tamanho da árvore serializada, medido uma vez na
+# inserção.
+class RenderCache:
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, version=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self.visits = Counter()
+        self._entries = OrderedDict()  # chave -> (árvore, custo)
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            self.visits[key] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        tree = render()
+        self._store(key, tree)
+        return tree
+
+    def prerender(self, keys, render):
+        for key in keys:
+            with self._lock:
+                if key in self._entries:
+                    continue
+            self._store(key, render(key))
+
+    def _store(self, key, tree):
+        custo = serialized_size(tree)
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (tree, custo)
+            self.size += custo
+            while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+                _, (_, removido) = self._entries.popitem(last=False)
+                self.size -= removido
+                self.evictions += 1
+
+    def stats(self, top=10):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'top_visits': self.visits.most_common(top),
+            }
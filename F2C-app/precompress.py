@@ -0,0 +1,73 @@
+## Variantes pré-comprimidas dos GeoJSON estaduais
+#
+# Para cada arquivo de cityjsons/ (original e variantes de simplify.py) grava
+# <arquivo>.json.gz (gzip nível 9) e, se o pacote brotli estiver instalado,
+# <arquivo>.json.br (qualidade 11). Com geobuf, grava também <arquivo>.pbf e
+# as versões comprimidas dele (.pbf.gz, .pbf.br). A rota /geo serve esses
+# arquivos direto do disco, sem codificar nem comprimir a cada pedido e sem
+# guardá-los na memória do processo; um arquivo mais antigo que o seu .json é
+# ignorado pela rota e refeito aqui.
+#
+# Build: python precompress.py  (a partir de F2C-app/, depois de simplify.py)
+import json
+import os
+import time
+
+from geo import GEOJSON_DIR, geobuf, geobuf_path, precompressed_path
+from httpcache import brotli, compress
+
+NIVEIS = {'gzip': 9, 'br': 11}
+
+
+def _grava(destino, dados):
+    tmp = f'{destino}.tmp'
+    with open(tmp, 'wb') as saida:
+        saida.write(dados)
+    os.replace(tmp, destino)
+
+
+def precompress(directory=GEOJSON_DIR, force=False):
+    encodings = ['gzip'] + (['br'] if brotli is not None else [])
+    gerados = []
+
+    def atual(destino, origem):
+        return not force and os.path.exists(destino) and os.path.getmtime(destino) >= os.path.getmtime(origem)
+
+    for raiz, _, nomes in sorted(os.walk(directory)):
+        for nome in sorted(nomes):
+            if not nome.endswith('.json'):
+                continue
+            path = os.path.join(raiz, nome)
+            with open(path, 'rb') as f:
+                dados = f.read()
+            # (arquivo, conteúdo ou None se ainda não lido)
+            origens = [(path, dados)]
+            if geobuf is not None:
+                pbf = geobuf_path(path)
+                if atual(pbf, path):
+                    origens.append((pbf, None))
+                else:
+                    codificado = geobuf.encode(json.loads(dados))
+                    _grava(pbf, codificado)
+                    gerados.append((path, pbf))
+                    origens.append((pbf, codificado))
+            for origem, conteudo in origens:
+                for encoding in encodings:
+                    destino = precompressed_path(origem, encoding)
+                    if atual(destino, origem):
+                        continue
+                    if conteudo is None:
+                        with open(origem, 'rb') as f:
+                            conteudo = f.read()
+                    _grava(destino, compress(conteudo, encoding, NIVEIS[encoding]))
+                    gerados.append((origem, destino))
+    return gerados
+
+
+if __name__ == '__main__':
+    inicio = time.perf_counter()
+    gerados = precompress()
+    original = sum(os.path.getsize(path) for path, _ in gerados)
+    comprimido = sum(os.path.getsize(destino) for _, destino in gerados)
+    print(f"{len(gerados)} variantes em {time.perf_counter() - inicio:.1f} s"
+          + (f" ({original / 1024:.0f} KiB -> {comprimido / 1024:.0f} KiB)" if gerados else ""))
@@ -0,0 +1,264 @@
+## Perfil de pedidos sob demanda (amostragem ou cProfile)
+#
+# Dois jeitos de ligar, os dois desligados por padrão:
+#   - PROFILE_TOKEN=<segredo>: um pedido com ?profile=<segredo> ou com o
+#     cabeçalho X-Profile-Token: <segredo> é perfilado e o perfil é gravado em
+#     PROFILE_DIR; a resposta traz o nome do arquivo em X-Profile. Os callbacks
+#     do Dash são POSTs: abrindo a página com ?profile=<segredo>,
+#     assets/callbackcache.js repassa o token no cabeçalho e não revalida com
+#     If-None-Match, e display_page monta a página sem o cache de páginas, para
+#     que o perfil mostre city_page;
+#   - PROFILE_TOP=N: todo callback é perfilado e ficam, em memória e em disco,
+#     os perfis dos N pedidos mais lentos (os demais são descartados).
+# O token também libera GET /profiles?profile=<segredo> (lista em JSON) e
+# GET /profiles/<arquivo>?profile=<segredo> (download).
+#
+# PROFILE_MODE:
+#   'sample' (padrão) uma thread amostra a pilha da thread do pedido a cada
+#            PROFILE_INTERVAL_MS (1 ms) e grava as pilhas no formato "folded"
+#            (func;func;func microssegundos), pronto para flamegraph.pl,
+#            speedscope ou inferno; custo baixo o bastante para PROFILE_TOP;
+#   'cprofile' perfil determinístico (.prof do pstats, para snakeviz ou
+#            flameprof); mais caro e um pedido por vez.
+import cProfile
+import heapq
+import hmac
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+
+from flask import abort, g, jsonify, request, send_from_directory
+
+from metrics import CALLBACK_ROUTE, callback_name, callback_state
+
+PROFILE_ROUTE = '/profiles'
+TOKEN_HEADER = 'X-Profile-Token'
+_NOME_SEGURO = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def _frame_label(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class Sampler:
+    # Uma thread para o processo, criada no primeiro pedido perfilado (depois
+    # do fork do gunicorn); fica parada enquanto não há pedido ativo. Enquanto
+    # houver, o intervalo de troca do GIL cai para o de amostragem: sem isso a
+    # thread de amostragem só roda a cada 5 ms, ou menos.
+    # Cada amostra pesa o tempo (em microssegundos) desde a anterior: uma
+    # chamada longa em C (json.load, pandas) segura o GIL e não é amostrada por
+    # dentro; o tempo dela cai na pilha onde a thread o solta, logo depois
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self._switch_interval = None
+        self._ativos = {}  # id da thread -> {pilha: amostras}
+        self._lock = threading.Lock()
+        self._tem_trabalho = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        pilhas = {}
+        with self._lock:
+            self._ativos[thread_id] = [pilhas, time.perf_counter()]
+            if self._switch_interval is None:
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self.interval, self._switch_interval))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='profile-sampler', daemon=True)
+                self._thread.start()
+            self._tem_trabalho.set()
+        return pilhas
+
+    def stop(self, thread_id):
+        with self._lock:
+            pilhas = self._ativos.pop(thread_id, [{}])[0]
+            if not self._ativos:
+                self._tem_trabalho.clear()
+                if self._switch_interval is not None:
+                    sys.setswitchinterval(self._switch_interval)
+                    self._switch_interval = None
+        return pilhas
+
+    def _loop(self):
+        while True:
+            self._tem_trabalho.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            agora = time.perf_counter()
+            with self._lock:
+                for thread_id, ativo in self._ativos.items():
+                    pilhas, anterior = ativo
+                    ativo[1] = agora
+                    frame = frames.get(thread_id)
+                    pilha = []
+                    while frame is not None:
+                        pilha.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    if pilha:
+                        chave = ';'.join(reversed(pilha))
+                        pilhas[chave] = pilhas.get(chave, 0) + int((agora - anterior) * 1e6)
+
+
+class Profiler:
+    def __init__(self, callback_map, directory='profiles', mode='sample', token='', top=0, interval=0.001):
+        self.callback_map = callback_map
+        self.directory = directory
+        self.mode = mode
+        self.token = token
+        self.top = top
+        self.sampler = Sampler(interval) if mode == 'sample' else None
+        self.slowest = []  # heap (duração, seq, registro) com os `top` mais lentos
+        self.recent = []  # perfis pedidos pelo token (os últimos 50)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+
+    def authorized(self):
+        if not self.token:
+            return False
+        enviado = request.headers.get(TOKEN_HEADER) or request.args.get('profile') or ''
+        return hmac.compare_digest(enviado.encode('utf-8'), self.token.encode('utf-8'))
+
+    def forced(self):
+        return g.get('profile_forced', False)
+
+    def begin(self):
+        if request.path.startswith(PROFILE_ROUTE):
+            return
+        forcado = self.authorized()
+        if not forcado and not (self.top and request.method == 'POST' and request.path == CALLBACK_ROUTE):
+            return
+        if self.mode == 'cprofile':
+            # Um cProfile por vez no processo (sys.setprofile/sys.monitoring)
+            if not self._cprofile_lock.acquire(blocking=False):
+                return
+            perfil = cProfile.Profile()
+            perfil.enable()
+            g.profile_state = ('cprofile', perfil)
+        else:
+            g.profile_state = ('sample', threading.get_ident())
+            self.sampler.start(threading.get_ident())
+        g.profile_forced = forcado
+        g.profile_start = time.perf_counter()
+
+    def _finish(self):
+        estado = g.pop('profile_state', None)
+        if estado is None:
+            return None
+        duracao = time.perf_counter() - g.pop('profile_start')
+        if estado[0] == 'cprofile':
+            estado[1].disable()
+            self._cprofile_lock.release()
+            return duracao, estado[1]
+        return duracao, self.sampler.stop(estado[1])
+
+    def _describe(self):
+        if request.path == CALLBACK_ROUTE:
+            payload = request.get_json(silent=True, cache=True) or {}
+            alvo = next((item.get('value') for item in payload.get('inputs', ())
+                         if isinstance(item, dict) and isinstance(item.get('value'), str)), '')
+            return callback_name(self.callback_map, payload.get('output')), callback_state(payload), alvo
+        return 'rota', '-', request.path
+
+    def _write(self, nome, dados):
+        os.makedirs(self.directory, exist_ok=True)
+        caminho = os.path.join(self.directory, nome)
+        if self.mode == 'cprofile':
+            dados.dump_stats(caminho)
+        else:
+            with open(caminho, 'w', encoding='utf-8') as f:
+                for pilha, amostras in sorted(dados.items()):
+                    f.write(f'{pilha} {amostras}\n')
+        return caminho
+
+    def end(self, response=None):
+        resultado = self._finish()
+        if resultado is None:
+            return response
+        duracao, dados = resultado
+        forcado = g.pop('profile_forced', False)
+        with self._lock:
+            entra_no_top = self.top and (len(self.slowest) < self.top or duracao > self.slowest[0][0])
+        if not forcado and not entra_no_top:
+            return response
+
+        callback, uf, alvo = self._describe()
+        seq = next(self._seq)
+        nome = _NOME_SEGURO.sub('_', f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{seq}-{callback}-"
+                                     f"{alvo.strip('/') or uf}-{duracao * 1000:.0f}ms")[:160]
+        nome += '.prof' if self.mode == 'cprofile' else '.folded'
+        try:
+            self._write(nome, dados)
+        except OSError as e:
+            print(f"Aviso: não foi possível gravar o perfil {nome}: {e}")
+            return response
+        registro = {'arquivo': nome, 'ms': round(duracao * 1000, 1), 'callback': callback, 'estado': uf,
+                    'alvo': alvo, 'status': response.status_code if response is not None else None,
+                    'quando': time.strftime('%Y-%m-%dT%H:%M:%S'), 'pid': os.getpid()}
+        removidos = []
+        with self._lock:
+            if forcado:
+                self.recent = (self.recent + [registro])[-50:]
+            elif len(self.slowest) < self.top:
+                heapq.heappush(self.slowest, (duracao, seq, registro))
+            elif duracao > self.slowest[0][0]:
+                removidos.append(heapq.heapreplace(self.slowest, (duracao, seq, registro))[2])
+            else:
+                removidos.append(registro)
+        for antigo in removidos:
+            try:
+                os.remove(os.path.join(self.directory, antigo['arquivo']))
+            except OSError:
+                pass
+        if forcado and response is not None:
+            response.headers['X-Profile'] = nome
+        return response
+
+    def listing(self):
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'top': [registro for _, _, registro in sorted(self.slowest, reverse=True)],
+                'recent': list(reversed(self.recent)),
+            }
+
+
+def register_routes(server, callback_map):
+    # Devolve o Profiler, ou None se nem PROFILE_TOKEN nem PROFILE_TOP estiverem definidos
+    token = os.getenv('PROFILE_TOKEN', '')
+    top = int(os.getenv('PROFILE_TOP', '0'))
+    if not token and not top:
+        return None
+    mode = os.getenv('PROFILE_MODE', 'sample')
+    if mode not in ('sample', 'cprofile'):
+        print(f"Aviso: PROFILE_MODE={mode!r} desconhecido; usando 'sample'")
+        mode = 'sample'
+    profiler = Profiler(
+        callback_map, directory=os.getenv('PROFILE_DIR', 'profiles'), mode=mode, token=token, top=top,
+        interval=float(os.getenv('PROFILE_INTERVAL_MS', '1')) / 1000,
+    )
+
+    server.before_request(profiler.begin)
+    server.after_request(profiler.end)
+
+    @server.teardown_request
+    def stop_profile(exc):
+        # Pedido que terminou sem passar pelo after_request: só libera o perfilador
+        profiler._finish()
+
+    @server.route(PROFILE_ROUTE)
+    def profile_list():
+        if not profiler.authorized():
+            abort(404)
+        return jsonify(profiler.listing())
+
+    @server.route(f'{PROFILE_ROUTE}/<nome>')
+    def profile_file(nome):
+        if not profiler.authorized():
+            abort(404)
+        return send_from_directory(os.path.abspath(profiler.directory), nome, as_attachment=True)
+
+    return profiler
@@ -0,0 +1,171 @@
+## Busca de municípios por nome (sem acentos) ou código IBGE
+#
+# Ordenação: nome exato, prefixo do nome ou do código, prefixo de alguma
+# palavra do nome e, por fim, trecho qualquer do nome (via trigramas). Dentro
+# de cada faixa, municípios mais populosos primeiro.
+#
+# O mesmo índice é exportado em forma compacta (ver export) para a busca no
+# navegador: assets/search.js monta a partir dele, uma vez, as mesmas
+# estruturas (nomes, palavras e códigos ordenados, trigramas) e aplica as
+# mesmas faixas sem chamar o servidor a cada tecla.
+import hashlib
+import heapq
+import json
+import math
+import re
+from bisect import bisect_left
+
+from flask import Response, jsonify, request
+
+import cities
+from cities import fold
+from data import field_values
+from snapshot import file_digest
+
+SEARCH_ROUTE = '/search'
+_SEPARADORES = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(texto):
+    return _SEPARADORES.sub(' ', fold(texto)).strip()
+
+
+def _prefix_range(ordenada, prefixo):
+    inicio = bisect_left(ordenada, (prefixo,))
+    fim = bisect_left(ordenada, (prefixo + '\uffff',))
+    return ordenada[inicio:fim]
+
+
+def _trigrams(texto, padded=True):
+    # O índice usa o nome com espaço nas pontas; a consulta não, porque pode
+    # começar ou terminar no meio de uma palavra ('aulo' em 'sao paulo')
+    if padded:
+        texto = f' {texto} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, cities_data, url_for):
+        def populacao(valor):
+            return -valor if isinstance(valor, float) and not math.isnan(valor) else 0
+
+        # Posição de cada município na ordem de desempate (mais populoso primeiro)
+        linhas = list(zip(
+            cities_data,
+            field_values(cities_data, 'demographic', 'População_Estimada'),
+            field_values(cities_data, 'basic', 'Município'),
+            field_values(cities_data, 'basic', 'Estado'),
+        ))
+        linhas.sort(key=lambda linha: (populacao(linha[1]), linha[2]))
+        ordem = [code for code, _, _, _ in linhas]
+        self.codes = ordem
+        self.names = [nome for _, _, nome, _ in linhas]
+        self.ufs = [uf for _, _, _, uf in linhas]
+        self.urls = [url_for(code) for code in ordem]
+        self.normalized = [normalize(nome) for nome in self.names]
+
+        self._exact = {}
+        self._grams = {}
+        nomes, palavras, codigos = [], [], []
+        for rank, (code, nome) in enumerate(zip(ordem, self.normalized)):
+            self._exact.setdefault(nome, []).append(rank)
+            nomes.append((nome, rank))
+            codigos.append((code, rank))
+            palavras.extend((palavra, rank) for palavra in set(nome.split()[1:]))
+            for gram in _trigrams(nome):
+                self._grams.setdefault(gram, []).append(rank)
+        self._names = sorted(nomes)
+        self._words = sorted(palavras)
+        self._codes = sorted(codigos)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _tiers(self, q):
+        # Cada faixa devolve os ranks candidatos, em qualquer ordem
+        yield self._exact.get(q, [])
+        if q.isdigit():
+            yield [rank for _, rank in _prefix_range(self._codes, q)]
+            return
+        yield [rank for _, rank in _prefix_range(self._names, q)]
+        yield [rank for _, rank in _prefix_range(self._words, q)]
+        if len(q) >= 3:
+            postings = sorted((self._grams.get(g, []) for g in _trigrams(q, padded=False)), key=len)
+            if postings and postings[0]:
+                candidatos = set(postings[0]).intersection(*postings[1:])
+                yield [rank for rank in candidatos if q in self.normalized[rank]]
+
+    def search_ranks(self, query, k=10):
+        q = normalize(query)
+        if not q:
+            return []
+        vistos = set()
+        resultado = []
+        for faixa in self._tiers(q):
+            for rank in heapq.nsmallest(k + len(vistos), faixa):
+                if rank not in vistos:
+                    vistos.add(rank)
+                    resultado.append(rank)
+                    if len(resultado) == k:
+                        return resultado
+        return resultado
+
+    def search(self, query, k=10):
+        return [self.codes[rank] for rank in self.search_ranks(query, k)]
+
+    def results(self, query, k=10):
+        return [
+            {'code': self.codes[r], 'name': self.names[r], 'uf': self.ufs[r], 'url': self.urls[r]}
+            for r in self.search_ranks(query, k)
+        ]
+
+    def export(self):
+        # Uma linha por município, já na ordem de desempate:
+        # [código, nome, UF, nome normalizado, url]
+        return {
+            'fields': ['code', 'name', 'uf', 'normalized', 'url'],
+            'rows': [list(linha) for linha in zip(self.codes, self.names, self.ufs, self.normalized, self.urls)],
+        }
+
+
+def index_version(data_version):
+    # Identifica o export sem montá-lo: versão dos dados + código da busca e dos slugs
+    return hashlib.sha256(repr((
+        data_version, file_digest(__file__), file_digest(cities.__file__),
+    )).encode('utf-8')).hexdigest()[:16]
+
+
+def register_routes(server, index, max_k=50, version=None):
+    # Com version (index_version), o export só é gerado no primeiro pedido e o
+    # índice pode ainda estar sendo montado (startup.Deferred); sem ela, o
+    # export é gerado agora e o ETag é o hash do conteúdo
+    exportado = {}
+
+    def export():
+        if not exportado:
+            corpo = json.dumps(index.export(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            exportado.update(corpo=corpo, etag=version or hashlib.sha256(corpo).hexdigest()[:16])
+        return exportado['corpo']
+
+    if version is None:
+        export()
+    etag = version or exportado['etag']
+
+    @server.route(f'{SEARCH_ROUTE}/index.json')
+    def search_index():
+        response = Response(export(), mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.public = True
+        if request.args.get('v') == etag:
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = 3600
+        return response.make_conditional(request)
+
+    @server.route(SEARCH_ROUTE)
+    def search_api():
+        k = min(request.args.get('k', 10, type=int), max_k)
+        return jsonify(index.results(request.args.get('q', ''), k))
+
+    return f'{SEARCH_ROUTE}/index.json?v={etag}'
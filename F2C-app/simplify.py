@@ -0,0 +1,201 @@
+## Geração das variantes simplificadas dos GeoJSON estaduais
+#
+# Para cada arquivo de cityjsons/ e cada zoom de geo.VARIANTS grava
+# cityjsons/z<zoom>/<UF>.json. A simplificação preserva a topologia:
+#   1. monta o grafo de todas as bordas do estado e marca como junção todo
+#      vértice com grau diferente de 2;
+#   2. quebra cada anel nas junções e simplifica cada trecho com
+#      Douglas-Peucker, sempre na mesma orientação, de modo que uma divisa
+#      compartilhada por dois municípios é simplificada de forma idêntica
+#      nos dois lados (sem buracos nem sobreposições);
+#   3. cada trecho mantém ao menos o seu vértice mais distante, o que
+#      impede que anéis pequenos degenerem;
+#   4. as coordenadas são quantizadas para a grade do zoom.
+#
+# Build: python simplify.py  (a partir de F2C-app/)
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+from geo import GEOJSON_DIR, VARIANTS, variant_path
+
+
+def _perpendicular(pontos, a, b):
+    # Distância de cada ponto ao segmento a-b
+    ab = b - a
+    norma = ab @ ab
+    if norma == 0:
+        return np.hypot(*(pontos - a).T)
+    t = np.clip(((pontos - a) @ ab) / norma, 0, 1)
+    proj = a + np.outer(t, ab)
+    return np.hypot(*(pontos - proj).T)
+
+
+def douglas_peucker(pontos, tolerancia):
+    n = len(pontos)
+    if n <= 2:
+        return list(range(n))
+    pts = np.asarray(pontos, dtype=float)
+    manter = np.zeros(n, dtype=bool)
+    manter[0] = manter[-1] = True
+
+    # O vértice mais distante é sempre mantido (ver cabeçalho, item 3)
+    dist = _perpendicular(pts[1:-1], pts[0], pts[-1])
+    mais_distante = 1 + int(np.argmax(dist))
+    manter[mais_distante] = True
+
+    pilha = [(0, mais_distante), (mais_distante, n - 1)]
+    while pilha:
+        ini, fim = pilha.pop()
+        if fim - ini < 2:
+            continue
+        dist = _perpendicular(pts[ini + 1:fim], pts[ini], pts[fim])
+        i = int(np.argmax(dist))
+        if dist[i] > tolerancia:
+            meio = ini + 1 + i
+            manter[meio] = True
+            pilha.append((ini, meio))
+            pilha.append((meio, fim))
+    return np.flatnonzero(manter).tolist()
+
+
+def _rings(geometry):
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    return geometry['coordinates']
+
+
+def _junctions(features):
+    vizinhos = {}
+    for feature in features:
+        for poligono in _rings(feature['geometry']):
+            for anel in poligono:
+                pts = [tuple(p) for p in anel[:-1]]
+                for i, p in enumerate(pts):
+                    s = vizinhos.setdefault(p, set())
+                    s.add(pts[i - 1])
+                    s.add(pts[(i + 1) % len(pts)])
+    return {p for p, s in vizinhos.items() if len(s) != 2}
+
+
+def _simplify_chain(cadeia, tolerancia, cache):
+    # Orientação canônica: o mesmo trecho percorrido nos dois sentidos gera
+    # exatamente o mesmo resultado
+    chave = tuple(cadeia)
+    if chave in cache:
+        return cache[chave]
+    invertida = cadeia[0] > cadeia[-1] or (cadeia[0] == cadeia[-1] and cadeia[1] > cadeia[-2])
+    base = cadeia[::-1] if invertida else cadeia
+    resultado = [base[i] for i in douglas_peucker(base, tolerancia)]
+    if invertida:
+        resultado.reverse()
+    cache[chave] = resultado
+    return resultado
+
+
+def _simplify_ring(anel, juncoes, tolerancia, cache):
+    pts = [tuple(p) for p in anel[:-1]]
+    cortes = [i for i, p in enumerate(pts) if p in juncoes]
+    if not cortes:
+        # Anel sem junções (ilha ou enclave): é cortado no menor e no maior
+        # vértice, escolha que independe do ponto inicial e da orientação
+        inicio = pts.index(min(pts))
+        pts = pts[inicio:] + pts[:inicio]
+        cortes = [0, pts.index(max(pts))]
+    else:
+        pts = pts[cortes[0]:] + pts[:cortes[0]]
+        cortes = [i - cortes[0] for i in cortes]
+
+    pts.append(pts[0])
+    cortes.append(len(pts) - 1)
+    saida = [pts[0]]
+    for ini, fim in zip(cortes, cortes[1:]):
+        saida.extend(_simplify_chain(pts[ini:fim + 1], tolerancia, cache)[1:])
+    return saida
+
+
+def _quantize(anel, casas):
+    saida = []
+    for x, y in anel:
+        p = (round(x, casas), round(y, casas))
+        if not saida or saida[-1] != p:
+            saida.append(p)
+    return saida
+
+
+def simplify_collection(collection, tolerancia):
+    features = collection['features']
+    juncoes = _junctions(features)
+    cache = {}
+    casas = max(0, math.ceil(-math.log10(tolerancia / 10)))
+
+    saida = []
+    for feature in features:
+        poligonos = []
+        for poligono in _rings(feature['geometry']):
+            aneis = []
+            for anel in poligono:
+                simplificado = _simplify_ring(anel, juncoes, tolerancia, cache)
+                quantizado = _quantize(simplificado, casas)
+                if len(quantizado) < 4:
+                    quantizado = simplificado
+                aneis.append([list(p) for p in quantizado])
+            poligonos.append(aneis)
+
+        geometry = feature['geometry']
+        coordinates = poligonos[0] if geometry['type'] == 'Polygon' else poligonos
+        saida.append({
+            'type': 'Feature',
+            'properties': {k: feature['properties'][k] for k in ('id', 'name') if k in feature['properties']},
+            'geometry': {'type': geometry['type'], 'coordinates': coordinates},
+        })
+    return {'type': 'FeatureCollection', 'features': saida}
+
+
+def payload_size(collection):
+    return len(json.dumps(collection, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def build_variants(directory=GEOJSON_DIR):
+    relatorio = []
+    for nome in sorted(os.listdir(directory)):
+        if not nome.endswith('.json'):
+            continue
+        uf = nome[:-5]
+        with open(os.path.join(directory, nome), 'r', encoding='utf-8') as f:
+            collection = json.load(f)
+
+        linha = {'uf': uf, 'original': payload_size(collection)}
+        for zoom, tolerancia in VARIANTS.items():
+            simplificado = simplify_collection(collection, tolerancia)
+            path = variant_path(uf, zoom, directory)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(simplificado, f, ensure_ascii=False, separators=(',', ':'))
+            linha[zoom] = os.path.getsize(path)
+        relatorio.append(linha)
+    return relatorio
+
+
+def format_report(relatorio):
+    zooms = list(VARIANTS)
+    linhas = ['UF  ' + f"{'original':>12}" + ''.join(f"{f'z{z}':>12}{'%':>7}" for z in zooms)]
+    total = {'original': 0, **{z: 0 for z in zooms}}
+    for linha in relatorio + [None]:
+        if linha is None:
+            linha = dict(total, uf='BR')
+        else:
+            for chave in total:
+                total[chave] += linha[chave]
+        colunas = ''.join(f"{linha[z]:>12,}{linha[z] / linha['original']:>7.1%}" for z in zooms)
+        linhas.append(f"{linha['uf']:<4}{linha['original']:>12,}{colunas}")
+    return '\n'.join(linhas)
+
+
+if __name__ == '__main__':
+    relatorio = build_variants(sys.argv[1] if len(sys.argv) > 1 else GEOJSON_DIR)
+    print('Bytes do FeatureCollection serializado (JSON compacto), por estado e variante')
+    print(format_report(relatorio))
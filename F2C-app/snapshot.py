@@ -0,0 +1,182 @@
+## Snapshot binário dos dados (compilado no build, mapeado em memória no boot)
+#
+# Layout do arquivo (little-endian):
+#   MAGIC (8 bytes) | versão (uint32) | tamanho do cabeçalho (uint32) | cabeçalho JSON
+#   | blocos de colunas, cada um alinhado em ALIGN bytes
+#
+# O cabeçalho guarda o digest SHA-256 de cada arquivo de origem (e de qualquer
+# chave extra, como o esquema), o CRC32 da área de dados e, para cada tabela, a
+# posição de cada coluna. Colunas numéricas são gravadas como arrays crus;
+# colunas de texto são codificadas em dicionário (códigos int32, -1 = ausente,
+# mais um bloco UTF-8 com os valores distintos e seus offsets).
+#
+# Build: python snapshot.py  (a partir de F2C-app/)
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'F2CSNAP\0'
+FORMAT_VERSION = 1
+ALIGN = 64
+_PREFIX = struct.Struct('<8sII')
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def code_digest(directory, packages=()):
+    # Todos os .py de directory (o app inteiro, não só quem chama) e as versões
+    # dos pacotes instalados: muda a cada deploy que mude o código
+    h = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(directory, '*.py'))):
+        h.update(f'{os.path.basename(path)}:{file_digest(path)}\n'.encode('utf-8'))
+    for pacote in packages:
+        try:
+            versao = metadata.version(pacote)
+        except metadata.PackageNotFoundError:
+            versao = None
+        h.update(f'{pacote}=={versao}\n'.encode('utf-8'))
+    return h.hexdigest()
+
+
+def source_digests(paths, extra=None):
+    digests = {os.path.basename(p): file_digest(p) for p in paths if os.path.exists(p)}
+    digests.update(extra or {})
+    return digests
+
+
+def _encode_column(serie):
+    if pd.api.types.is_numeric_dtype(serie) and not isinstance(serie.dtype, pd.CategoricalDtype):
+        arr = np.ascontiguousarray(serie.to_numpy())
+        return {'kind': 'numeric', 'dtype': arr.dtype.str}, [arr.tobytes()]
+
+    cat = pd.Categorical(serie.astype('object') if not isinstance(serie.dtype, pd.CategoricalDtype) else serie)
+    valores = [str(v).encode('utf-8') for v in cat.categories]
+    offsets = np.zeros(len(valores) + 1, dtype='<i8')
+    offsets[1:] = np.cumsum([len(v) for v in valores])
+    codes = cat.codes.astype('<i4')
+    meta = {
+        'kind': 'dict',
+        'categorical': isinstance(serie.dtype, pd.CategoricalDtype),
+        'size': len(valores),
+    }
+    return meta, [codes.tobytes(), offsets.tobytes(), b''.join(valores)]
+
+
+def write_snapshot(path, tables, sources):
+    blocos = []
+    cabecalho = {'sources': sources, 'tables': {}}
+    pos = 0
+
+    def adiciona(dados):
+        nonlocal pos
+        pad = (-pos) % ALIGN
+        blocos.append(b'\0' * pad)
+        pos += pad
+        inicio = pos
+        blocos.append(dados)
+        pos += len(dados)
+        return [inicio, len(dados)]
+
+    for nome, df in tables.items():
+        colunas = []
+        for col in df.columns:
+            meta, partes = _encode_column(df[col])
+            meta['name'] = col
+            meta['blocks'] = [adiciona(p) for p in partes]
+            colunas.append(meta)
+        cabecalho['tables'][nome] = {'rows': len(df), 'columns': colunas}
+
+    payload = b''.join(blocos)
+    cabecalho['crc32'] = zlib.crc32(payload)
+    cabecalho_bytes = json.dumps(cabecalho, ensure_ascii=False).encode('utf-8')
+    inicio_dados = _PREFIX.size + len(cabecalho_bytes)
+    inicio_dados += (-inicio_dados) % ALIGN
+    cabecalho_bytes = cabecalho_bytes.ljust(inicio_dados - _PREFIX.size, b' ')
+
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(cabecalho_bytes)))
+        f.write(cabecalho_bytes)
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+def _decode_column(buf, base, meta, rows):
+    blocos = [(base + inicio, tamanho) for inicio, tamanho in meta['blocks']]
+    if meta['kind'] == 'numeric':
+        (inicio, _), = blocos
+        return np.frombuffer(buf, dtype=meta['dtype'], count=rows, offset=inicio)
+
+    (c_ini, _), (o_ini, _), (v_ini, v_tam) = blocos
+    codes = np.frombuffer(buf, dtype='<i4', count=rows, offset=c_ini)
+    offsets = np.frombuffer(buf, dtype='<i8', count=meta['size'] + 1, offset=o_ini)
+    texto = bytes(buf[v_ini:v_ini + v_tam])
+    valores = [texto[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(meta['size'])]
+    cat = pd.Categorical.from_codes(codes, categories=valores)
+    if meta['categorical']:
+        return cat
+    return np.asarray(cat, dtype=object)
+
+
+def read_header(buf):
+    magic, versao, tamanho = _PREFIX.unpack_from(buf, 0)
+    if magic != MAGIC or versao != FORMAT_VERSION:
+        return None, 0
+    cabecalho = json.loads(bytes(buf[_PREFIX.size:_PREFIX.size + tamanho]))
+    return cabecalho, _PREFIX.size + tamanho
+
+
+def open_snapshot(path, sources):
+    # Devolve {tabela: DataFrame} ou None se o snapshot não existir, for de outra
+    # versão, estiver corrompido ou tiver sido gerado a partir de outras fontes
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None
+
+    try:
+        cabecalho, base = read_header(buf)
+    except (struct.error, ValueError):
+        return None
+    if cabecalho is None or cabecalho['sources'] != sources:
+        return None
+    if zlib.crc32(memoryview(buf)[base:]) != cabecalho['crc32']:
+        return None
+
+    tabelas = {}
+    for nome, tabela in cabecalho['tables'].items():
+        rows = tabela['rows']
+        tabelas[nome] = pd.DataFrame({
+            meta['name']: _decode_column(buf, base, meta, rows)
+            for meta in tabela['columns']
+        }, copy=False)
+    return tabelas
+
+
+if __name__ == '__main__':
+    import time
+
+    import data
+
+    inicio = time.perf_counter()
+    data.build_snapshot()
+    print(f"{data.SNAPSHOT_PATH} gerado em {(time.perf_counter() - inicio) * 1000:.0f} ms "
+          f"({os.path.getsize(data.SNAPSHOT_PATH) / 1024:.0f} KiB)")
@@ -0,0 +1,191 @@
+## Inicialização em duas fases e linha do tempo do boot
+#
+# Ao importar app.py só é montado na hora o que a página inicial precisa
+# (dados, CityIndex, layout). O resto (índice de busca, fundos, agregados,
+# índice de geometria, aquecimento de caches) fica em objetos Deferred, que
+# repassam atributos ao valor construído e esperam por ele se ainda não
+# estiver pronto. DEFERRED_INIT:
+#   'background' (padrão) constrói em uma thread logo depois do import;
+#   'fork'       não constrói no processo que importou: cada processo filho
+#                (worker do gunicorn com preload, ver gunicorn.conf.py)
+#                começa a construir ao nascer;
+#   'eager'      constrói durante o import (comportamento anterior).
+# Em qualquer modo, o primeiro acesso a um valor pendente o constrói ali
+# mesmo (ou espera a thread que já está construindo).
+#
+# Threads não sobrevivem ao fork: no filho, o que estava pendente volta ao
+# estado inicial (com travas novas) e, fora do modo 'eager', a thread é
+# recriada (a menos que o pai já tivesse terminado tudo).
+#
+# TIMELINE guarda marcas em ms desde o início do processo (lido de /proc no
+# Linux; senão, desde o import deste módulo) e a duração de cada Deferred; a
+# primeira resposta servida também é marcada. Exposta em /stats/startup.
+import os
+import threading
+import time
+
+from flask import jsonify
+
+DEFERRED_INIT = os.getenv('DEFERRED_INIT', 'background')
+STARTUP_ROUTE = '/stats/startup'
+_IMPORTADO = time.perf_counter()
+
+
+def _process_age_ms():
+    # Idade do processo no momento do import deste módulo, via /proc (Linux)
+    try:
+        with open('/proc/self/stat') as f:
+            inicio = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, (uptime - inicio / os.sysconf('SC_CLK_TCK')) * 1000)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+_BASE_MS = _process_age_ms()
+
+
+def now_ms():
+    return _BASE_MS + (time.perf_counter() - _IMPORTADO) * 1000
+
+
+class Timeline:
+    def __init__(self):
+        self.marks = []  # (marca, ms desde o início do processo)
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def mark(self, nome):
+        with self._lock:
+            self.marks.append((nome, round(now_ms(), 1)))
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self.pid = os.getpid()
+
+
+TIMELINE = Timeline()
+DEFERRED = []
+
+
+class Deferred:
+    def __init__(self, nome, build):
+        self._nome = nome
+        self._build = build
+        self._reset()
+        DEFERRED.append(self)
+        if DEFERRED_INIT == 'eager':
+            self.get()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._pronto = False
+        self._valor = None
+        self._erro = None
+        self._ms = None
+
+    def get(self):
+        if not self._pronto:
+            with self._lock:
+                if not self._pronto:
+                    inicio = time.perf_counter()
+                    try:
+                        self._valor = self._build()
+                    except Exception as e:
+                        self._erro = e
+                        print(f"Aviso: falha ao montar {self._nome}: {e}")
+                    self._ms = round((time.perf_counter() - inicio) * 1000, 1)
+                    self._pronto = True
+                    TIMELINE.mark(f'{self._nome} pronto')
+        if self._erro is not None:
+            raise self._erro
+        return self._valor
+
+    def ready(self):
+        return self._pronto
+
+    def __getattr__(self, nome):
+        return getattr(self.get(), nome)
+
+    def __contains__(self, item):
+        return item in self.get()
+
+    def __getitem__(self, chave):
+        return self.get()[chave]
+
+    def __iter__(self):
+        return iter(self.get())
+
+    def __len__(self):
+        return len(self.get())
+
+
+def _build_all(after):
+    for deferred in list(DEFERRED):
+        try:
+            deferred.get()
+        except Exception:
+            pass  # já avisado; o erro reaparece em quem acessar o valor
+    TIMELINE.mark('adiados prontos')
+    for funcao in after:
+        funcao()
+    TIMELINE.mark('aquecimento pronto')
+    _CONCLUIDO.set()
+
+
+def _start_thread(after):
+    threading.Thread(target=_build_all, args=(after,), name='deferred-init', daemon=True).start()
+
+
+_AFTER = []
+_CONCLUIDO = threading.Event()
+
+
+def start(after=()):
+    # Chamada no fim do import de app.py; after: funções a rodar depois de
+    # montar os adiados (aquecimento de caches, pré-renderização)
+    _AFTER[:] = after
+    if DEFERRED_INIT == 'eager':
+        _build_all(_AFTER)
+    elif DEFERRED_INIT == 'background':
+        _start_thread(_AFTER)
+
+
+def _after_fork_in_child():
+    TIMELINE.reset_after_fork()
+    for deferred in DEFERRED:
+        if not deferred._pronto:
+            deferred._reset()
+    # Se o pai já terminou (adiados e aquecimento), o filho herda tudo pronto
+    if DEFERRED_INIT != 'eager' and not _CONCLUIDO.is_set():
+        _start_thread(_AFTER)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def stats():
+    return {
+        'pid': os.getpid(),
+        'mode': DEFERRED_INIT,
+        'marks_ms': dict(TIMELINE.marks),
+        'deferred': {d._nome: {'ready': d._pronto, 'ms': d._ms, 'error': repr(d._erro) if d._erro else None}
+                     for d in DEFERRED},
+    }
+
+
+def register_routes(server):
+    primeira = []
+
+    @server.after_request
+    def mark_first_response(response):
+        if not primeira:
+            primeira.append(True)
+            TIMELINE.mark('primeira resposta')
+        return response
+
+    @server.route(STARTUP_ROUTE)
+    def startup_stats():
+        return jsonify(stats())
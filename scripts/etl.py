@@ -0,0 +1,250 @@
+## Pipeline ETL dos dados do app (substitui convScript.py e os notebooks
+## dataLoadingEstados, dataLoadingSiconfi e dataMerge)
+#
+# Estágios por estado, em paralelo (um processo por estado):
+#   1. unescape  csv/<uf>.csv -> csv_out/<uf>.csv, sem as entidades HTML
+#   2. headers   "<span>...</span>" nos cabeçalhos vira "(...)"
+#   3. trailer   descarta a linha de título, a tabela de notas do fim e a
+#                coluna vazia deixada pela vírgula final
+# e, depois, para o conjunto:
+#   4. concat    une os estados, em ordem de UF -> ibge.txt
+#   5. siconfi   CAPAG do Tesouro (planilha xlsx, se existir; senão o
+#                siconfi.txt atual) com as correções de nome -> siconfi.txt;
+#                junção com ibge.txt pelo código IBGE -> ibgeSiconfi.txt
+#   6. fill      em ibgeSiconfi.txt, DC e RCL ausentes = 0 e CAPAG ausente = 'E'
+#
+# Os valores passam como texto do começo ao fim (o '-' do IBGE e a
+# formatação dos números são preservados). O resultado dos estágios 1-3 de
+# cada estado fica em .etl-cache/, identificado pelo sha256 do CSV bruto e
+# pela versão do pipeline: um estado só é reprocessado quando o seu CSV muda,
+# e os estágios 4-6 só quando algum hash de entrada muda.
+#
+# Uso (a partir da raiz do repositório):
+#     python scripts/etl.py [--jobs N] [--force]
+import argparse
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Muda quando a lógica de algum estágio muda, invalidando o cache
+PIPELINE_VERSION = 1
+
+CSV_DIR = 'csv'
+UNESCAPED_DIR = 'csv_out'
+CACHE_DIR = '.etl-cache'
+OUT_DIR = 'F2C-app'
+MERGED_PATH = os.path.join('outros', 'ibgeSiconfi.txt')
+CAPAG_XLSX = os.path.join('xlsx', 'capag-municipios-posicao-2025-jun-10.xlsx')
+CAPAG_SHEET = 'CAPAG Ano Base 2024'
+
+CODIGO = 'Código [-]'
+_SPAN = re.compile(r'<span>(.*?)</span>')
+_CODIGO_IBGE = re.compile(r'^\d{7}$')
+
+# Planilha do Tesouro -> colunas de siconfi.txt
+CAPAG_COLUMNS = {
+    'Código Município Completo': CODIGO,
+    'Nome_Município': 'Município [-]',
+    'UF': 'UF [-]',
+    '2024 - Dívida Consolidada': 'DC [2024]',
+    '2024 - Receita Corrente Líquida': 'RCL [2024]',
+    'CAPAG': 'CAPAG [2024]',
+}
+
+# Nomes do Tesouro que divergem do IBGE
+SICONFI_NAME_FIXES = {
+    'Barão de Monte Alto': 'Barão do Monte Alto',
+    'Gracho Cardoso': 'Graccho Cardoso',
+}
+
+# Regras de preenchimento de ibgeSiconfi.txt
+FILL_RULES = {
+    'DC [2024]': '0.0',
+    'RCL [2024]': '0.0',
+    'CAPAG [2024]': 'E',
+}
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _read_text_csv(fonte, **kwargs):
+    return pd.read_csv(fonte, dtype=str, keep_default_na=False, na_filter=False, **kwargs)
+
+
+## Estágios 1-3 (um estado)
+def unescape(texto):
+    return html.unescape(texto)
+
+
+def normalize_headers(df):
+    return df.rename(columns=lambda col: _SPAN.sub(r'(\1)', col).strip())
+
+
+def drop_trailer(df):
+    # Linhas de município têm código IBGE de 7 dígitos; a tabela de notas não
+    df = df[df[CODIGO].str.match(_CODIGO_IBGE)]
+    vazias = [col for col in df.columns if col.startswith('Unnamed:') and not df[col].str.len().any()]
+    return df.drop(columns=vazias).reset_index(drop=True)
+
+
+def build_state(raw_path, unescaped_path, cache_path):
+    with open(raw_path, 'r', encoding='utf-8') as f:
+        texto = unescape(f.read())
+    with open(unescaped_path, 'w', encoding='utf-8') as f:
+        f.write(texto)
+
+    # A primeira linha é o título ("Acre | Todos os Municípios")
+    df = drop_trailer(normalize_headers(_read_text_csv(io.StringIO(texto), skiprows=1)))
+    tmp = f'{cache_path}.tmp'
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, cache_path)
+    return len(df)
+
+
+## Estágios 4-6 (conjunto)
+def concat_states(paths):
+    frames = [_read_text_csv(path) for path in paths]
+    return pd.concat(frames, ignore_index=True).fillna('')
+
+
+def load_siconfi(xlsx_path, siconfi_path):
+    if os.path.exists(xlsx_path):
+        df = pd.read_excel(xlsx_path, sheet_name=CAPAG_SHEET, skiprows=3, dtype=str)
+        df = df.rename(columns=CAPAG_COLUMNS)[list(CAPAG_COLUMNS.values())].fillna('')
+    else:
+        df = _read_text_csv(siconfi_path)
+    df['Município [-]'] = df['Município [-]'].replace(SICONFI_NAME_FIXES)
+    return df
+
+
+def join_siconfi(ibge, siconfi):
+    # Junção pelo código IBGE; o nome do município vem do IBGE
+    return ibge.merge(siconfi.drop(columns=['Município [-]']), on=CODIGO, how='inner', validate='one_to_one')
+
+
+def fill(df, rules=FILL_RULES):
+    df = df.copy()
+    for col, valor in rules.items():
+        df[col] = df[col].mask(df[col] == '', valor)
+    return df
+
+
+def _write_csv(df, path):
+    tmp = f'{path}.tmp'
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+## Execução incremental
+def _load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def run(root='.', jobs=None, force=False, log=print):
+    inicio = time.perf_counter()
+    csv_dir = os.path.join(root, CSV_DIR)
+    unescaped_dir = os.path.join(root, UNESCAPED_DIR)
+    cache_dir = os.path.join(root, CACHE_DIR)
+    out_dir = os.path.join(root, OUT_DIR)
+    os.makedirs(unescaped_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    manifest = {} if force else _load_manifest(manifest_path)
+    if manifest.get('version') != PIPELINE_VERSION:
+        manifest = {}
+
+    nomes = sorted(nome for nome in os.listdir(csv_dir) if nome.endswith('.csv'))
+    estados = {}
+    pendentes = []
+    for nome in nomes:
+        uf = nome[:-4].upper()
+        digest = sha256_file(os.path.join(csv_dir, nome))
+        cache_path = os.path.join(cache_dir, f'{uf}-{digest[:16]}.csv')
+        estados[uf] = (digest, cache_path)
+        if force or not os.path.exists(cache_path) or manifest.get('states', {}).get(uf) != digest:
+            pendentes.append((uf, os.path.join(csv_dir, nome), os.path.join(unescaped_dir, nome), cache_path))
+
+    if pendentes:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futuros = {uf: executor.submit(build_state, *args) for uf, *args in pendentes}
+            for uf, futuro in futuros.items():
+                log(f"  {uf}: {futuro.result()} municípios")
+        # Remove as versões anteriores dos estados reprocessados
+        atuais = {os.path.basename(cache_path) for _, cache_path in estados.values()}
+        for nome in os.listdir(cache_dir):
+            if nome.endswith('.csv') and nome not in atuais and nome.split('-')[0] in estados:
+                os.remove(os.path.join(cache_dir, nome))
+    log(f"estágios 1-3: {len(pendentes)} de {len(estados)} estados reprocessados")
+
+    siconfi_path = os.path.join(out_dir, 'siconfi.txt')
+    xlsx_path = os.path.join(root, CAPAG_XLSX)
+    fonte_siconfi = xlsx_path if os.path.exists(xlsx_path) else siconfi_path
+    entradas = {
+        'states': {uf: digest for uf, (digest, _) in estados.items()},
+        'siconfi': sha256_file(fonte_siconfi),
+    }
+    saidas = {
+        'ibge': os.path.join(out_dir, 'ibge.txt'),
+        'siconfi': siconfi_path,
+        'merged': os.path.join(root, MERGED_PATH),
+    }
+    atualizado = (
+        manifest.get('states') == entradas['states'] and manifest.get('siconfi') == entradas['siconfi']
+        and all(manifest.get('outputs', {}).get(k) == sha256_file(p) for k, p in saidas.items() if os.path.exists(p))
+        and all(os.path.exists(p) for p in saidas.values())
+    )
+    if atualizado:
+        log(f"estágios 4-6: nada mudou ({time.perf_counter() - inicio:.2f} s)")
+        return False
+
+    ibge = concat_states([cache_path for _, cache_path in estados.values()])
+    _write_csv(ibge, saidas['ibge'])
+    siconfi = load_siconfi(xlsx_path, siconfi_path)
+    _write_csv(siconfi, saidas['siconfi'])
+    merged = fill(join_siconfi(ibge, siconfi))
+    _write_csv(merged, saidas['merged'])
+    log(f"estágios 4-6: ibge.txt {len(ibge)}, siconfi.txt {len(siconfi)}, ibgeSiconfi.txt {len(merged)} linhas")
+
+    # O hash da fonte do siconfi é o do arquivo que acabou de ser escrito
+    # quando não há planilha
+    entradas['siconfi'] = sha256_file(fonte_siconfi)
+    manifest = {
+        'version': PIPELINE_VERSION,
+        **entradas,
+        'outputs': {k: sha256_file(p) for k, p in saidas.items()},
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    log(f"concluído em {time.perf_counter() - inicio:.2f} s; refaça o snapshot do app com: cd {OUT_DIR} && python snapshot.py")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera ibge.txt, siconfi.txt e ibgeSiconfi.txt a partir de csv/")
+    parser.add_argument('--root', default='.', help="raiz do repositório (padrão: diretório atual)")
+    parser.add_argument('--jobs', type=int, default=None, help="processos em paralelo (padrão: número de CPUs)")
+    parser.add_argument('--force', action='store_true', help="ignora o cache e refaz todos os estágios")
+    args = parser.parse_args(argv)
+    run(args.root, args.jobs, args.force)
+
+
+if __name__ == '__main__':
+    sys.exit(main())